@@ -0,0 +1,312 @@
+"""
+趋势分析模块 - 基于NumPy对排名历史进行向量化分析
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import ANALYTICS_CONFIG
+from database import db_manager
+
+logger = logging.getLogger(__name__)
+
+# 排名矩阵中表示"不在榜上"的值，以及计算最高排名时的哨兵值
+ABSENT = 0
+RANK_SENTINEL = np.iinfo(np.int16).max
+# 可存入 int16 排名矩阵的最大排名，补录数据中更大的排名截断到该值
+MAX_RANK = RANK_SENTINEL - 1
+
+
+class TrendAnalyzer:
+    """
+    排名趋势分析器
+
+    将时间窗口内的历史快照加载为以问题为行、以爬取为列的稠密矩阵
+    （排名矩阵 int16，0 表示不在榜上；热度矩阵 float32，缺失为 NaN），
+    所有指标均为整矩阵或子矩阵上的向量化运算。
+
+    refresh() 只加载上次之后的新快照：追加新的列、淘汰滑出窗口的旧列，
+    并且只重新计算受影响的行（新爬取中出现的问题、上一次在榜的问题、
+    以及被淘汰列中出现过的问题）。
+    """
+
+    def __init__(self, window_hours: Optional[int] = None, manager=None):
+        """
+        Args:
+            window_hours: 分析窗口（小时），默认使用 ANALYTICS_CONFIG['window_hours']
+            manager: 数据库管理器，默认使用全局 db_manager
+        """
+        self.db = manager or db_manager
+        self.window = timedelta(hours=window_hours or ANALYTICS_CONFIG['window_hours'])
+
+        self.question_ids = []
+        self._question_index = {}
+        self.times = np.empty(0, dtype='datetime64[us]')
+        self._rank = np.zeros((0, 0), dtype=np.int16)
+        self._hot = np.zeros((0, 0), dtype=np.float32)
+
+        # 每个问题的指标，按行与矩阵对齐
+        self.metrics = self._empty_metrics(0)
+
+    def refresh(self) -> int:
+        """
+        增量加载新的快照并更新受影响问题的指标
+
+        Returns:
+            新加载的快照行数
+        """
+        last_time = self.times[-1].astype(datetime) if len(self.times) else None
+        if last_time is None:
+            latest = self.db.get_latest_crawl_time()
+            if latest is None:
+                return 0
+            rows = self.db.get_snapshot_rows(since=latest - self.window)
+        else:
+            rows = [row for row in self.db.get_snapshot_rows(since=last_time) if row[1] > last_time]
+
+        if not rows:
+            return 0
+
+        affected = self._append(rows)
+        affected |= self._evict()
+        self._compute(np.fromiter(affected, dtype=np.int64, count=len(affected)))
+        self._compact()
+
+        logger.info("趋势分析已更新: 新增 %d 条快照，重新计算 %d 个问题，窗口内 %d 个问题 × %d 次爬取",
+                    len(rows), len(affected), len(self.question_ids), len(self.times))
+        return len(rows)
+
+    def top_risers(self, limit: Optional[int] = None, by: str = 'rank_velocity',
+                   on_list_only: bool = True) -> List[Dict]:
+        """
+        获取上升最快的问题
+
+        Args:
+            limit: 返回条数
+            by: 排序指标，rank_velocity（每小时上升名次）或 hot_growth（每小时热度增长率）
+            on_list_only: 是否只包含最近一次爬取仍在榜上的问题
+
+        Returns:
+            问题指标列表
+        """
+        limit = limit or ANALYTICS_CONFIG['top_limit']
+        values = self.metrics[by]
+        candidates = self.metrics['present'].copy()
+        if on_list_only:
+            candidates &= self.metrics['on_list']
+        candidates &= ~np.isnan(values)
+
+        idx = np.flatnonzero(candidates)
+        if not len(idx):
+            return []
+
+        # argpartition 取前 limit 个后再排序，避免对全部问题排序
+        k = min(limit, len(idx))
+        top = idx[np.argpartition(-values[idx], k - 1)[:k]]
+        top = top[np.argsort(-values[top])]
+        return [self._row_stats(i) for i in top]
+
+    def question_stats(self, question_id: str) -> Optional[Dict]:
+        """
+        获取单个问题在窗口内的指标
+
+        Args:
+            question_id: 问题ID
+
+        Returns:
+            指标字典，问题不在窗口内时返回None
+        """
+        i = self._question_index.get(question_id)
+        if i is None or not self.metrics['present'][i]:
+            return None
+        return self._row_stats(i)
+
+    def events(self, since: Optional[datetime] = None) -> List[Dict]:
+        """
+        计算上榜/下榜事件
+
+        Args:
+            since: 只返回该时间之后的事件
+
+        Returns:
+            按时间排序的事件列表
+        """
+        if self._rank.shape[1] < 2:
+            return []
+
+        mask = self._rank != ABSENT
+        entered = mask[:, 1:] & ~mask[:, :-1]
+        exited = ~mask[:, 1:] & mask[:, :-1]
+
+        events = []
+        for event_type, matrix in (('entry', entered), ('exit', exited)):
+            rows, cols = np.nonzero(matrix)
+            cols = cols + 1
+            if since is not None:
+                keep = self.times[cols] > np.datetime64(since)
+                rows, cols = rows[keep], cols[keep]
+            # 上榜事件取当次排名，下榜事件取下榜前的最后排名
+            ranks = self._rank[rows, cols if event_type == 'entry' else cols - 1]
+            for row, col, rank in zip(rows.tolist(), cols.tolist(), ranks.tolist()):
+                events.append({
+                    'type': event_type,
+                    'question_id': self.question_ids[row],
+                    'crawl_time': self.times[col].astype(datetime),
+                    'rank': rank
+                })
+
+        events.sort(key=lambda e: e['crawl_time'])
+        return events
+
+    def _append(self, rows: List[tuple]) -> set:
+        """将新快照追加为矩阵的新列，返回受影响的行号集合"""
+        new_times = sorted({row[1] for row in rows})
+        col_offset = len(self.times)
+        col_index = {t: col_offset + i for i, t in enumerate(new_times)}
+
+        for question_id, _, _, _ in rows:
+            if question_id not in self._question_index:
+                self._question_index[question_id] = len(self.question_ids)
+                self.question_ids.append(question_id)
+
+        n_rows = len(self.question_ids)
+        n_cols = col_offset + len(new_times)
+        rank = np.zeros((n_rows, n_cols), dtype=np.int16)
+        hot = np.full((n_rows, n_cols), np.nan, dtype=np.float32)
+        old_rows, old_cols = self._rank.shape
+        rank[:old_rows, :old_cols] = self._rank
+        hot[:old_rows, :old_cols] = self._hot
+
+        r = np.fromiter((self._question_index[row[0]] for row in rows), dtype=np.int64, count=len(rows))
+        c = np.fromiter((col_index[row[1]] for row in rows), dtype=np.int64, count=len(rows))
+        ranks = np.fromiter((row[2] or 0 for row in rows), dtype=np.int64, count=len(rows))
+        # 缺失排名记为不在榜上；越界的排名截断到 [1, MAX_RANK]，直接转换为 int16 会溢出成负数
+        out_of_range = (ranks != ABSENT) & ((ranks < 1) | (ranks > MAX_RANK))
+        if out_of_range.any():
+            logger.warning("%d 条快照的排名超出范围，已截断到 1~%d", int(out_of_range.sum()), MAX_RANK)
+            ranks[out_of_range] = np.clip(ranks[out_of_range], 1, MAX_RANK)
+        rank[r, c] = ranks
+        hot[r, c] = np.fromiter((row[3] or 0.0 for row in rows), dtype=np.float32, count=len(rows))
+
+        # 上一次爬取在榜的问题若未出现在新爬取中，其下榜状态也会改变
+        affected = set(r.tolist())
+        if old_cols:
+            affected.update(np.flatnonzero(self._rank[:, -1] != ABSENT).tolist())
+
+        self._rank, self._hot = rank, hot
+        self.times = np.concatenate([self.times, np.array(new_times, dtype='datetime64[us]')])
+
+        metrics = self._empty_metrics(n_rows)
+        for key, values in self.metrics.items():
+            metrics[key][:len(values)] = values
+        self.metrics = metrics
+        return affected
+
+    def _evict(self) -> set:
+        """淘汰滑出时间窗口的列，返回受影响的行号集合"""
+        window_start = self.times[-1] - np.timedelta64(self.window)
+        cut = int(np.searchsorted(self.times, window_start, side='left'))
+        if cut == 0:
+            return set()
+
+        affected = set(np.flatnonzero((self._rank[:, :cut] != ABSENT).any(axis=1)).tolist())
+        self._rank = self._rank[:, cut:]
+        self._hot = self._hot[:, cut:]
+        self.times = self.times[cut:]
+        return affected
+
+    def _compact(self):
+        """移除已完全滑出窗口的问题行，超过半数行失效时才执行"""
+        present = self.metrics['present']
+        if present.all() or present.sum() * 2 > len(present):
+            return
+
+        keep = np.flatnonzero(present)
+        self._rank = self._rank[keep]
+        self._hot = self._hot[keep]
+        self.metrics = {key: values[keep] for key, values in self.metrics.items()}
+        self.question_ids = [self.question_ids[i] for i in keep.tolist()]
+        self._question_index = {question_id: i for i, question_id in enumerate(self.question_ids)}
+
+    def _compute(self, rows: np.ndarray):
+        """对指定行向量化计算全部指标"""
+        if not len(rows) or not len(self.times):
+            return
+
+        rank = self._rank[rows]
+        hot = self._hot[rows]
+        mask = rank != ABSENT
+        n_cols = mask.shape[1]
+        ar = np.arange(len(rows))
+
+        present = mask.any(axis=1)
+        first = mask.argmax(axis=1)
+        last = n_cols - 1 - mask[:, ::-1].argmax(axis=1)
+
+        hours = (self.times[last] - self.times[first]) / np.timedelta64(1, 'h')
+        span = np.where(hours > 0, hours, np.nan)
+
+        first_rank = rank[ar, first].astype(np.float64)
+        last_rank = rank[ar, last].astype(np.float64)
+        velocity = np.where(hours > 0, (first_rank - last_rank) / span, 0.0)
+
+        first_hot = hot[ar, first].astype(np.float64)
+        last_hot = hot[ar, last].astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth = np.where((hours > 0) & (first_hot > 0), (last_hot - first_hot) / first_hot / span, np.nan)
+
+        # 每次爬取代表的时长：到下一次爬取的间隔，最后一次取间隔中位数
+        intervals = np.diff(self.times) / np.timedelta64(1, 'h')
+        tail = np.median(intervals) if len(intervals) else 0.0
+        durations = np.append(intervals, tail)
+
+        m = self.metrics
+        m['present'][rows] = present
+        m['on_list'][rows] = mask[:, -1]
+        m['first_seen'][rows] = np.where(present, self.times[first], np.datetime64('NaT'))
+        m['last_seen'][rows] = np.where(present, self.times[last], np.datetime64('NaT'))
+        m['peak_rank'][rows] = np.where(mask, rank, RANK_SENTINEL).min(axis=1)
+        m['current_rank'][rows] = rank[:, -1]
+        m['rank_velocity'][rows] = np.where(present, velocity, np.nan)
+        m['hot_growth'][rows] = growth
+        m['hot_index'][rows] = np.where(present, last_hot, np.nan)
+        m['time_on_list'][rows] = mask.astype(np.float64) @ durations
+        m['entries'][rows] = (mask[:, 1:] & ~mask[:, :-1]).sum(axis=1) + mask[:, 0]
+        m['exits'][rows] = (~mask[:, 1:] & mask[:, :-1]).sum(axis=1)
+
+    @staticmethod
+    def _empty_metrics(n: int) -> Dict[str, np.ndarray]:
+        """创建指标数组"""
+        return {
+            'present': np.zeros(n, dtype=bool),
+            'on_list': np.zeros(n, dtype=bool),
+            'first_seen': np.full(n, np.datetime64('NaT'), dtype='datetime64[us]'),
+            'last_seen': np.full(n, np.datetime64('NaT'), dtype='datetime64[us]'),
+            'peak_rank': np.zeros(n, dtype=np.int16),
+            'current_rank': np.zeros(n, dtype=np.int16),
+            'rank_velocity': np.full(n, np.nan),
+            'hot_growth': np.full(n, np.nan),
+            'hot_index': np.full(n, np.nan),
+            'time_on_list': np.zeros(n),
+            'entries': np.zeros(n, dtype=np.int32),
+            'exits': np.zeros(n, dtype=np.int32)
+        }
+
+    def _row_stats(self, i: int) -> Dict:
+        """将单个问题的指标转换为字典"""
+        m = self.metrics
+        return {
+            'question_id': self.question_ids[i],
+            'current_rank': int(m['current_rank'][i]) or None,
+            'peak_rank': int(m['peak_rank'][i]),
+            'rank_velocity': float(m['rank_velocity'][i]),
+            'hot_growth': None if np.isnan(m['hot_growth'][i]) else float(m['hot_growth'][i]),
+            'hot_index': float(m['hot_index'][i]),
+            'time_on_list_hours': float(m['time_on_list'][i]),
+            'first_seen': m['first_seen'][i].astype(datetime),
+            'last_seen': m['last_seen'][i].astype(datetime),
+            'entries': int(m['entries'][i]),
+            'exits': int(m['exits'][i])
+        }
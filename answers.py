@@ -0,0 +1,223 @@
+"""
+回答爬取模块 - 按游标翻页爬取热榜问题下的回答并增量写入数据库
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from config import ANSWER_CONFIG
+from database import db_manager
+
+logger = logging.getLogger(__name__)
+
+
+def _from_timestamp(value) -> Optional[datetime]:
+    """接口返回的秒级时间戳转换为时间"""
+    try:
+        return datetime.fromtimestamp(int(value)) if value else None
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def parse_answer(data: Dict, question_id: str, crawl_time: datetime,
+                 store_content: bool = True) -> Optional[Dict]:
+    """
+    将接口返回的回答对象转换为数据库行
+
+    Args:
+        data: 回答原始数据
+        question_id: 所属问题ID
+        crawl_time: 爬取时间
+        store_content: 是否保留回答正文
+
+    Returns:
+        回答行，缺少回答ID时返回None
+    """
+    answer_id = data.get('id')
+    if not answer_id:
+        return None
+
+    author = data.get('author') or {}
+    created_at = _from_timestamp(data.get('created_time'))
+    return {
+        'answer_id': str(answer_id),
+        'question_id': str(question_id),
+        'author_id': author.get('url_token') or author.get('id'),
+        'author_name': author.get('name'),
+        'excerpt': data.get('excerpt') or '',
+        'content': data.get('content') if store_content else None,
+        'voteup_count': int(data.get('voteup_count') or 0),
+        'comment_count': int(data.get('comment_count') or 0),
+        'created_at': created_at,
+        'updated_at': _from_timestamp(data.get('updated_time')) or created_at,
+        'crawl_time': crawl_time
+    }
+
+
+class AnswerCrawler:
+    """
+    热榜问题回答爬虫
+
+    回答接口按最后编辑时间倒序返回，每页处理完即写入，内存中只保留一页数据和一个写入批次。
+    问题的回答完整爬取过一遍之后，再次爬取时遇到已保存且未修改的回答即停止翻页，
+    只获取新增和新编辑的回答；上一次爬取中途失败的问题会重新完整翻页，补齐缺失的旧回答。
+    """
+
+    def __init__(self, manager=None, spider_factory: Optional[Callable] = None,
+                 concurrency: Optional[int] = None, config: Optional[Dict] = None):
+        """
+        Args:
+            manager: 数据库管理器，默认使用全局 db_manager
+            spider_factory: 创建爬虫实例的函数，默认为 ZhihuSpider
+            concurrency: 同时爬取的问题数
+            config: 回答爬取配置，默认使用 ANSWER_CONFIG
+        """
+        if spider_factory is None:
+            from scraper import ZhihuSpider
+            spider_factory = ZhihuSpider
+
+        self.db = manager or db_manager
+        self.config = config or ANSWER_CONFIG
+        self.spider_factory = spider_factory
+        self.concurrency = max(1, concurrency or self.config['concurrency'])
+        self._local = threading.local()
+
+    def _spider(self):
+        """当前线程的爬虫实例，requests.Session 不在线程间共享"""
+        spider = getattr(self._local, 'spider', None)
+        if spider is None:
+            spider = self._local.spider = self.spider_factory()
+        return spider
+
+    def crawl_question(self, question_id: str, incremental: bool = True) -> Dict:
+        """
+        爬取单个问题的回答
+
+        Args:
+            question_id: 问题ID
+            incremental: 是否在遇到已保存且未修改的回答时停止翻页，仅在该问题已完整爬取过时生效
+
+        Returns:
+            统计字典：pages、answers（写入行数）、stopped_early，因 max_pages 未完整翻页时含 truncated，
+            失败时含 error
+        """
+        started = datetime.now()
+        batch_size = self.config['batch_size']
+        store_content = self.config['store_content']
+        stats = {'question_id': question_id, 'pages': 0, 'answers': 0, 'stopped_early': False}
+
+        if incremental:
+            item = self.db.get_items_by_question_ids([question_id]).get(question_id)
+            incremental = item is not None and item.answers_crawled_time is not None
+
+        buffer = []
+        try:
+            pages = self._spider().iter_answer_pages(
+                question_id, page_size=self.config['page_size'], max_pages=self.config['max_pages']
+            )
+            truncated = False
+            while True:
+                try:
+                    page = next(pages)
+                except StopIteration as stop:
+                    # 达到 max_pages 时还有后续页面，本次没有完整翻页
+                    truncated = bool(stop.value)
+                    break
+                stats['pages'] += 1
+                rows = [row for row in (parse_answer(data, question_id, started, store_content)
+                                        for data in page) if row]
+                buffer.extend(rows)
+
+                reached_known = False
+                if incremental and rows:
+                    versions = self.db.get_answer_versions([row['answer_id'] for row in rows])
+                    reached_known = any(
+                        row['answer_id'] in versions and versions[row['answer_id']] == row['updated_at']
+                        for row in rows
+                    )
+
+                if len(buffer) >= batch_size:
+                    stats['answers'] += self.db.upsert_answers(buffer)
+                    buffer = []
+                if reached_known:
+                    # 回答按编辑时间倒序，之后的页面都是已保存且未修改的回答
+                    stats['stopped_early'] = True
+                    pages.close()
+                    break
+
+            stats['answers'] += self.db.upsert_answers(buffer)
+            if truncated:
+                stats['truncated'] = True
+            else:
+                self.db.mark_answers_crawled(question_id, started)
+        except Exception as e:
+            # 已写入的批次保留；未标记完整爬取，下次会重新完整翻页
+            stats['error'] = str(e)
+            logger.error("爬取问题 %s 的回答失败: %s", question_id, e)
+            return stats
+
+        logger.info("问题 %s 回答爬取完成: %d 页，写入 %d 条%s", question_id, stats['pages'],
+                    stats['answers'], '（遇到已保存的回答提前停止）' if stats['stopped_early'] else '')
+        return stats
+
+    def crawl_questions(self, question_ids: List[str], incremental: bool = True) -> Dict:
+        """
+        并发爬取多个问题的回答
+
+        Args:
+            question_ids: 问题ID列表
+            incremental: 是否增量爬取
+
+        Returns:
+            汇总统计：questions、answers、failed 及每个问题的统计 results
+        """
+        question_ids = list(dict.fromkeys(question_ids))
+        if not question_ids:
+            return {'questions': 0, 'answers': 0, 'failed': [], 'results': []}
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(question_ids)),
+                                thread_name_prefix='answers') as executor:
+            results = list(executor.map(lambda qid: self.crawl_question(qid, incremental), question_ids))
+
+        summary = {
+            'questions': len(results),
+            'answers': sum(result['answers'] for result in results),
+            'failed': [result['question_id'] for result in results if 'error' in result],
+            'results': results
+        }
+        logger.info("回答爬取完成: %d 个问题，写入 %d 条回答，失败 %d 个",
+                    summary['questions'], summary['answers'], len(summary['failed']))
+        return summary
+
+    def top_question_ids(self, n: Optional[int] = None) -> List[str]:
+        """
+        最近一次爬取中排名前N的问题ID
+
+        Args:
+            n: 问题数，默认使用配置中的 top_n
+
+        Returns:
+            按排名排序的问题ID列表
+        """
+        n = n or self.config['top_n']
+        latest = self.db.get_latest_crawl_time()
+        if latest is None:
+            return []
+        rows = self.db.get_snapshot_rows(since=latest)
+        rows.sort(key=lambda row: (row[2] is None, row[2] or 0))
+        return [row[0] for row in rows[:n]]
+
+    def crawl_top(self, n: Optional[int] = None, incremental: bool = True) -> Dict:
+        """
+        爬取最近一次热榜中排名前N的问题的回答
+
+        Args:
+            n: 问题数，默认使用配置中的 top_n
+            incremental: 是否增量爬取
+
+        Returns:
+            汇总统计，见 crawl_questions
+        """
+        return self.crawl_questions(self.top_question_ids(n), incremental)
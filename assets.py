@@ -0,0 +1,371 @@
+"""
+图片素材模块 - 在后台并发下载热榜条目的缩略图和封面图，按内容哈希去重存储
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from config import MEDIA_CONFIG, SPIDER_CONFIG
+from proxies import ProxyPool, get_proxy_pool, is_ban_response
+from telemetry import mount_instrumented_adapter
+from utils import ensure_directory
+
+logger = logging.getLogger(__name__)
+
+INDEX_LOG = 'index.jsonl'
+OBJECTS_DIR = 'objects'
+
+CONTENT_TYPE_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp'
+}
+
+
+class AssetStore:
+    """
+    按内容寻址的图片存储
+
+    图片以内容的 SHA-256 命名保存在 objects/<哈希前两位>/ 下，同一张图片无论被多少条目、
+    多少个链接引用都只保存一份。每个链接的校验信息（ETag、Last-Modified、内容哈希、
+    上次检查时间）和每个问题引用的链接追加到 index.jsonl，加载时重放，以最后一条为准；
+    日志行数远多于有效条目时重写日志。
+    """
+
+    def __init__(self, data_dir: str, compact_ratio: int = 4):
+        """
+        Args:
+            data_dir: 存储目录
+            compact_ratio: 日志行数超过有效条目数的多少倍时重写日志
+        """
+        self.data_dir = data_dir
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()
+        ensure_directory(os.path.join(self.data_dir, OBJECTS_DIR))
+        self.load()
+
+    def load(self):
+        """重放索引日志"""
+        with self._lock:
+            self._urls = {}
+            self._questions = {}
+            self._log_lines = 0
+            log_path = os.path.join(self.data_dir, INDEX_LOG)
+            if not os.path.exists(log_path):
+                return
+            with open(log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # 写入中途中断留下的半行
+                        continue
+                    self._apply(entry)
+                    self._log_lines += 1
+
+    def _apply(self, entry: Dict):
+        if 'q' in entry:
+            self._questions[entry['q']] = entry['urls']
+        else:
+            self._urls[entry['url']] = entry
+
+    def _append(self, entry: Dict):
+        """在锁内调用：应用并追加一条日志"""
+        self._apply(entry)
+        with open(os.path.join(self.data_dir, INDEX_LOG), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._log_lines += 1
+        if self._log_lines > self.compact_ratio * max(256, len(self._urls) + len(self._questions)):
+            self._compact()
+
+    def _compact(self):
+        """只保留每个链接和问题的最新条目，重写索引日志"""
+        log_path = os.path.join(self.data_dir, INDEX_LOG)
+        tmp_path = log_path + '.tmp'
+        entries = list(self._urls.values()) + [{'q': q, 'urls': urls} for q, urls in self._questions.items()]
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, log_path)
+        self._log_lines = len(entries)
+
+    def get(self, url: str) -> Optional[Dict]:
+        """链接的校验信息，未下载过时返回None"""
+        with self._lock:
+            return self._urls.get(url)
+
+    def record(self, url: str, meta: Dict):
+        """
+        记录链接的校验信息
+
+        Args:
+            url: 图片链接
+            meta: 含 sha256、ext、etag、last_modified、size、checked 的字典
+        """
+        with self._lock:
+            self._append(dict(meta, url=url))
+
+    def link(self, question_id: str, urls: Iterable[str]):
+        """记录问题引用的图片链接，与上次相同时不写日志"""
+        urls = list(urls)
+        with self._lock:
+            if self._questions.get(question_id) != urls:
+                self._append({'q': question_id, 'urls': urls})
+
+    def object_path(self, sha256: str, ext: str = '') -> str:
+        """内容哈希对应的文件路径"""
+        return os.path.join(self.data_dir, OBJECTS_DIR, sha256[:2], sha256 + ext)
+
+    def has(self, meta: Optional[Dict]) -> bool:
+        """校验信息对应的图片文件是否存在"""
+        return bool(meta and meta.get('sha256')) and \
+            os.path.exists(self.object_path(meta['sha256'], meta.get('ext', '')))
+
+    def put(self, temp_path: str, sha256: str, ext: str = '') -> bool:
+        """
+        将下载完成的临时文件移入存储
+
+        Args:
+            temp_path: 临时文件路径，调用后不再存在
+            sha256: 文件内容的哈希
+            ext: 扩展名
+
+        Returns:
+            是否新增了文件，内容已存在时返回False
+        """
+        path = self.object_path(sha256, ext)
+        with self._lock:
+            # 并发下载的同一内容只有一个能移入
+            if os.path.exists(path):
+                os.remove(temp_path)
+                return False
+            ensure_directory(os.path.dirname(path))
+            os.replace(temp_path, path)
+            return True
+
+    def assets_for(self, question_id: str) -> List[Dict]:
+        """
+        问题引用的图片
+
+        Returns:
+            已下载的图片的校验信息列表，含文件路径 path
+        """
+        with self._lock:
+            metas = [self._urls.get(url) for url in self._questions.get(question_id, [])]
+        return [dict(meta, path=self.object_path(meta['sha256'], meta.get('ext', '')))
+                for meta in metas if meta and meta.get('sha256')]
+
+    def stats(self) -> Dict:
+        """链接数、问题数和去重后的文件数"""
+        with self._lock:
+            return {
+                'urls': len(self._urls),
+                'questions': len(self._questions),
+                'objects': len({meta['sha256'] for meta in self._urls.values() if meta.get('sha256')})
+            }
+
+
+class AssetFetcher:
+    """
+    后台图片下载器
+
+    submit 只把需要下载的链接交给有界线程池后立即返回，热榜的解析和写入不等待图片下载。
+    在 recheck_seconds 内检查过的链接不发请求；到期后带 If-None-Match / If-Modified-Since
+    发条件请求，未修改的图片只消耗一次 304 响应。排队的下载数达到 max_pending 时，
+    多出的链接留到下一次爬取再提交。
+    """
+
+    def __init__(self, store: Optional[AssetStore] = None, config: Optional[Dict] = None,
+                 proxy_pool: Optional[ProxyPool] = None, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            store: 图片存储，默认按配置的目录创建
+            config: 图片素材配置，默认使用 MEDIA_CONFIG
+            proxy_pool: 出口代理池，默认使用共享代理池，未配置代理时直连
+            clock: 时钟，测试时可替换
+        """
+        self.config = config or MEDIA_CONFIG
+        self.store = store or AssetStore(self.config['data_dir'])
+        self.proxy_pool = proxy_pool if proxy_pool is not None else get_proxy_pool()
+        self.clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=max(1, self.config['concurrency']),
+                                            thread_name_prefix='media')
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._adapters = []
+        self._stats = {'downloaded': 0, 'deduplicated': 0, 'not_modified': 0,
+                       'fresh': 0, 'dropped': 0, 'failed': 0, 'bytes': 0}
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+
+    def submit(self, items: Iterable) -> int:
+        """
+        提交热榜条目中的图片链接，不等待下载完成
+
+        Args:
+            items: 含 question_id 和 image_urls 的热榜条目
+
+        Returns:
+            本次交给线程池下载的链接数
+        """
+        queued = 0
+        for item in items:
+            urls = tuple(item.get('image_urls') or ())
+            if not urls:
+                continue
+            self.store.link(item.get('question_id'), urls)
+            for url in urls:
+                with self._lock:
+                    if url in self._pending:
+                        continue
+                    if not self._due(url):
+                        self._stats['fresh'] += 1
+                        continue
+                    if len(self._pending) >= self.config['max_pending']:
+                        self._stats['dropped'] += 1
+                        continue
+                    self._pending.add(url)
+                self._executor.submit(self._fetch, url)
+                queued += 1
+        if queued:
+            logger.info("提交 %d 个图片下载", queued)
+        return queued
+
+    def _due(self, url: str) -> bool:
+        """链接是否需要检查：未下载过、文件丢失或距离上次检查已超过 recheck_seconds"""
+        meta = self.store.get(url)
+        if not self.store.has(meta):
+            return True
+        return self.clock() - meta.get('checked', 0) >= self.config['recheck_seconds']
+
+    def _session(self) -> requests.Session:
+        """当前线程的下载会话，requests.Session 不在线程间共享"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            # 图片分布在多个 CDN 主机上，每个主机 × 出口代理各占一个连接池
+            self._local.adapter = mount_instrumented_adapter(
+                session, expected_pools=4 * (len(self.proxy_pool) if self.proxy_pool else 1), pool_maxsize=1)
+            with self._lock:
+                self._adapters.append(self._local.adapter)
+            session.headers['User-Agent'] = SPIDER_CONFIG['headers'].get('User-Agent', '')
+            session.headers['Referer'] = self.config['referer']
+        else:
+            # 当前线程没有进行中的下载，可以安全地调整连接池数
+            self._local.adapter.adapt()
+        return session
+
+    def _fetch(self, url: str):
+        try:
+            self._count(self.fetch(url))
+        except Exception as e:
+            self._count('failed')
+            logger.warning("下载图片失败: %s, %s", url, e)
+        finally:
+            with self._lock:
+                self._pending.discard(url)
+
+    def fetch(self, url: str) -> str:
+        """
+        下载单个图片
+
+        Args:
+            url: 图片链接
+
+        Returns:
+            downloaded（新文件）、deduplicated（内容已存在）或 not_modified（304）
+        """
+        meta = self.store.get(url)
+        headers = {}
+        if self.store.has(meta):
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        proxy = self.proxy_pool.acquire(urlsplit(url).hostname) if self.proxy_pool else None
+        started = time.monotonic()
+        status = None
+        try:
+            with self._session().get(url, headers=headers, timeout=SPIDER_CONFIG['timeout'], stream=True,
+                                     proxies=proxy.requests_kwargs if proxy else None) as response:
+                status = response.status_code
+                if status == 304:
+                    self.store.record(url, dict(meta, checked=self.clock()))
+                    return 'not_modified'
+                response.raise_for_status()
+
+                content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+                ext = CONTENT_TYPE_EXTENSIONS.get(content_type) or os.path.splitext(urlsplit(url).path)[1][:8]
+                temp_path, sha256, size = self._download(response)
+                created = self.store.put(temp_path, sha256, ext)
+                self.store.record(url, {
+                    'sha256': sha256,
+                    'ext': ext,
+                    'size': size,
+                    'content_type': content_type,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'checked': self.clock()
+                })
+                self._count('bytes', size)
+                return 'downloaded' if created else 'deduplicated'
+        finally:
+            if self.proxy_pool:
+                self.proxy_pool.release(proxy, time.monotonic() - started,
+                                        ok=status is not None and status < 500,
+                                        banned=status is not None and is_ban_response(status, url))
+
+    def _download(self, response: requests.Response) -> tuple:
+        """边下载边计算哈希，写入存储目录下的临时文件，返回 (临时文件路径, 哈希, 字节数)"""
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.store.data_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=65536):
+                    size += len(chunk)
+                    if size > self.config['max_bytes']:
+                        raise ValueError(f"图片超过大小上限 {self.config['max_bytes']} 字节")
+                    digest.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return temp_path, digest.hexdigest(), size
+
+    def stats(self) -> Dict:
+        """下载统计和存储统计"""
+        with self._lock:
+            stats = dict(self._stats, pending=len(self._pending))
+        stats.update(self.store.stats())
+        with self._lock:
+            http = [adapter.stats() for adapter in self._adapters]
+        stats['http'] = {key: sum(entry[key] for entry in http)
+                         for key in ('requests', 'connections', 'evictions')}
+        return stats
+
+    def close(self, wait: bool = True):
+        """
+        关闭下载线程池
+
+        Args:
+            wait: 是否等待已提交的下载完成
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,135 @@
+"""
+异步数据库操作模块 - 基于SQLAlchemy异步引擎的热榜数据读写
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from cache import MISSING
+from config import ASYNC_DATABASE_CONFIG
+from backends import PostgresBackend, StorageBackend, build_database_url, build_upsert_rows
+from database import CrawlWriteMixin
+from models import ZhihuHotItem
+
+logger = logging.getLogger(__name__)
+
+class AsyncDatabaseManager(CrawlWriteMixin):
+    """
+    异步数据库管理器
+
+    与 DatabaseManager 提供相同语义的 save_hot_items / get_hot_items，写入与同步管理器
+    共用同一路径：同一事务中更新汇总表并批量upsert条目和快照，提交后刷新查询缓存、
+    检索索引和列式快照。asyncpg驱动会缓存预编译语句，并将同一批次的多组参数以流水线
+    方式发送，不必逐条等待往返。
+    """
+
+    def __init__(self, url: Optional[str] = None, backend: Optional[StorageBackend] = None):
+        """
+        Args:
+            url: 异步驱动的连接字符串，默认按 ASYNC_DATABASE_CONFIG['driver'] 构建PostgreSQL连接
+            backend: 生成upsert语句的存储后端，须与 url 的数据库一致，默认PostgreSQL
+        """
+        self.backend = backend or PostgresBackend()
+        engine_kwargs = {'pool_recycle': 3600}
+        if self.backend.name == 'postgresql':
+            engine_kwargs.update(pool_size=ASYNC_DATABASE_CONFIG['pool_size'],
+                                 max_overflow=ASYNC_DATABASE_CONFIG['max_overflow'])
+        self.engine = create_async_engine(
+            url or build_database_url(ASYNC_DATABASE_CONFIG['driver']),
+            echo=False,
+            **engine_kwargs
+        )
+        self.backend.configure_engine(self.engine.sync_engine)
+        self.SessionLocal = async_sessionmaker(
+            bind=self.engine,
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False
+        )
+        self._init_write_hooks()
+        logger.info("异步数据库连接初始化成功")
+
+    async def create_tables(self):
+        """创建数据表"""
+        async with self.engine.begin() as conn:
+            await conn.run_sync(self._create_schema)
+        logger.info("数据表创建成功")
+
+    @asynccontextmanager
+    async def get_session(self):
+        """获取异步数据库会话上下文管理器"""
+        async with self.SessionLocal() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                logger.error("数据库操作失败: %s", e)
+                raise
+
+    async def save_hot_items(self, items: List[dict], crawl_time: Optional[datetime] = None) -> int:
+        """
+        批量保存热榜数据，并为本次爬取写入历史快照
+
+        Args:
+            items: 热榜数据列表
+            crawl_time: 爬取时间，默认为当前时间
+
+        Returns:
+            成功保存的条目数量
+        """
+        if not items:
+            return 0
+
+        crawl_time = crawl_time or datetime.now()
+        item_rows, snapshot_rows = build_upsert_rows(items, crawl_time)
+        if not item_rows:
+            return 0
+
+        async with self.get_session() as session:
+            await session.run_sync(self._write_crawl, item_rows, snapshot_rows, crawl_time,
+                                   ASYNC_DATABASE_CONFIG['batch_size'])
+
+        # 检索索引和列式快照的更新是阻塞的文件读写，放到线程中执行，不阻塞事件循环
+        await asyncio.to_thread(self._after_commit, items, item_rows, snapshot_rows, crawl_time)
+        logger.info("成功保存 %d 条热榜数据", len(item_rows))
+        return len(item_rows)
+
+    async def get_hot_items(self, limit: Optional[int] = None) -> List[ZhihuHotItem]:
+        """
+        获取热榜数据
+
+        Args:
+            limit: 限制返回数量
+
+        Returns:
+            热榜数据列表。启用查询缓存时列表是新建的，其中已分离的 ORM 对象与缓存及其他调用方共享，
+            调用方不应修改其属性
+        """
+        generation = None
+        if self.query_cache is not None:
+            generation = self.query_cache.generation
+            cached = self.query_cache.get('hot_items', {'limit': limit}, generation=generation)
+            if cached is not MISSING:
+                return list(cached)
+
+        stmt = select(ZhihuHotItem).order_by(ZhihuHotItem.created_time.desc())
+        if limit:
+            stmt = stmt.limit(limit)
+
+        async with self.get_session() as session:
+            items = list((await session.scalars(stmt)).all())
+
+        if self.query_cache is not None:
+            self.query_cache.put('hot_items', {'limit': limit}, items, generation=generation)
+        return list(items)
+
+    async def close(self):
+        """释放连接池"""
+        await self.engine.dispose()
+        logger.info("异步数据库连接已关闭")
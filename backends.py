@@ -0,0 +1,324 @@
+"""
+存储后端模块 - 封装不同数据库的连接方式和原生批量upsert
+"""
+import logging
+from datetime import datetime
+from operator import attrgetter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, event, func, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateColumn
+
+from config import DATABASE_CONFIG, POOL_CONFIG
+from models import Base, ZhihuAnswer, ZhihuHotItem, ZhihuHotSnapshot, ZhihuWatchHit
+from records import HotItem
+from telemetry import InstrumentedQueuePool, adaptive_pool_size
+
+logger = logging.getLogger(__name__)
+
+# upsert时写入的字段及缺省值
+ITEM_FIELDS = {
+    'question_id': None,
+    'title': None,
+    'excerpt': '',
+    'url': '',
+    'hot_index': 0.0,
+    'answer_count': 0,
+    'follower_count': 0
+}
+_get_item_fields = attrgetter(*ITEM_FIELDS)
+
+
+def build_database_url(drivername: str = 'postgresql', config: Optional[Dict] = None) -> str:
+    """
+    构建PostgreSQL数据库连接字符串
+
+    Args:
+        drivername: SQLAlchemy驱动名，如 postgresql、postgresql+asyncpg
+        config: 数据库配置，默认使用 DATABASE_CONFIG
+
+    Returns:
+        数据库连接字符串
+    """
+    config = config or DATABASE_CONFIG
+    return (
+        f"{drivername}://{config['username']}:"
+        f"{config['password']}@{config['host']}:"
+        f"{config['port']}/{config['database']}"
+    )
+
+
+def build_upsert_rows(items: List[dict], crawl_time: datetime) -> Tuple[List[Dict], List[Dict]]:
+    """
+    规范化待写入的数据行
+
+    同一问题在一批数据中出现多次时以最后一次为准，与逐条更新的结果一致
+
+    Args:
+        items: 热榜数据列表
+        crawl_time: 本次爬取时间
+
+    Returns:
+        (热榜条目行列表, 历史快照行列表)
+    """
+    latest = {}
+    for position, item_data in enumerate(items, 1):
+        question_id = item_data.get('question_id')
+        if not question_id:
+            logger.error("保存热榜条目失败: 缺少question_id, 数据: %s", item_data)
+            continue
+        latest.pop(question_id, None)
+        latest[question_id] = (position, item_data)
+
+    item_rows = []
+    snapshot_rows = []
+    for question_id, (position, item_data) in latest.items():
+        if isinstance(item_data, HotItem):
+            row = dict(zip(ITEM_FIELDS, _get_item_fields(item_data)))
+        else:
+            row = {field: item_data.get(field, default) for field, default in ITEM_FIELDS.items()}
+        row['cluster_id'] = item_data.get('cluster_id')
+        row['updated_time'] = crawl_time
+        item_rows.append(row)
+        snapshot_rows.append({
+            'question_id': question_id,
+            'crawl_time': crawl_time,
+            'rank': item_data.get('rank') or position,
+            'hot_index': row['hot_index'],
+            'answer_count': row['answer_count'],
+            'follower_count': row['follower_count']
+        })
+    return item_rows, snapshot_rows
+
+
+class StorageBackend:
+    """存储后端基类"""
+
+    name = None
+    # 是否支持 PostgreSQL COPY 批量导入
+    supports_copy = False
+    # 是否支持 SELECT ... FOR UPDATE SKIP LOCKED
+    supports_skip_locked = False
+    # 对应方言的 INSERT 构造函数，需支持 on_conflict_do_update / on_conflict_do_nothing
+    insert = staticmethod(postgresql.insert)
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = config or DATABASE_CONFIG
+
+    def url(self) -> str:
+        """SQLAlchemy连接字符串"""
+        raise NotImplementedError
+
+    def engine_kwargs(self) -> Dict:
+        """create_engine 的额外参数"""
+        return {}
+
+    def configure_engine(self, engine):
+        """引擎创建后的初始化（注册连接事件等）"""
+
+    def prepare_schema(self, connection):
+        """create_all 之前的准备工作，在建表的同一事务中执行"""
+
+    def item_upsert_statement(self):
+        """
+        热榜条目的批量upsert语句
+
+        已存在的条目只在新数据不早于现有数据时才被覆盖，导入旧数据时不会回退较新的记录；
+        未聚类的数据不会清空已分配的事件簇ID
+        """
+        table = ZhihuHotItem.__table__
+        stmt = self.insert(table)
+        update_fields = [field for field in ITEM_FIELDS if field != 'question_id'] + ['updated_time']
+        set_ = {field: stmt.excluded[field] for field in update_fields}
+        set_['cluster_id'] = func.coalesce(stmt.excluded.cluster_id, table.c.cluster_id)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.question_id],
+            set_=set_,
+            where=(table.c.updated_time.is_(None)) | (table.c.updated_time <= stmt.excluded.updated_time)
+        )
+
+    def snapshot_insert_statement(self):
+        """历史快照的批量插入语句，按 (question_id, crawl_time) 幂等"""
+        table = ZhihuHotSnapshot.__table__
+        return self.insert(table).on_conflict_do_nothing(
+            index_elements=[table.c.question_id, table.c.crawl_time]
+        )
+
+    def rollup_upsert_statement(self, table):
+        """统计汇总表的累加upsert语句，计数和热度合计相加，最高热度取较大值"""
+        stmt = self.insert(table)
+        set_ = {column: table.c[column] + stmt.excluded[column] for column in
+                ('crawl_count', 'entry_count', 'entered_count', 'exited_count', 'new_question_count', 'hot_sum')}
+        set_['hot_max'] = case((stmt.excluded.hot_max > table.c.hot_max, stmt.excluded.hot_max),
+                               else_=table.c.hot_max)
+        return stmt.on_conflict_do_update(index_elements=[table.c.bucket], set_=set_)
+
+    def snapshot_bucket_upsert_statement(self, table):
+        """
+        降采样排名历史的合并upsert语句
+
+        快照数相加；首末值按桶内首次/最后爬取时间取较早/较晚的一方，极值取较小/较大值，
+        空值不参与比较。同一时间桶分多批写入时结果与一次写入相同
+        """
+        stmt = self.insert(table)
+        excluded = stmt.excluded
+        earlier = excluded.first_time < table.c.first_time
+        later = excluded.last_time > table.c.last_time
+        set_ = {
+            'sample_count': table.c.sample_count + excluded.sample_count,
+            'first_time': case((earlier, excluded.first_time), else_=table.c.first_time),
+            'last_time': case((later, excluded.last_time), else_=table.c.last_time)
+        }
+        for field in ('first_rank', 'first_hot_index'):
+            set_[field] = case((earlier, excluded[field]), else_=table.c[field])
+        for field in ('last_rank', 'last_hot_index', 'answer_count', 'follower_count'):
+            set_[field] = case((later, excluded[field]), else_=table.c[field])
+        for field in ('min_rank', 'min_hot_index'):
+            set_[field] = case((table.c[field].is_(None) | (excluded[field] < table.c[field]), excluded[field]),
+                               else_=table.c[field])
+        for field in ('max_rank', 'max_hot_index'):
+            set_[field] = case((table.c[field].is_(None) | (excluded[field] > table.c[field]), excluded[field]),
+                               else_=table.c[field])
+        return stmt.on_conflict_do_update(index_elements=[table.c.question_id, table.c.bucket], set_=set_)
+
+    def answer_upsert_statement(self):
+        """
+        回答的批量upsert语句
+
+        赞同数、评论数等计数总是刷新；正文和摘要只在回答编辑时间不早于已存数据时覆盖
+        """
+        table = ZhihuAnswer.__table__
+        stmt = self.insert(table)
+        newer = (table.c.updated_at.is_(None)) | (table.c.updated_at <= stmt.excluded.updated_at)
+        set_ = {field: stmt.excluded[field] for field in
+                ('author_id', 'author_name', 'voteup_count', 'comment_count', 'crawl_time')}
+        for field in ('excerpt', 'content', 'updated_at'):
+            set_[field] = case((newer, stmt.excluded[field]), else_=table.c[field])
+        return stmt.on_conflict_do_update(index_elements=[table.c.answer_id], set_=set_)
+
+    def watch_hit_upsert_statement(self):
+        """关注词命中的批量upsert语句，同一次爬取重复写入不会重复计数"""
+        table = ZhihuWatchHit.__table__
+        stmt = self.insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.question_id, table.c.watchlist, table.c.keyword],
+            set_={
+                'field': stmt.excluded.field,
+                'last_seen': stmt.excluded.last_seen,
+                'hit_count': table.c.hit_count + 1
+            },
+            where=table.c.last_seen < stmt.excluded.last_seen
+        )
+
+    def bulk_upsert(self, connection, item_rows: List[Dict], snapshot_rows: List[Dict],
+                    batch_size: int = 1000):
+        """
+        批量写入热榜条目和历史快照
+
+        Args:
+            connection: 数据库连接或会话
+            item_rows: 热榜条目行列表
+            snapshot_rows: 历史快照行列表
+            batch_size: 每批写入的行数
+        """
+        item_stmt = self.item_upsert_statement()
+        snapshot_stmt = self.snapshot_insert_statement()
+        for start in range(0, len(item_rows), batch_size):
+            connection.execute(item_stmt, item_rows[start:start + batch_size])
+        for start in range(0, len(snapshot_rows), batch_size):
+            connection.execute(snapshot_stmt, snapshot_rows[start:start + batch_size])
+
+
+class PostgresBackend(StorageBackend):
+    """PostgreSQL后端（生产环境）"""
+
+    name = 'postgresql'
+    supports_copy = True
+    supports_skip_locked = True
+    insert = staticmethod(postgresql.insert)
+
+    def url(self) -> str:
+        return build_database_url(config=self.config)
+
+    def engine_kwargs(self) -> Dict:
+        sizes = {'pool_size': POOL_CONFIG['pool_size'], 'max_overflow': POOL_CONFIG['max_overflow']}
+        if POOL_CONFIG['adaptive']:
+            sizes = adaptive_pool_size(self.name, sizes['pool_size'], sizes['max_overflow'])
+            logger.info("自适应连接池: 常驻 %d 个连接，溢出上限 %d 个", sizes['pool_size'], sizes['max_overflow'])
+        kwargs = dict(sizes, pool_recycle=POOL_CONFIG['pool_recycle'])
+        if POOL_CONFIG['telemetry']:
+            kwargs['poolclass'] = InstrumentedQueuePool
+        return kwargs
+
+
+class SQLiteBackend(StorageBackend):
+    """SQLite后端（WAL模式，适合单节点采集）"""
+
+    name = 'sqlite'
+    insert = staticmethod(sqlite.insert)
+
+    def url(self) -> str:
+        return f"sqlite:///{self.config['sqlite_path']}"
+
+    def engine_kwargs(self) -> Dict:
+        return {'connect_args': {'check_same_thread': False, 'timeout': 30}}
+
+    def configure_engine(self, engine):
+        @event.listens_for(engine, 'connect')
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.close()
+
+
+class DuckDBBackend(StorageBackend):
+    """DuckDB后端（列式存储，适合历史数据分析查询），需要安装 duckdb_engine"""
+
+    name = 'duckdb'
+    insert = staticmethod(postgresql.insert)
+
+    def url(self) -> str:
+        return f"duckdb:///{self.config['duckdb_path']}"
+
+    def prepare_schema(self, connection):
+        # DuckDB 不支持 SERIAL，自增主键改用序列实现（见 _duckdb_create_column）
+        for table in Base.metadata.sorted_tables:
+            column = table.autoincrement_column
+            if column is not None:
+                connection.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {table.name}_{column.name}_seq"))
+
+
+@compiles(CreateColumn, 'duckdb')
+def _duckdb_create_column(element, compiler, **kw):
+    """DuckDB建表时将自增主键渲染为序列默认值"""
+    column = element.element
+    if column.table is not None and column is column.table.autoincrement_column:
+        return f"{column.name} INTEGER DEFAULT nextval('{column.table.name}_{column.name}_seq') NOT NULL"
+    return compiler.visit_create_column(element, **kw)
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (PostgresBackend, SQLiteBackend, DuckDBBackend)
+}
+
+
+def create_backend(name: Optional[str] = None, config: Optional[Dict] = None) -> StorageBackend:
+    """
+    按名称创建存储后端
+
+    Args:
+        name: 后端名称，默认读取 DATABASE_CONFIG['backend']
+        config: 数据库配置，默认使用 DATABASE_CONFIG
+
+    Returns:
+        存储后端实例
+    """
+    config = config or DATABASE_CONFIG
+    name = name or config.get('backend', 'postgresql')
+    if name not in BACKENDS:
+        raise ValueError(f"不支持的存储后端: {name}，可选: {', '.join(BACKENDS)}")
+    return BACKENDS[name](config)
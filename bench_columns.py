@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+列式快照基准测试 - 生成按分钟爬取的模拟快照，测量 mmap 列扫描的吞吐并与内存数组的读取带宽对比
+
+用法:
+    python bench_columns.py --days 365 --items 50
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from columnar import ColumnStore
+
+
+def generate(store: ColumnStore, days: int, items: int, questions: int, seed: int = 0):
+    """按天生成每分钟一次爬取的快照并追加到列式存储"""
+    rng = np.random.default_rng(seed)
+    entries = [{'q': str(100000 + n), 't': f'问题{n}'} for n in range(questions)]
+    start = 1704038400  # 2024-01-01
+    per_day = 24 * 60
+    for day in range(days):
+        times = start + (day * per_day + np.arange(per_day, dtype=np.int64)) * 60
+        n = per_day * items
+        store.append_arrays({
+            'question': rng.integers(0, questions, n, dtype=np.uint32),
+            'crawl_time': np.repeat(times, items),
+            'rank': np.tile(np.arange(1, items + 1, dtype=np.int16), per_day),
+            'hot_index': rng.gamma(2.0, 5e5, n),
+            'answer_count': rng.integers(0, 5000, n, dtype=np.int32),
+            'follower_count': rng.integers(0, 50000, n, dtype=np.int32)
+        }, entries if day == 0 else ())
+
+
+def timed(func, repeat: int = 3) -> float:
+    """多次执行取最短耗时"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='列式快照基准测试')
+    parser.add_argument('--days', type=int, default=365, help='模拟的天数（每分钟一次爬取）')
+    parser.add_argument('--items', type=int, default=50, help='每次爬取的条目数')
+    parser.add_argument('--questions', type=int, default=200000, help='不同问题数')
+    parser.add_argument('--dir', help='存储目录，默认使用临时目录并在结束后删除')
+    args = parser.parse_args()
+
+    data_dir = args.dir or tempfile.mkdtemp(prefix='columns-')
+    try:
+        store = ColumnStore(data_dir)
+        if not store.rows:
+            started = time.perf_counter()
+            generate(store, args.days, args.items, args.questions)
+            print(f"生成 {store.rows:,} 行用时 {time.perf_counter() - started:.1f}s")
+
+        columns = store.columns()
+        questions = store.question_count
+        scans = {
+            '全年 hot_index 求和': (('hot_index',), lambda c: float(c['hot_index'].sum())),
+            '全年按问题平均热度': (('question', 'hot_index'), lambda c: np.bincount(
+                c['question'], weights=c['hot_index'], minlength=questions) /
+                np.maximum(np.bincount(c['question'], minlength=questions), 1)),
+            '全年每次爬取回答数之和': (('crawl_time', 'answer_count'), lambda c: np.add.reduceat(
+                c['answer_count'], np.flatnonzero(np.diff(c['crawl_time'], prepend=-1)))),
+        }
+
+        # 参考值：同样大小的内存数组的读取带宽
+        reference = np.asarray(columns['hot_index']).copy()
+        reference_seconds = timed(lambda: float(reference.sum()))
+        reference_bandwidth = reference.nbytes / reference_seconds / 1e9
+        del reference
+
+        print(f"\n{store.rows:,} 行，{questions:,} 个问题；内存数组读取带宽 {reference_bandwidth:.2f} GB/s")
+        print(f"{'扫描':<16}{'数据量(MB)':>12}{'耗时(ms)':>12}{'GB/s':>10}")
+        print("-" * 54)
+        for name, (used, func) in scans.items():
+            nbytes = sum(columns[column].nbytes for column in used)
+            seconds = timed(lambda: func(columns))
+            print(f"{name:<16}{nbytes / 1e6:>12.1f}{seconds * 1000:>12.1f}{nbytes / seconds / 1e9:>10.2f}")
+
+        # 按时间范围扫描：二分查找定位行区间后只读取该区间
+        last = int(columns['crawl_time'][-1])
+        since, until = last - 30 * 86400, last - 29 * 86400
+        seconds = timed(lambda: float(np.nanmax(store.scan(since, until, ['hot_index'])['hot_index'])))
+        rows = store.range(since, until)
+        print(f"\n任意一天的最高热度: {rows.stop - rows.start:,} 行，{seconds * 1000:.2f} ms")
+    finally:
+        if not args.dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
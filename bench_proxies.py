@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+代理池基准测试 - 用本地模拟代理验证总吞吐随代理数增长，以及被封禁的代理会被自动剔除
+
+每个模拟代理同一时间只处理一个请求、每个请求耗时 --service-ms，相当于目标站点对单个出口IP
+的限速；--banned 个代理对所有请求返回 429。
+
+用法:
+    python bench_proxies.py --sizes 1 2 4 8 --requests 400 --threads 16
+"""
+import os
+import sys
+import json
+import logging
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import PROXY_CONFIG
+from identities import Identity, IdentityPool
+from proxies import ProxyPool
+from scraper import ZhihuSpider
+
+TARGET_URL = 'http://www.zhihu.test/api/v4/questions/{n}'
+
+
+def start_proxy(service_seconds: float, banned: bool = False) -> ThreadingHTTPServer:
+    """启动一个模拟出口代理，直接应答经由它转发的请求"""
+    serial = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with serial:
+                time.sleep(service_seconds)
+            status = 429 if banned else 200
+            body = json.dumps({'path': self.path}).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(pool: ProxyPool, total: int, threads: int) -> tuple:
+    """用 threads 个爬虫会话通过代理池发送 total 个请求，返回 (成功数, 耗时)"""
+    local = threading.local()
+    # 不限速的单个身份，吞吐只受代理限制
+    identity_pool = IdentityPool([Identity('bench')])
+
+    def fetch(n):
+        spider = getattr(local, 'spider', None)
+        if spider is None:
+            spider = local.spider = ZhihuSpider(proxy_pool=pool, identity_pool=identity_pool)
+        return spider._make_request(TARGET_URL.format(n=n), max_retries=0) is not None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        succeeded = sum(executor.map(fetch, range(total)))
+    return succeeded, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='代理池基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 2, 4, 8], help='测试的代理数')
+    parser.add_argument('--requests', type=int, default=400, help='每轮请求数')
+    parser.add_argument('--threads', type=int, default=16, help='并发爬虫会话数')
+    parser.add_argument('--service-ms', type=float, default=20, help='模拟代理处理单个请求的耗时')
+    parser.add_argument('--banned', type=int, default=1, help='返回429的代理数')
+    args = parser.parse_args()
+    # 被封禁代理的请求失败日志不影响结果，只输出汇总表
+    logging.basicConfig(level=logging.CRITICAL)
+
+    servers = [start_proxy(args.service_ms / 1000) for _ in range(max(args.sizes))]
+    banned = [start_proxy(args.service_ms / 1000, banned=True) for _ in range(args.banned)]
+    url = lambda server: f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"\n{args.requests} 个请求，{args.threads} 个并发会话，"
+          f"单代理上限约 {1000 / args.service_ms:.0f} req/s，另含 {args.banned} 个返回429的代理")
+    print(f"{'代理数':<8}{'成功':>8}{'耗时(s)':>10}{'req/s':>10}{'剔除':>8}")
+    print("-" * 44)
+    for size in args.sizes:
+        config = dict(PROXY_CONFIG, sticky_hosts=[])
+        pool = ProxyPool([url(server) for server in servers[:size] + banned], config=config)
+        succeeded, seconds = run(pool, args.requests, args.threads)
+        ejected = sum(1 for proxy in pool.stats() if not proxy['healthy'])
+        print(f"{size:<8}{succeeded:>8}{seconds:>10.2f}{succeeded / seconds:>10.1f}{ejected:>8}")
+
+    for server in servers + banned:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+记录类型基准测试 - 比较字典与 HotItem 两种条目表示的内存占用和各阶段耗时
+
+用法:
+    python bench_records.py --items 1000000
+"""
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from datetime import datetime
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backends import build_upsert_rows
+from processor import DataProcessor
+from records import HotItem, to_dicts
+
+
+def generate_fields(count: int, seed: int = 42):
+    """生成模拟的热榜条目字段"""
+    rng = random.Random(seed)
+    for n in range(count):
+        question_id = str(600000000 + n)
+        yield (
+            question_id,
+            f'基准测试问题标题 {question_id} 的讨论',
+            '基准测试摘要内容',
+            f'https://www.zhihu.com/question/{question_id}',
+            rng.uniform(100, 10000),
+            rng.randint(0, 5000),
+            rng.randint(0, 50000)
+        )
+
+
+def build_dicts(fields):
+    """字典表示：与改造前爬虫构造条目的方式一致"""
+    return [
+        {
+            'question_id': question_id,
+            'title': title,
+            'excerpt': excerpt,
+            'url': url,
+            'hot_index': hot_index,
+            'answer_count': answer_count,
+            'follower_count': follower_count
+        }
+        for question_id, title, excerpt, url, hot_index, answer_count, follower_count in fields
+    ]
+
+
+def build_records(fields):
+    """HotItem 表示"""
+    return [
+        HotItem(question_id, title, excerpt, url, hot_index, answer_count, follower_count)
+        for question_id, title, excerpt, url, hot_index, answer_count, follower_count in fields
+    ]
+
+
+def clean_to_dict(item: dict) -> dict:
+    """改造前的 DataProcessor._clean_item，每个条目生成一个新字典，作为对照"""
+    cleaned_item = {}
+    for field in ('title', 'excerpt'):
+        if field in item:
+            cleaned_item[field] = DataProcessor.clean_text(str(item[field]))
+    for field in ('hot_index', 'answer_count', 'follower_count'):
+        if field in item:
+            try:
+                value = item[field]
+                if value is None:
+                    cleaned_item[field] = 0
+                else:
+                    cleaned_item[field] = float(value) if field == 'hot_index' else int(value)
+            except (ValueError, TypeError):
+                cleaned_item[field] = 0
+    for field in ('question_id', 'url'):
+        if field in item:
+            cleaned_item[field] = str(item[field]).strip()
+    return cleaned_item
+
+
+def measure_memory(builder, fields) -> int:
+    """构造条目列表期间新增的内存（字节），字段字符串预先生成，不计入"""
+    gc.collect()
+    tracemalloc.start()
+    items = builder(fields)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return current
+
+
+def timed(func, repeat: int = 3) -> float:
+    """重复执行并返回最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='记录类型基准测试')
+    parser.add_argument('--items', type=int, default=1000000, help='内存测试的条目数')
+    parser.add_argument('--stage-items', type=int, default=200000, help='阶段耗时测试的条目数')
+    args = parser.parse_args()
+
+    fields = list(generate_fields(args.items))
+    dict_bytes = measure_memory(build_dicts, fields)
+    record_bytes = measure_memory(build_records, fields)
+
+    print(f"\n内存占用（{args.items} 条，不含字段字符串本身）")
+    print(f"{'表示':<10}{'字节/条':>10}{'每百万条(MB)':>16}")
+    print("-" * 36)
+    for name, size in (('dict', dict_bytes), ('HotItem', record_bytes)):
+        print(f"{name:<10}{size / args.items:>10.1f}{size / args.items * 1e6 / 2**20:>16.1f}")
+
+    stage_fields = fields[:args.stage_items]
+    raw_dicts = build_dicts(stage_fields)
+    raw_records = build_records(stage_fields)
+    cleaned_dicts = [clean_to_dict(item) for item in raw_dicts]
+    cleaned_records = [DataProcessor._clean_item(item) for item in raw_records]
+    crawl_time = datetime.now()
+
+    stages = [
+        ('构造（爬虫）', lambda: build_dicts(stage_fields), lambda: build_records(stage_fields)),
+        ('清洗（处理器）', lambda: [clean_to_dict(item) for item in raw_dicts],
+         lambda: [DataProcessor._clean_item(item) for item in raw_records]),
+        ('写入行（数据库）', lambda: build_upsert_rows(cleaned_dicts, crawl_time),
+         lambda: build_upsert_rows(cleaned_records, crawl_time)),
+        ('JSON输出', lambda: json.dumps(cleaned_dicts, ensure_ascii=False),
+         lambda: json.dumps(to_dicts(cleaned_records), ensure_ascii=False)),
+    ]
+
+    # HotItem 实例由循环垃圾回收跟踪（只含原子值的字典不跟踪），大批量构造时的耗时差异主要来自GC
+    print(f"\n各阶段耗时（{len(stage_fields)} 条，单位 ms，含GC）")
+    print(f"{'阶段':<12}{'dict':>10}{'HotItem':>10}{'比值':>8}")
+    print("-" * 40)
+    for name, dict_stage, record_stage in stages:
+        dict_seconds = timed(dict_stage)
+        record_seconds = timed(record_stage)
+        print(f"{name:<12}{dict_seconds * 1000:>10.0f}{record_seconds * 1000:>10.0f}"
+              f"{record_seconds / dict_seconds:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
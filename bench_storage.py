@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+存储后端基准测试 - 比较各后端的写入速度和历史区间查询速度
+
+用法:
+    python bench_storage.py --backends sqlite duckdb --crawls 2000
+    python bench_storage.py --backends postgresql   # 写入 BENCH_DB_NAME 指定的数据库（默认 zhihu_hot_bench）
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import DATABASE_CONFIG
+from backends import BACKENDS, build_upsert_rows, create_backend
+from database import DatabaseManager
+
+
+def generate_crawls(crawl_count: int, items_per_crawl: int, question_pool: int, seed: int = 42):
+    """生成模拟的逐分钟爬取数据"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    for n in range(crawl_count):
+        crawl_time = start + timedelta(minutes=n)
+        question_ids = rng.sample(range(1, question_pool + 1), items_per_crawl)
+        items = [
+            {
+                'question_id': str(question_id),
+                'title': f'基准测试问题标题 {question_id}',
+                'excerpt': '基准测试摘要内容',
+                'url': f'https://www.zhihu.com/question/{question_id}',
+                'hot_index': rng.uniform(100, 10000),
+                'answer_count': rng.randint(0, 5000),
+                'follower_count': rng.randint(0, 50000),
+                'rank': rank
+            }
+            for rank, question_id in enumerate(question_ids, 1)
+        ]
+        yield crawl_time, items
+
+
+def bench_backend(name: str, args, workdir: str) -> dict:
+    """对单个后端执行写入和查询基准测试"""
+    config = dict(DATABASE_CONFIG)
+    config['sqlite_path'] = os.path.join(workdir, 'bench.db')
+    config['duckdb_path'] = os.path.join(workdir, 'bench.duckdb')
+    config['database'] = os.getenv('BENCH_DB_NAME', 'zhihu_hot_bench')
+
+    manager = DatabaseManager(backend=create_backend(name, config))
+    manager.create_tables()
+
+    # 写入：每次爬取一个事务，与定时爬取的写入模式一致
+    started = time.perf_counter()
+    rows = 0
+    crawl_times = []
+    for crawl_time, items in generate_crawls(args.crawls, args.items, args.questions):
+        item_rows, snapshot_rows = build_upsert_rows(items, crawl_time)
+        manager.bulk_upsert(item_rows, snapshot_rows)
+        rows += len(snapshot_rows)
+        crawl_times.append(crawl_time)
+    ingest_seconds = time.perf_counter() - started
+
+    # 区间查询：随机选取若干个时间窗口读取历史快照
+    rng = random.Random(7)
+    window = timedelta(minutes=args.window)
+    query_rows = 0
+    started = time.perf_counter()
+    for _ in range(args.queries):
+        since = rng.choice(crawl_times)
+        query_rows += len(manager.get_snapshots(since=since, until=since + window))
+    query_seconds = time.perf_counter() - started
+
+    manager.engine.dispose()
+    return {
+        'backend': name,
+        'rows': rows,
+        'ingest_seconds': ingest_seconds,
+        'ingest_rate': rows / ingest_seconds if ingest_seconds else 0,
+        'query_ms': query_seconds / args.queries * 1000,
+        'query_rows': query_rows / args.queries
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='存储后端基准测试')
+    parser.add_argument('--backends', nargs='+', default=['sqlite', 'duckdb'],
+                        choices=list(BACKENDS), help='参与测试的后端')
+    parser.add_argument('--crawls', type=int, default=500, help='模拟的爬取次数')
+    parser.add_argument('--items', type=int, default=50, help='每次爬取的条目数')
+    parser.add_argument('--questions', type=int, default=2000, help='问题ID池大小')
+    parser.add_argument('--queries', type=int, default=50, help='区间查询次数')
+    parser.add_argument('--window', type=int, default=60, help='区间查询的时间窗口（分钟）')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    results = []
+    for name in args.backends:
+        with tempfile.TemporaryDirectory() as workdir:
+            try:
+                results.append(bench_backend(name, args, workdir))
+            except Exception as e:
+                print(f"❌ 后端 {name} 测试失败: {e}")
+
+    print(f"\n{'后端':<12}{'写入行数':>10}{'写入耗时(s)':>14}{'写入速率(行/s)':>18}{'区间查询(ms)':>16}{'平均返回行数':>14}")
+    print("-" * 84)
+    for r in results:
+        print(f"{r['backend']:<12}{r['rows']:>10}{r['ingest_seconds']:>14.2f}"
+              f"{r['ingest_rate']:>18.0f}{r['query_ms']:>16.2f}{r['query_rows']:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
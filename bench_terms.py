@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+热词统计基准测试 - 模拟按分钟爬取的热榜标题，测量每次更新和 top-K 查询的耗时，
+并与精确计数比较窗口热词的召回率和计数误差
+
+用法:
+    python bench_terms.py --hours 48 --items 50
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from collections import Counter, deque
+from datetime import datetime, timedelta
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import TERMS_CONFIG
+from terms import TermStats, decode_term, encode_term, term_codes
+
+# 常用汉字区间，用于生成随机标题
+CHARS = [chr(code) for code in range(0x4e00, 0x4e00 + 3000)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='热词统计基准测试')
+    parser.add_argument('--hours', type=int, default=48, help='模拟的小时数（每分钟一次爬取）')
+    parser.add_argument('--items', type=int, default=50, help='每次爬取的条目数')
+    parser.add_argument('--lifetime', type=int, default=240, help='问题的平均在榜分钟数')
+    parser.add_argument('--top', type=int, default=20, help='比较的热词数')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    # 热点话题词以 Zipf 分布出现在标题中，其余为随机字
+    topics = [''.join(rng.choice(CHARS) for _ in range(rng.randint(2, 3))) for _ in range(2000)]
+    weights = [1 / (rank + 1) for rank in range(len(topics))]
+
+    def new_title() -> str:
+        words = rng.choices(topics, weights, k=2)
+        return ''.join(rng.choice(CHARS) for _ in range(8)).join(words) + \
+            ''.join(rng.choice(CHARS) for _ in range(rng.randint(5, 15)))
+
+    data_dir = tempfile.mkdtemp(prefix='terms-')
+    try:
+        stats = TermStats(dict(TERMS_CONFIG, data_dir=data_dir))
+        board = [[new_title(), rng.expovariate(1 / args.lifetime)] for _ in range(args.items)]
+        exact_day = Counter()
+        recent = deque()
+        start = datetime(2024, 1, 1)
+        update_seconds = []
+
+        for minute in range(args.hours * 60):
+            crawl_time = start + timedelta(minutes=minute)
+            for entry in board:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    entry[0], entry[1] = new_title(), rng.expovariate(1 / args.lifetime)
+            items = [{'title': title} for title, _ in board]
+
+            # 精确计数：最近一天（按 day 窗口的时间片对齐）每次爬取的词计数
+            crawl_counts = Counter()
+            for item in items:
+                crawl_counts.update(term_codes(item['title'], TERMS_CONFIG['ngram_sizes'],
+                                               TERMS_CONFIG['stop_terms']))
+            recent.append((crawl_time, crawl_counts))
+            exact_day.update(crawl_counts)
+
+            started = time.perf_counter()
+            stats.update(items, crawl_time, save=minute % 60 == 59)
+            update_seconds.append(time.perf_counter() - started)
+
+        # 精确窗口与时间片边界对齐：day 窗口包含最近 panes 个时间片
+        day = stats.windows['day']
+        oldest = (day.head - day.panes + 1) * day.pane_seconds
+        for crawl_time, crawl_counts in recent:
+            if crawl_time.timestamp() < oldest:
+                exact_day.subtract(crawl_counts)
+
+        started = time.perf_counter()
+        top = stats.top('day', args.top)
+        query_seconds = time.perf_counter() - started
+
+        exact = {decode_term(code): count for code, count in exact_day.most_common(args.top)}
+        found = {entry['term'] for entry in top}
+        errors = [entry['count'] - exact_day[encode_term(entry['term'])] for entry in top]
+
+        update_seconds.sort()
+        state_bytes = os.path.getsize(stats.state_path)
+        memory = sum(window.cms.nbytes + window.total.nbytes for window in stats.windows.values())
+        print(f"\n{args.hours * 60:,} 次爬取，每次 {args.items} 条")
+        print(f"{'指标':<24}{'数值':>16}")
+        print("-" * 40)
+        print(f"{'单次更新中位数(ms)':<24}{update_seconds[len(update_seconds) // 2] * 1000:>16.2f}")
+        print(f"{'单次更新P99(ms)':<24}{update_seconds[int(len(update_seconds) * 0.99)] * 1000:>16.2f}")
+        print(f"{'day top-K 查询(ms)':<24}{query_seconds * 1000:>16.2f}")
+        print(f"{'草图内存(MB)':<24}{memory / 1e6:>16.1f}")
+        print(f"{'持久化文件(KB)':<24}{state_bytes / 1e3:>16.1f}")
+        print(f"{'day top-K 召回率':<24}{len(found & set(exact)) / max(1, len(exact)):>16.2%}")
+        print(f"{'top-K 计数最大高估':<24}{max(errors, default=0):>16}")
+        print(f"{'day 窗口总计数':<24}{sum(exact_day.values()):>16,}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+关注词表基准测试 - 比较 Aho-Corasick 自动机与逐词 in 检查在不同关注词数量下匹配一次爬取的耗时
+
+用法:
+    python bench_watchlist.py --sizes 10 1000 10000 100000 --items 50
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from watchlist import Watchlist, normalize
+
+# 常用汉字区间，用于生成随机关注词和标题
+CHARS = [chr(code) for code in range(0x4e00, 0x4e00 + 3000)]
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    return ''.join(rng.choice(CHARS) for _ in range(length))
+
+
+def timed(func, repeat: int = 5) -> float:
+    """多次执行取最短耗时"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='关注词表基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000, 100000], help='关注词数量')
+    parser.add_argument('--items', type=int, default=50, help='每次爬取的条目数')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    items = [{'question_id': str(n), 'title': random_text(rng, 30), 'excerpt': random_text(rng, 120)}
+             for n in range(args.items)]
+
+    print(f"\n每次爬取 {args.items} 条（标题30字、摘要120字）")
+    print(f"{'关注词数':<10}{'构建(ms)':>12}{'自动机(ms)':>12}{'逐词in(ms)':>12}{'命中':>8}")
+    print("-" * 54)
+    for size in args.sizes:
+        keywords = [random_text(rng, rng.randint(2, 4)) for _ in range(size)]
+        started = time.perf_counter()
+        watchlist = Watchlist({'bench': keywords}, merge_threshold=0)
+        build = time.perf_counter() - started
+
+        automaton_seconds = timed(lambda: watchlist.match_items(items))
+        hits = len(watchlist.match_items(items))
+
+        normalized = [normalize(keyword) for keyword in keywords]
+
+        def naive():
+            for item in items:
+                for field in ('title', 'excerpt'):
+                    text = normalize(item[field])
+                    [keyword for keyword in normalized if keyword in text]
+
+        naive_seconds = timed(naive, repeat=1 if size > 10000 else 3)
+        print(f"{size:<10}{build * 1000:>12.1f}{automaton_seconds * 1000:>12.2f}"
+              f"{naive_seconds * 1000:>12.2f}{hits:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""
+查询缓存模块 - 为读接口提供按代数(generation)失效的读穿缓存
+"""
+import os
+import pickle
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from utils import ensure_directory
+
+logger = logging.getLogger(__name__)
+
+GENERATION_FILE = 'GENERATION'
+LOCK_FILE = 'GENERATION.lock'
+
+# 缓存未命中的标记，与合法的 None 结果区分
+MISSING = object()
+
+
+class QueryCache:
+    """
+    读穿查询缓存
+
+    缓存键由查询名称和参数组成。每次写入新的爬取数据后调用 invalidate()
+    使代数加一，旧代数的缓存条目即全部失效。配置 disk_dir 后，缓存条目和代数
+    同时保存在磁盘上，可在多个进程之间共享。
+    """
+
+    def __init__(self, max_entries: int = 128, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        # 代数文件的 (修改时间, inode)，两次替换落在同一时间粒度内时靠 inode 区分
+        self._generation_stamp = None
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.invalidations = 0
+
+        if self.disk_dir:
+            ensure_directory(self.disk_dir)
+
+    @property
+    def generation(self) -> int:
+        """当前缓存代数，启用磁盘存储时以磁盘上的代数文件为准"""
+        if not self.disk_dir:
+            return self._generation
+
+        path = os.path.join(self.disk_dir, GENERATION_FILE)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return self._generation
+
+        stamp = (stat.st_mtime_ns, stat.st_ino)
+        if stamp != self._generation_stamp:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._generation = int(f.read().strip() or 0)
+                self._generation_stamp = stamp
+            except (OSError, ValueError) as e:
+                logger.warning("读取缓存代数失败: %s", e)
+        return self._generation
+
+    def get_or_load(self, name: str, params: Dict, loader: Callable[[], Any]) -> Any:
+        """
+        读取缓存，未命中时调用 loader 加载并写入缓存
+
+        Args:
+            name: 查询名称
+            params: 查询参数
+            loader: 未命中时执行的加载函数
+
+        Returns:
+            查询结果
+        """
+        generation = self.generation
+        value = self.get(name, params, generation=generation)
+        if value is MISSING:
+            value = loader()
+            self.put(name, params, value, generation=generation)
+        return value
+
+    def get(self, name: str, params: Dict, generation: Optional[int] = None) -> Any:
+        """
+        读取缓存条目，供无法传入同步 loader 的调用方（如异步接口）使用
+
+        Args:
+            name: 查询名称
+            params: 查询参数
+            generation: 查询所基于的代数，默认为当前代数
+
+        Returns:
+            缓存的结果，未命中时返回 MISSING
+        """
+        key = self._make_key(name, params)
+        if generation is None:
+            generation = self.generation
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        value = self._load_from_disk(key, generation)
+        with self._lock:
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self.disk_hits += 1
+                self.hits += 1
+                self._store(key, generation, value)
+        return value
+
+    def put(self, name: str, params: Dict, value: Any, generation: Optional[int] = None):
+        """
+        写入缓存条目
+
+        调用方应传入加载数据之前读取的代数，这样加载期间发生的失效不会被新条目掩盖
+
+        Args:
+            name: 查询名称
+            params: 查询参数
+            value: 查询结果
+            generation: 查询所基于的代数，默认为当前代数
+        """
+        key = self._make_key(name, params)
+        if generation is None:
+            generation = self.generation
+
+        with self._lock:
+            self._store(key, generation, value)
+        self._save_to_disk(key, generation, value)
+
+    def invalidate(self):
+        """使所有缓存失效（代数加一）"""
+        if self.disk_dir:
+            # 多个进程同时失效时在文件锁内读取磁盘上的最新代数再加一，两次失效不会写出同一个代数
+            with self._disk_lock():
+                self._generation_stamp = None
+                generation = self.generation + 1
+                self._write_generation(generation)
+
+        with self._lock:
+            if not self.disk_dir:
+                generation = self._generation + 1
+            self._generation = generation
+            self._entries.clear()
+            self.invalidations += 1
+        logger.debug("查询缓存已失效，当前代数: %d", generation)
+
+    def stats(self) -> Dict:
+        """
+        获取缓存统计信息
+
+        Returns:
+            命中/未命中等统计数据
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'generation': self._generation,
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'disk_hits': self.disk_hits,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+    @contextmanager
+    def _disk_lock(self):
+        """磁盘代数的进程间互斥锁（fcntl.flock）"""
+        import fcntl
+
+        with open(os.path.join(self.disk_dir, LOCK_FILE), 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def _make_key(name: str, params: Dict):
+        """由查询名称和参数构造缓存键"""
+        return (name, tuple(sorted(params.items())))
+
+    def _store(self, key, generation: int, value: Any):
+        """写入内存缓存（调用方需持有锁）"""
+        self._entries[key] = (generation, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key, generation: int) -> str:
+        """缓存条目在磁盘上的路径"""
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, f"{generation}-{digest}.pkl")
+
+    def _load_from_disk(self, key, generation: int) -> Any:
+        """从磁盘读取缓存条目"""
+        if not self.disk_dir:
+            return MISSING
+        try:
+            with open(self._disk_path(key, generation), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return MISSING
+        except Exception as e:
+            logger.warning("读取磁盘缓存失败: %s", e)
+            return MISSING
+
+    def _save_to_disk(self, key, generation: int, value: Any):
+        """将缓存条目写入磁盘（先写临时文件再替换）"""
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key, generation)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("写入磁盘缓存失败: %s", e)
+
+    def _write_generation(self, generation: int):
+        """写入新的代数并清理旧代数的磁盘条目"""
+        path = os.path.join(self.disk_dir, GENERATION_FILE)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(str(generation))
+            os.replace(tmp_path, path)
+
+            prefix = f"{generation}-"
+            for filename in os.listdir(self.disk_dir):
+                if filename.endswith('.pkl') and not filename.startswith(prefix):
+                    os.remove(os.path.join(self.disk_dir, filename))
+        except OSError as e:
+            logger.warning("更新磁盘缓存代数失败: %s", e)
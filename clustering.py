@@ -0,0 +1,296 @@
+"""
+事件聚类模块 - 基于MinHash/LSH将标题相近的问题归为同一事件簇
+"""
+import os
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config import CLUSTER_CONFIG
+from search import tokenize
+from utils import ensure_directory
+
+logger = logging.getLogger(__name__)
+
+# 哈希函数取模用的梅森素数，签名值小于 2^31，可以用 uint32 存储
+MERSENNE_PRIME = (1 << 31) - 1
+
+SIGNATURE_FILE = 'signatures.u32'
+MEMBERS_FILE = 'members.tsv'
+
+# 单次向量化计算的文档数，限制 (shingle数 × 哈希函数数) 中间矩阵的大小
+SIGNATURE_BATCH = 256
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """64位整数混淆（splitmix64终结函数），打散相邻的shingle编码"""
+    x = values.astype(np.uint64)
+    x ^= x >> np.uint64(33)
+    x *= np.uint64(0xff51afd7ed558ccd)
+    x ^= x >> np.uint64(33)
+    x *= np.uint64(0xc4ceb9fe1a85ec53)
+    x ^= x >> np.uint64(33)
+    return x
+
+
+class EventClusterer:
+    """
+    近似重复问题聚类器
+
+    对清洗后的标题和摘要取字符二元组作为shingle，计算MinHash签名，并按LSH分段
+    建立桶索引。新问题只与落入相同桶的历史问题比较签名，估计相似度超过阈值时
+    加入该问题所在的簇，否则以自身问题ID作为新簇ID。簇ID一旦分配就不再改变。
+
+    语料保存在 CLUSTER_CONFIG['data_dir'] 下的两个只追加文件中：
+    signatures.u32 为按行存放的签名矩阵，members.tsv 为对应的问题ID和簇ID。
+    """
+
+    def __init__(self, data_dir: Optional[str] = None, num_perm: Optional[int] = None,
+                 bands: Optional[int] = None, threshold: Optional[float] = None, seed: int = 1):
+        self.data_dir = data_dir or CLUSTER_CONFIG['data_dir']
+        self.num_perm = num_perm or CLUSTER_CONFIG['num_perm']
+        self.bands = bands or CLUSTER_CONFIG['bands']
+        self.threshold = threshold if threshold is not None else CLUSTER_CONFIG['threshold']
+        if self.num_perm % self.bands:
+            raise ValueError(f"num_perm ({self.num_perm}) 必须是 bands ({self.bands}) 的整数倍")
+        self.rows = self.num_perm // self.bands
+
+        # 哈希函数 h_i(x) = (a_i * x + b_i) mod p，以及各分段的桶键组合系数
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, self.num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, self.num_perm, dtype=np.uint64)
+        self._band_mult = rng.integers(1, 1 << 63, self.rows, dtype=np.uint64) | np.uint64(1)
+
+        self._lock = threading.RLock()
+        ensure_directory(self.data_dir)
+        self.load()
+
+    # ------------------------------------------------------------------
+    # 签名计算
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def shingles(item: Dict) -> List[int]:
+        """标题和摘要开头部分的字符二元组集合"""
+        text = f"{item.get('title') or ''} {(item.get('excerpt') or '')[:CLUSTER_CONFIG['excerpt_chars']]}"
+        return sorted(set(tokenize(text, query=True)))
+
+    def signatures(self, shingle_sets: List[List[int]]) -> np.ndarray:
+        """
+        批量计算MinHash签名
+
+        Args:
+            shingle_sets: 每个文档的shingle编码列表
+
+        Returns:
+            (文档数, num_perm) 的 uint32 签名矩阵，没有shingle的文档签名全为 MERSENNE_PRIME
+        """
+        result = np.full((len(shingle_sets), self.num_perm), MERSENNE_PRIME, dtype=np.uint32)
+        for start in range(0, len(shingle_sets), SIGNATURE_BATCH):
+            batch = shingle_sets[start:start + SIGNATURE_BATCH]
+            lengths = np.fromiter((len(s) for s in batch), dtype=np.int64, count=len(batch))
+            if not lengths.sum():
+                continue
+
+            codes = np.fromiter((code for s in batch for code in s), dtype=np.uint64, count=int(lengths.sum()))
+            x = _mix64(codes) % np.uint64(MERSENNE_PRIME)
+            # (shingle数, num_perm)，x 和 a 都小于 2^31，乘积不会溢出
+            hashes = (x[:, None] * self._a[None, :] + self._b[None, :]) % np.uint64(MERSENNE_PRIME)
+
+            # 每个文档的shingle在 hashes 中是连续的行，按段取最小值
+            nonempty = np.flatnonzero(lengths)
+            starts = (np.cumsum(lengths) - lengths)[nonempty]
+            result[start + nonempty] = np.minimum.reduceat(hashes, starts, axis=0)
+        return result
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """将签名按分段组合为 (文档数, bands) 的64位桶键"""
+        bands = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return (bands * self._band_mult).sum(axis=2)
+
+    # ------------------------------------------------------------------
+    # 语料加载
+    # ------------------------------------------------------------------
+
+    def load(self):
+        """加载历史语料并建立LSH桶索引"""
+        with self._lock:
+            self.question_ids = []
+            self.cluster_ids = []
+            self._index_of_question = {}
+            signature_path = os.path.join(self.data_dir, SIGNATURE_FILE)
+            members_path = os.path.join(self.data_dir, MEMBERS_FILE)
+
+            if os.path.exists(members_path):
+                with open(members_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        question_id, cluster_id = line.rstrip('\n').split('\t')
+                        self._index_of_question[question_id] = len(self.question_ids)
+                        self.question_ids.append(question_id)
+                        self.cluster_ids.append(cluster_id)
+
+            count = len(self.question_ids)
+            # 签名先于成员写入，中断时可能多出未登记的签名，截断后再追加
+            if os.path.exists(signature_path) and os.path.getsize(signature_path) > count * self.num_perm * 4:
+                with open(signature_path, 'r+b') as f:
+                    f.truncate(count * self.num_perm * 4)
+            if count and os.path.exists(signature_path):
+                self._signatures = np.fromfile(signature_path, dtype=np.uint32,
+                                               count=count * self.num_perm).reshape(count, self.num_perm)
+            else:
+                self._signatures = np.zeros((0, self.num_perm), dtype=np.uint32)
+            self._main_count = count
+
+            # 主索引：每个分段一组排序后的桶键，用二分查找定位桶
+            keys = self._band_keys(self._signatures)
+            self._main_order = np.argsort(keys, axis=0, kind='stable')
+            self._main_keys = np.take_along_axis(keys, self._main_order, axis=0)
+
+            # 本进程新增文档的桶，下次加载时并入主索引
+            self._delta_buckets = [dict() for _ in range(self.bands)]
+            self._delta_signatures = []
+
+            logger.info("事件聚类语料加载完成: %d 个问题，%d 个事件簇", count, len(set(self.cluster_ids)))
+
+    # ------------------------------------------------------------------
+    # 聚类
+    # ------------------------------------------------------------------
+
+    def assign_clusters(self, items: List[Dict]) -> List[Dict]:
+        """
+        为一批热榜数据分配事件簇ID，写入每个数据项的 cluster_id 字段
+
+        Args:
+            items: 处理后的热榜数据列表
+
+        Returns:
+            原数据列表
+        """
+        added, merged = self._assign(items)
+        if added:
+            logger.info("事件聚类完成: 新增 %d 个问题，其中 %d 个并入已有事件簇", added, merged)
+        return items
+
+    def rebuild(self, docs: Iterable[Dict]) -> Dict[str, str]:
+        """
+        清空语料并按给定顺序重新聚类
+
+        Args:
+            docs: 文档字典迭代器，应按首次出现时间排序，使最早的问题成为簇ID
+
+        Returns:
+            问题ID到簇ID的映射
+        """
+        with self._lock:
+            for name in (SIGNATURE_FILE, MEMBERS_FILE):
+                path = os.path.join(self.data_dir, name)
+                if os.path.exists(path):
+                    os.remove(path)
+            self.load()
+
+            batch = []
+            for doc in docs:
+                batch.append(dict(doc))
+                if len(batch) >= SIGNATURE_BATCH:
+                    self._assign(batch)
+                    batch = []
+            self._assign(batch)
+            return dict(zip(self.question_ids, self.cluster_ids))
+
+    def _assign(self, items: List[Dict]):
+        """分配簇ID并追加写入语料，返回 (新增问题数, 并入已有簇的问题数)"""
+        if not items:
+            return 0, 0
+
+        with self._lock:
+            new_items = [item for item in items if str(item.get('question_id')) not in self._index_of_question]
+            signatures = self.signatures([self.shingles(item) for item in new_items])
+            new_signatures = dict(zip((id(item) for item in new_items), signatures))
+
+            members = []
+            merged = 0
+            for item in items:
+                question_id = str(item.get('question_id'))
+                index = self._index_of_question.get(question_id)
+                if index is not None:
+                    item['cluster_id'] = self.cluster_ids[index]
+                    continue
+
+                signature = new_signatures[id(item)]
+                cluster_id = self._match(signature) or question_id
+                merged += cluster_id != question_id
+                self._add(question_id, cluster_id, signature)
+                members.append((question_id, cluster_id, signature))
+                item['cluster_id'] = cluster_id
+
+            self._append(members)
+            return len(members), merged
+
+    def _match(self, signature: np.ndarray) -> Optional[str]:
+        """查找相似度超过阈值的最相近问题，返回其簇ID"""
+        if signature[0] == MERSENNE_PRIME:
+            return None
+
+        keys = self._band_keys(signature[None, :])[0]
+        candidates = set()
+        for band, key in enumerate(keys):
+            if self._main_count:
+                band_keys = self._main_keys[:, band]
+                lo = int(np.searchsorted(band_keys, key, side='left'))
+                hi = int(np.searchsorted(band_keys, key, side='right'))
+                candidates.update(self._main_order[lo:hi, band].tolist())
+            candidates.update(self._delta_buckets[band].get(int(key), ()))
+
+        if not candidates:
+            return None
+
+        candidates = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (self._signature_rows(candidates) == signature).mean(axis=1)
+        best = int(np.argmax(similarity))
+        if similarity[best] < self.threshold:
+            return None
+        return self.cluster_ids[int(candidates[best])]
+
+    def _signature_rows(self, indices: np.ndarray) -> np.ndarray:
+        """按文档编号取签名，兼顾主语料和本进程新增的文档"""
+        rows = np.empty((len(indices), self.num_perm), dtype=np.uint32)
+        in_main = indices < self._main_count
+        rows[in_main] = self._signatures[indices[in_main]]
+        for i in np.flatnonzero(~in_main):
+            rows[i] = self._delta_signatures[indices[i] - self._main_count]
+        return rows
+
+    def _add(self, question_id: str, cluster_id: str, signature: np.ndarray):
+        """将新问题加入内存索引"""
+        index = len(self.question_ids)
+        self._index_of_question[question_id] = index
+        self.question_ids.append(question_id)
+        self.cluster_ids.append(cluster_id)
+        self._delta_signatures.append(signature)
+
+        # 没有shingle的问题不进入桶索引，避免全部落入同一个桶
+        if signature[0] != MERSENNE_PRIME:
+            for band, key in enumerate(self._band_keys(signature[None, :])[0]):
+                self._delta_buckets[band].setdefault(int(key), []).append(index)
+
+    def _append(self, members: List[tuple]):
+        """追加写入新问题的签名和簇ID"""
+        if not members:
+            return
+        with open(os.path.join(self.data_dir, SIGNATURE_FILE), 'ab') as f:
+            f.write(np.stack([signature for _, _, signature in members]).astype(np.uint32).tobytes())
+        with open(os.path.join(self.data_dir, MEMBERS_FILE), 'a', encoding='utf-8') as f:
+            f.writelines(f"{question_id}\t{cluster_id}\n" for question_id, cluster_id, _ in members)
+
+    def stats(self) -> Dict:
+        """语料统计信息"""
+        with self._lock:
+            return {
+                'questions': len(self.question_ids),
+                'clusters': len(set(self.cluster_ids)),
+                'bands': self.bands,
+                'rows_per_band': self.rows,
+                'threshold': self.threshold
+            }
@@ -0,0 +1,387 @@
+"""
+列式快照模块 - 只追加的定长列文件，以 mmap 方式读取，用于不经过数据库的历史快照分析
+"""
+import os
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from utils import ensure_directory
+
+logger = logging.getLogger(__name__)
+
+META_FILE = 'meta.json'
+DICT_FILE = 'questions.jsonl'
+LOCK_FILE = 'write.lock'
+
+# 每列一个无文件头的定长数组文件，第 n 行即每个文件中的第 n 个元素
+COLUMNS = (
+    ('question', np.uint32),       # 问题在字符串字典中的序号
+    ('crawl_time', np.int64),      # 爬取时间（秒级时间戳），全局非递减
+    ('rank', np.int16),
+    ('hot_index', np.float64),     # 缺失为 NaN
+    ('answer_count', np.int32),
+    ('follower_count', np.int32)
+)
+COLUMN_DTYPES = dict(COLUMNS)
+
+
+def _to_epoch(value) -> int:
+    """时间转换为秒级时间戳"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+class ColumnStore:
+    """
+    只追加的列式快照存储
+
+    每列一个定长数组文件，问题ID和标题存放在按序号追加的字符串字典中。写入时先追加
+    列文件和字典，最后原子替换 meta.json 中的行数；读取方只映射 meta.json 记录的行数，
+    因此总能看到完整的爬取批次。写入中途崩溃留下的文件尾部在下一次追加前被截掉。
+    多个写入进程通过数据目录下的文件锁串行追加，拿到锁后先读取其他进程已提交的
+    元数据和字典条目，再截断和追加。
+
+    爬取时间全局非递减，按时间范围扫描只需在 crawl_time 列上二分查找，返回的是
+    映射文件的切片视图，不复制数据。
+    """
+
+    def __init__(self, data_dir: str, fsync: bool = False):
+        """
+        Args:
+            data_dir: 存储目录
+            fsync: 每次追加后是否将列文件刷到磁盘
+        """
+        self.data_dir = data_dir
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        ensure_directory(self.data_dir)
+        self.refresh()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.data_dir, f'{name}.col')
+
+    # ------------------------------------------------------------------
+    # 加载
+    # ------------------------------------------------------------------
+
+    def _read_meta(self) -> Dict:
+        meta = {'rows': 0, 'dict_bytes': 0, 'last_crawl': None, 'store_id': None}
+        meta_path = os.path.join(self.data_dir, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta.update(json.load(f))
+        return meta
+
+    def _load_entries(self, start: int, stop: int):
+        """应用字典文件中 [start, stop) 字节范围内的条目"""
+        dict_path = os.path.join(self.data_dir, DICT_FILE)
+        if stop > start and os.path.exists(dict_path):
+            with open(dict_path, 'rb') as f:
+                f.seek(start)
+                data = f.read(stop - start)
+            for line in data.splitlines():
+                if line:
+                    self._apply_entry(json.loads(line))
+
+    def refresh(self):
+        """重新读取元数据和字符串字典，读取方借此看到其他进程追加的数据"""
+        with self._lock:
+            meta = self._read_meta()
+            self.rows = meta['rows']
+            self.last_crawl = meta['last_crawl']
+            self._store_id = meta['store_id']
+            self._dict_bytes = meta['dict_bytes']
+            self._question_ids = []
+            self._titles = []
+            self._index = {}
+            self._columns = None
+            self._load_entries(0, self._dict_bytes)
+
+    def _sync(self):
+        """读取其他进程已提交的元数据，只追加应用新增的字典条目；存储被重建过时完整重新加载"""
+        meta = self._read_meta()
+        if (meta['store_id'] != self._store_id or meta['rows'] < self.rows
+                or meta['dict_bytes'] < self._dict_bytes):
+            self.refresh()
+            return
+        self._load_entries(self._dict_bytes, meta['dict_bytes'])
+        if meta['rows'] != self.rows:
+            self._columns = None
+        self.rows = meta['rows']
+        self.last_crawl = meta['last_crawl']
+        self._dict_bytes = meta['dict_bytes']
+
+    @contextmanager
+    def _exclusive(self):
+        """
+        写锁：线程锁加数据目录下的文件锁（fcntl.flock），与其他写入进程互斥
+
+        最外层拿到锁后同步其他进程已提交的数据，之后计算的字典序号和截断位置都基于
+        最新的元数据；同一线程内重入（重建时逐批追加）不重复加锁。
+        """
+        import fcntl
+
+        with self._lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+
+            with open(os.path.join(self.data_dir, LOCK_FILE), 'a') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                self._lock_depth = 1
+                try:
+                    self._sync()
+                    yield
+                finally:
+                    self._lock_depth = 0
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _apply_entry(self, entry: Dict):
+        """字典条目：首次出现的问题分配新序号，之后出现的同一问题只更新标题"""
+        index = self._index.get(entry['q'])
+        if index is None:
+            self._index[entry['q']] = len(self._question_ids)
+            self._question_ids.append(entry['q'])
+            self._titles.append(entry.get('t') or '')
+        else:
+            self._titles[index] = entry.get('t') or ''
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """全部列的只读映射，长度均为 rows"""
+        with self._lock:
+            if self._columns is None:
+                self._columns = {
+                    name: np.memmap(self._path(name), dtype=dtype, mode='r', shape=(self.rows,))
+                    if self.rows else np.zeros(0, dtype=dtype)
+                    for name, dtype in COLUMNS
+                }
+            return self._columns
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def append(self, rows: Sequence[Dict], titles: Optional[Dict[str, str]] = None) -> int:
+        """
+        追加一批快照行
+
+        Args:
+            rows: 快照行，含 question_id、crawl_time、rank、hot_index、answer_count、follower_count，
+                  须按爬取时间排序且不早于已写入的最后一次爬取
+            titles: 问题ID到标题的映射，新问题和标题有变化的问题写入字符串字典
+
+        Returns:
+            追加的行数
+        """
+        if not rows:
+            return 0
+        titles = titles or {}
+
+        with self._exclusive():
+            times = np.array([_to_epoch(row['crawl_time']) for row in rows], dtype=np.int64)
+            if (self.last_crawl is not None and times[0] < self.last_crawl) or np.any(np.diff(times) < 0):
+                raise ValueError("列式存储只能按爬取时间顺序追加，历史数据请通过重建写入")
+
+            entries = []
+            pending = {}
+            for row in rows:
+                question_id = row['question_id']
+                title = titles.get(question_id)
+                index = self._index.get(question_id, pending.get(question_id))
+                if index is None:
+                    pending[question_id] = len(self._question_ids) + len(pending)
+                    entries.append({'q': question_id, 't': title or ''})
+                elif title and question_id not in pending and self._titles[index] != title:
+                    entries.append({'q': question_id, 't': title})
+
+            indexes = {**self._index, **pending}
+            arrays = {
+                'question': np.array([indexes[row['question_id']] for row in rows], dtype=np.uint32),
+                'crawl_time': times,
+                'rank': np.array([row.get('rank') or 0 for row in rows], dtype=np.int16),
+                'hot_index': np.array([np.nan if row.get('hot_index') is None else row['hot_index']
+                                       for row in rows], dtype=np.float64),
+                'answer_count': np.array([row.get('answer_count') or 0 for row in rows], dtype=np.int32),
+                'follower_count': np.array([row.get('follower_count') or 0 for row in rows], dtype=np.int32)
+            }
+            self._write(arrays, entries)
+            return len(rows)
+
+    def append_arrays(self, arrays: Dict[str, np.ndarray], entries: Iterable[Dict] = ()) -> int:
+        """
+        直接追加列数组，用于重建和批量写入
+
+        Args:
+            arrays: 列名到等长数组的映射，question 列为字符串字典序号
+            entries: 新增的字符串字典条目 {'q': 问题ID, 't': 标题}，须先于引用它们的行写入；
+                     序号由调用方分配，多进程同时写入时应使用 append
+
+        Returns:
+            追加的行数
+        """
+        with self._exclusive():
+            arrays = {name: np.ascontiguousarray(arrays[name], dtype=dtype) for name, dtype in COLUMNS}
+            times = arrays['crawl_time']
+            if not len(times):
+                return 0
+            if (self.last_crawl is not None and times[0] < self.last_crawl) or np.any(np.diff(times) < 0):
+                raise ValueError("列式存储只能按爬取时间顺序追加，历史数据请通过重建写入")
+            self._write(arrays, list(entries))
+            return len(times)
+
+    def _write(self, arrays: Dict[str, np.ndarray], entries: List[Dict]):
+        """追加列文件和字典，最后原子更新元数据，须持有写锁"""
+        for name, dtype in COLUMNS:
+            with open(self._path(name), 'ab') as f:
+                # 截掉上次写入中途失败留下的、元数据未记录的尾部
+                f.truncate(self.rows * np.dtype(dtype).itemsize)
+                f.write(arrays[name].tobytes())
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+        dict_bytes = self._dict_bytes
+        if entries:
+            payload = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries).encode('utf-8')
+            with open(os.path.join(self.data_dir, DICT_FILE), 'ab') as f:
+                f.truncate(self._dict_bytes)
+                f.write(payload)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            dict_bytes += len(payload)
+
+        rows = self.rows + len(arrays['crawl_time'])
+        last_crawl = int(arrays['crawl_time'][-1])
+        meta_path = os.path.join(self.data_dir, META_FILE)
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'rows': rows, 'dict_bytes': dict_bytes, 'last_crawl': last_crawl,
+                       'store_id': self._store_id}, f)
+        os.replace(tmp_path, meta_path)
+
+        for entry in entries:
+            self._apply_entry(entry)
+        self.rows = rows
+        self.last_crawl = last_crawl
+        self._dict_bytes = dict_bytes
+        self._columns = None
+
+    def rebuild(self, rows: Iterable[Dict], titles: Optional[Dict[str, str]] = None,
+                batch_size: int = 100000) -> int:
+        """
+        丢弃现有数据并从按爬取时间排序的快照行重建
+
+        Args:
+            rows: 快照行迭代器，须按爬取时间排序
+            titles: 问题ID到标题的映射
+            batch_size: 每次追加的行数
+
+        Returns:
+            写入的行数
+        """
+        with self._exclusive():
+            # 先删除元数据，中途失败时读取方看到的是空存储
+            paths = [os.path.join(self.data_dir, META_FILE), os.path.join(self.data_dir, DICT_FILE)]
+            for path in paths + [self._path(name) for name, _ in COLUMNS]:
+                if os.path.exists(path):
+                    os.remove(path)
+            self.refresh()
+            # 新的存储标识让其他写入进程完整重新加载，而不是在旧字典上增量应用
+            self._store_id = f'{time.time_ns():x}'
+
+            batch = []
+            written = 0
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    written += self.append(batch, titles)
+                    batch = []
+            written += self.append(batch, titles)
+            logger.info("列式快照重建完成: %d 行，%d 个问题", written, len(self._question_ids))
+            return written
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def range(self, since=None, until=None) -> slice:
+        """
+        爬取时间范围对应的行区间
+
+        Args:
+            since: 起始时间（含），datetime、ISO 字符串或秒级时间戳
+            until: 截止时间（不含）
+
+        Returns:
+            行切片
+        """
+        times = self.columns()['crawl_time']
+        start = int(np.searchsorted(times, _to_epoch(since), 'left')) if since is not None else 0
+        stop = int(np.searchsorted(times, _to_epoch(until), 'left')) if until is not None else len(times)
+        return slice(start, max(start, stop))
+
+    def scan(self, since=None, until=None, columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        按爬取时间范围读取列，返回映射文件上的切片视图，不复制数据
+
+        Args:
+            since: 起始时间（含）
+            until: 截止时间（不含）
+            columns: 需要的列名，默认全部
+
+        Returns:
+            列名到数组视图的映射
+        """
+        mapped = self.columns()
+        rows = self.range(since, until)
+        return {name: mapped[name][rows] for name in (columns or COLUMN_DTYPES)}
+
+    def series(self, question_id: str, since=None, until=None) -> Dict[str, np.ndarray]:
+        """
+        单个问题在时间范围内的快照序列
+
+        Args:
+            question_id: 问题ID
+            since: 起始时间（含）
+            until: 截止时间（不含）
+
+        Returns:
+            除 question 外各列的数组，问题不存在时均为空数组
+        """
+        scanned = self.scan(since, until)
+        index = self._index.get(question_id)
+        mask = scanned['question'] == index if index is not None else np.zeros(len(scanned['question']), bool)
+        return {name: np.asarray(values[mask]) for name, values in scanned.items() if name != 'question'}
+
+    def index_of(self, question_id: str) -> Optional[int]:
+        """问题ID在字符串字典中的序号"""
+        return self._index.get(question_id)
+
+    def question_id(self, index: int) -> str:
+        """字符串字典序号对应的问题ID"""
+        return self._question_ids[index]
+
+    def title(self, index: int) -> str:
+        """字符串字典序号对应问题的最新标题"""
+        return self._titles[index]
+
+    @property
+    def question_count(self) -> int:
+        """字符串字典中的问题数"""
+        return len(self._question_ids)
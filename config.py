@@ -13,7 +13,11 @@ DATABASE_CONFIG = {
     'port': os.getenv('DB_PORT', '5432'),
     'database': os.getenv('DB_NAME', 'zhihu_hot'),
     'username': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', 'password')
+    'password': os.getenv('DB_PASSWORD', 'password'),
+    # 存储后端: postgresql（生产）、sqlite（单节点采集，WAL模式）、duckdb（列式分析）
+    'backend': os.getenv('DB_BACKEND', 'postgresql'),
+    'sqlite_path': os.getenv('SQLITE_PATH', 'zhihu_hot.db'),
+    'duckdb_path': os.getenv('DUCKDB_PATH', 'zhihu_hot.duckdb')
 }
 
 # 爬虫配置
@@ -21,6 +25,11 @@ SPIDER_CONFIG = {
     # 使用知乎热榜页面而不是API
     'zhihu_hot_url': 'https://www.zhihu.com/hot',
     'zhihu_api_url': 'https://www.zhihu.com/api/v3/feed/topstory/hot-lists/total?limit=50&desktop=true',
+    'question_api_url': 'https://www.zhihu.com/api/v4/questions/{question_id}?include=excerpt,answer_count,follower_count',
+    # 按最后编辑时间倒序的回答列表，通过 paging.next 游标翻页
+    'answers_api_url': 'https://www.zhihu.com/api/v4/questions/{question_id}/answers'
+                       '?include=content,excerpt,voteup_count,comment_count,created_time,updated_time'
+                       '&limit={limit}&offset=0&sort_by=updated',
     'headers': {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
         # 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
@@ -51,12 +60,236 @@ SPIDER_CONFIG = {
     'timeout': 30,
     'retry_times': 3,
     'retry_delay': 5,
-    'use_api': os.getenv('USE_API')  # 默认使用HTML解析，如果需要API则设为True
+    'use_api': os.getenv('USE_API'),  # 默认使用HTML解析，如果需要API则设为True
+    'stream_parse': os.getenv('STREAM_PARSE', '1') == '1',  # 边下载边解析热榜页面，列表结束后停止下载
+    'stream_chunk_size': 16384,  # 流式读取页面的块大小（字节）
+    'max_hot_items': 50  # 热榜条目数上限，流式解析达到后停止下载
 }
 
 # 日志配置
 LOG_CONFIG = {
-    'level': 'INFO',
+    'level': os.getenv('LOG_LEVEL', 'INFO').upper(),
     'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    'file': 'spider.log'
+    'file': 'spider.log',
+    'json': os.getenv('LOG_JSON', '0') == '1',  # 日志文件使用JSON Lines格式
+    'max_bytes': int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024))),  # 按大小轮转的阈值
+    'rotate_when': os.getenv('LOG_ROTATE_WHEN', ''),  # 设置后按时间轮转，如 midnight、H
+    'backup_count': int(os.getenv('LOG_BACKUP_COUNT', '5')),  # 保留的历史日志文件数
+    'rate_limit_interval': 60,  # 重复日志限流窗口（秒）
+    'rate_limit_burst': 10  # 同一条日志在窗口内最多输出的次数
+}
+
+# 批量导入配置
+IMPORT_CONFIG = {
+    'batch_size': int(os.getenv('IMPORT_BATCH_SIZE', '50000')),  # 每批COPY的记录数
+    'checkpoint_dir': os.getenv('IMPORT_CHECKPOINT_DIR', '.import_checkpoints'),
+    'progress_interval': 5  # 进度日志的最小间隔（秒）
+}
+
+# 连接池配置
+POOL_CONFIG = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),         # PostgreSQL 常驻连接数
+    'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),   # 突发时额外允许的连接数
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '3600')),  # 连接存活超过该秒数后重连
+    'telemetry': os.getenv('POOL_TELEMETRY', '1') != '0',      # 统计检出等待、建连耗时等指标
+    # 自适应模式：按最近若干次运行的检出峰值确定常驻连接数，按观测到的连接池数扩大 HTTP 连接池
+    'adaptive': os.getenv('POOL_ADAPTIVE', '0') == '1',
+    'state_file': os.getenv('POOL_STATE_FILE', '.pool_state.json'),
+    'history': 20,         # 保留的运行次数
+    'headroom': 1.25,      # 常驻连接数 = 检出峰值的90分位 × headroom
+    'min_size': 1,
+    'save_interval': 300,  # 运行中写入检出峰值的最小间隔（秒）
+    'http_pool_connections': int(os.getenv('HTTP_POOL_CONNECTIONS', '0')),  # 0 表示按代理数确定
+    'http_max_pools': 256  # 自适应扩大 HTTP 连接池数的上限
+}
+
+# 查询缓存配置
+CACHE_CONFIG = {
+    'enabled': os.getenv('QUERY_CACHE', '1') != '0',
+    'max_entries': 128,
+    'disk_dir': os.getenv('QUERY_CACHE_DIR')  # 设置后缓存在多个进程之间共享
+}
+
+# HTTP查询服务配置
+SERVER_CONFIG = {
+    'host': os.getenv('SERVE_HOST', '127.0.0.1'),
+    'port': int(os.getenv('SERVE_PORT', '8080')),
+    'refresh_interval': 30,  # 检查是否有新爬取数据的间隔（秒）
+    'history_days': 7,       # 内存快照中保留的问题历史天数
+    'movers_limit': 20       # 涨跌榜返回条数
+}
+
+# 异步数据库配置
+ASYNC_DATABASE_CONFIG = {
+    'driver': os.getenv('ASYNC_DB_DRIVER', 'postgresql+asyncpg'),
+    'pool_size': 10,
+    'max_overflow': 20,
+    'batch_size': 1000  # 每批upsert的行数
+}
+
+# 趋势分析配置
+ANALYTICS_CONFIG = {
+    'window_hours': 24,  # 分析窗口（小时）
+    'top_limit': 10      # 默认返回的上升榜条数
+}
+
+# 全文检索配置
+SEARCH_CONFIG = {
+    'enabled': os.getenv('SEARCH_INDEX', '0') == '1',  # 开启后 save_hot_items 会增量更新索引
+    'index_dir': os.getenv('SEARCH_INDEX_DIR', '.search_index'),
+    'merge_threshold': 5000,  # 增量段文档数超过该值时合并为新的主段
+    'default_limit': 20
+}
+
+# 列式快照配置
+COLUMNAR_CONFIG = {
+    'enabled': os.getenv('COLUMN_STORE', '0') == '1',  # 开启后 save_hot_items 会追加每次爬取的快照
+    'data_dir': os.getenv('COLUMN_STORE_DIR', '.columns'),
+    'fsync': os.getenv('COLUMN_STORE_FSYNC', '0') == '1',  # 每次追加后刷盘
+    'rebuild_batch_size': 100000
+}
+
+# 事件聚类配置
+CLUSTER_CONFIG = {
+    'enabled': os.getenv('EVENT_CLUSTERING', '1') != '0',
+    'data_dir': os.getenv('CLUSTER_DATA_DIR', '.clusters'),
+    'num_perm': 128,      # MinHash签名长度
+    'bands': 32,          # LSH分段数，每段 num_perm / bands 行
+    'threshold': 0.5,     # 并入已有事件簇的最低估计相似度
+    'excerpt_chars': 100  # 参与计算的摘要前缀长度
+}
+
+# 标题热词统计配置
+TERMS_CONFIG = {
+    'enabled': os.getenv('TERM_STATS', '0') == '1',  # 开启后每次爬取更新热词统计
+    'data_dir': os.getenv('TERM_STATS_DIR', '.terms'),
+    'ngram_sizes': (2, 3),  # 标题切分的字符 n-gram 长度
+    # 窗口名称 -> (窗口长度秒数, 时间片数)，时间片越多窗口滑动越平滑
+    'windows': {'hour': (3600, 12), 'day': (86400, 24), 'week': (7 * 86400, 28)},
+    'width': 8192,     # Count-Min Sketch 每行计数器数（2的幂），误差约为窗口总量的 e/width
+    'depth': 4,        # Count-Min Sketch 行数，估计超出误差上界的概率约为 e^-depth
+    'capacity': 256,   # 每个窗口跟踪的热词计数器数
+    'top_k': 20,
+    # 包含这些词的 n-gram 不计入，过滤提问句式中的高频虚词
+    'stop_terms': ('如何', '怎么', '什么', '为什么', '哪些', '看待', '评价', '是否', '有没有', '可以',
+                   '一个', '这个', '那个', '自己', '我们', '他们', '没有', '如果', '现在', '知道')
+}
+
+# 变更事件配置
+EVENTS_CONFIG = {
+    # 事件接收端，逗号分隔: file / unix / webhook / pg_notify，留空则不检测变更
+    'sinks': [name.strip() for name in os.getenv('EVENT_SINKS', 'file').split(',') if name.strip()],
+    'log_file': os.getenv('EVENT_LOG_FILE', 'events.jsonl'),
+    'socket_path': os.getenv('EVENT_SOCKET_PATH', '/tmp/zhihu_hot_events.sock'),
+    'webhook_urls': [url.strip() for url in os.getenv('EVENT_WEBHOOK_URLS', '').split(',') if url.strip()],
+    'webhook_timeout': 3,
+    'pg_channel': os.getenv('EVENT_PG_CHANNEL', 'zhihu_hot_events'),
+    'rank_change_min': 3,  # 排名变化达到该名次数才产生事件
+    # 热度阈值（与热榜显示的"万热度"单位一致）
+    'hot_thresholds': [float(v) for v in os.getenv('EVENT_HOT_THRESHOLDS', '500,1000,2000').split(',') if v.strip()]
+}
+
+# 关注词表配置
+WATCHLIST_CONFIG = {
+    # 词表目录，每个 .txt 文件是一个词表（文件名即词表名），每行一个关注词；留空关闭
+    'dir': os.getenv('WATCHLIST_DIR', ''),
+    'fields': ('title', 'excerpt'),  # 参与匹配的字段
+    'merge_threshold': 1000  # 增量自动机的关注词数超过该值时合并重建主自动机
+}
+
+# 分布式任务队列配置
+QUEUE_CONFIG = {
+    'lease_seconds': 120,       # 租约时长，节点失联超过该时间后任务可被其他节点领取
+    'heartbeat_interval': 30,   # 心跳续约间隔（秒）
+    'poll_interval': 2,         # 队列为空时的轮询间隔（秒）
+    'concurrency': int(os.getenv('WORKER_CONCURRENCY', '4')),  # 每个节点同时执行的任务数
+    'max_attempts': 3,
+    'retry_backoff': 30,        # 失败重试的基础退避时间（秒），按尝试次数指数增长
+    'detail_tasks': os.getenv('QUEUE_DETAIL_TASKS', '1') != '0',  # 热榜爬取后为每个问题入队详情任务
+    'answer_tasks': os.getenv('QUEUE_ANSWER_TASKS', '0') == '1',  # 热榜爬取后为前 ANSWER_TOP_N 个问题入队回答任务
+    'retention_days': 7         # 已完成任务的保留天数
+}
+
+# 定时爬取主节点选举配置
+LEADER_CONFIG = {
+    'lock_key': int(os.getenv('SCHEDULER_LOCK_KEY', '7239114001')),  # PostgreSQL advisory lock 键
+    'lock_file': os.getenv('SCHEDULER_LOCK_FILE', '.scheduler.lock'),  # 其他后端使用的本地锁文件
+    'poll_interval': 2  # 备用节点尝试接管、主节点检查锁状态的间隔（秒）
+}
+
+# 统计汇总配置
+ROLLUP_CONFIG = {
+    'enabled': os.getenv('ROLLUPS', '1') == '1'  # 每次保存时在同一事务中更新小时/天汇总表
+}
+
+# 排名历史分级保留配置：近期保留每次爬取的快照，较早的降采样为小时桶，更早的降采样为天桶并永久保留
+RETENTION_CONFIG = {
+    'enabled': os.getenv('RETENTION', '0') == '1',  # 开启后每次爬取后降采样一部分过期快照
+    'raw_days': int(os.getenv('RETENTION_RAW_DAYS', '7')),  # 完整快照保留天数
+    'hourly_days': int(os.getenv('RETENTION_HOURLY_DAYS', '90')),  # 小时桶保留天数，之后合并为天桶
+    'batch_size': 5000,       # 每批处理的快照/小时桶行数（按整次爬取/整个时间桶取齐）
+    'batches_per_crawl': 2    # 每次爬取后最多处理的批数，积压的数据在之后的爬取中逐步处理
+}
+
+# 回答爬取配置
+ANSWER_CONFIG = {
+    'top_n': int(os.getenv('ANSWER_TOP_N', '10')),  # 爬取最近一次榜单前N个问题的回答
+    'page_size': 20,  # 每页回答数
+    'max_pages': int(os.getenv('ANSWER_MAX_PAGES', '0')),  # 每个问题最多翻页数，0 表示不限
+    'batch_size': 200,  # 累积多少条回答写入一次数据库
+    'concurrency': int(os.getenv('ANSWER_CONCURRENCY', '4')),  # 同时爬取的问题数
+    'store_content': os.getenv('ANSWER_STORE_CONTENT', '1') == '1'  # 是否保存回答正文
+}
+
+# 出口代理池配置（PROXY_URLS 留空时直连）
+PROXY_CONFIG = {
+    'proxies': [url.strip() for url in os.getenv('PROXY_URLS', '').split(',') if url.strip()],
+    # 需要固定出口IP的域名（如登录态与IP绑定），同一域名的请求固定走同一个代理，直到该代理被剔除
+    'sticky_hosts': [host.strip() for host in os.getenv('PROXY_STICKY_HOSTS', '').split(',') if host.strip()],
+    'latency_alpha': 0.3,        # 延迟和错误率的指数移动平均系数
+    'min_samples': 5,            # 至少请求这么多次后才按错误率剔除
+    'max_error_rate': 0.5,       # 错误率超过该值时剔除
+    'max_consecutive_failures': 3,  # 连续失败次数达到该值时剔除
+    'eject_seconds': 60,         # 首次剔除时长，重复剔除时按次数翻倍
+    'max_eject_seconds': 1800,   # 剔除时长上限
+    'ban_statuses': (403, 429),  # 视为被封禁的响应状态码，立即剔除
+    'ban_url_keywords': ('unhuman', 'captcha')  # 重定向到验证页面时视为被封禁
+}
+
+# 请求身份池配置：每个身份是一组 Cookie + User-Agent + 请求头模板，各自有独立的请求预算
+IDENTITY_CONFIG = {
+    # JSON 文件，内容为身份列表，每项可含 name、cookie、user_agent、profile、headers、rate_per_minute、burst；
+    # 留空时使用 ZH_COOKIE 和 SPIDER_CONFIG['headers'] 组成单个身份
+    'file': os.getenv('IDENTITY_FILE', ''),
+    'rate_per_minute': float(os.getenv('IDENTITY_RATE_PER_MINUTE', '30')),  # 每个身份每分钟的请求数，0 表示不限
+    'burst': int(os.getenv('IDENTITY_BURST', '5')),  # 允许的突发请求数
+    'max_wait': 60,                 # 所有身份预算用尽时最多等待的秒数
+    'max_consecutive_failures': 3,  # 连续失败次数达到该值时进入冷却
+    'cooldown_seconds': 300,        # 首次冷却时长，重复冷却时按次数翻倍
+    'max_cooldown_seconds': 3600,   # 冷却时长上限
+    # 请求头模板，身份通过 profile 引用，headers 中的同名字段优先
+    'header_profiles': {
+        'default': {},
+        'desktop': {
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
+        },
+        'api': {
+            'Accept': 'application/json, text/plain, */*',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+            'Referer': 'https://www.zhihu.com/hot',
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+    }
+}
+
+# 图片素材配置
+MEDIA_CONFIG = {
+    'enabled': os.getenv('MEDIA_ASSETS', '0') == '1',  # 开启后每次爬取在后台下载条目的缩略图和封面图
+    'data_dir': os.getenv('MEDIA_DIR', '.media'),
+    'concurrency': int(os.getenv('MEDIA_CONCURRENCY', '4')),  # 同时下载的图片数
+    'max_pending': 500,        # 排队中的下载数上限，超出的链接留到下一次爬取
+    'recheck_seconds': int(os.getenv('MEDIA_RECHECK_SECONDS', '86400')),  # 该时间内检查过的链接不再发请求
+    'max_bytes': 10 * 1024 * 1024,  # 单个图片的大小上限
+    'referer': 'https://www.zhihu.com/'
 }
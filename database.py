@@ -2,41 +2,137 @@
 数据库操作模块 - 处理数据库连接、创建表、数据插入等操作
 """
 import logging
-from sqlalchemy import create_engine
+from sqlalchemy import bindparam, create_engine, func, inspect, select, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 from contextlib import contextmanager
-from typing import List, Optional
-from models import Base, ZhihuHotItem
-from config import DATABASE_CONFIG
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from models import Base, ZhihuAnswer, ZhihuHotItem, ZhihuHotSnapshot, ZhihuWatchHit
+from config import CACHE_CONFIG, SEARCH_CONFIG, ROLLUP_CONFIG, COLUMNAR_CONFIG, POOL_CONFIG
+from cache import QueryCache
+from search import SearchIndex
+from columnar import ColumnStore
+import rollups
+import retention
+from telemetry import PoolTelemetry
+from backends import StorageBackend, build_upsert_rows, create_backend
 
 logger = logging.getLogger(__name__)
 
-class DatabaseManager:
+class CrawlWriteMixin:
+    """
+    同步和异步数据库管理器共用的爬取写入路径
+
+    汇总表、条目和快照在同一事务中写入（_write_crawl 接收同步会话，异步管理器通过
+    run_sync 调用），事务提交后由 _after_commit 使查询缓存失效并增量更新检索索引和列式快照。
+    建表同样共用 _create_schema。
+    """
+    
+    def _create_schema(self, connection):
+        """在调用方的事务中建表并补齐新增的列"""
+        self.backend.prepare_schema(connection)
+        Base.metadata.create_all(bind=connection)
+        self._add_missing_columns(connection)
+    
+    def _add_missing_columns(self, connection):
+        """
+        为已存在的表补充模型中新增的可空列及其索引
+        
+        create_all 不会修改已存在的表，新版本增加的列在这里以 ALTER TABLE 补齐
+        """
+        inspector = inspect(connection)
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                logger.info("已为表 %s 添加列 %s", table.name, column.name)
+                for index in table.indexes:
+                    if column in index.columns.values():
+                        index.create(connection, checkfirst=True)
+    
+    def _init_write_hooks(self):
+        """按配置创建查询缓存、检索索引和列式快照"""
+        self.query_cache = QueryCache(
+            max_entries=CACHE_CONFIG['max_entries'],
+            disk_dir=CACHE_CONFIG['disk_dir']
+        ) if CACHE_CONFIG['enabled'] else None
+        self.search_index = SearchIndex(
+            SEARCH_CONFIG['index_dir'],
+            merge_threshold=SEARCH_CONFIG['merge_threshold']
+        ) if SEARCH_CONFIG['enabled'] else None
+        self.column_store = ColumnStore(
+            COLUMNAR_CONFIG['data_dir'],
+            fsync=COLUMNAR_CONFIG['fsync']
+        ) if COLUMNAR_CONFIG['enabled'] else None
+    
+    def _write_crawl(self, session, item_rows: List[dict], snapshot_rows: List[dict], crawl_time: datetime,
+                     batch_size: int = 1000):
+        """在调用方的事务中写入一次爬取"""
+        # 汇总依赖写入前的历史快照，需先于快照写入
+        if ROLLUP_CONFIG['enabled']:
+            rollups.apply_crawl(session, self.backend, snapshot_rows, crawl_time)
+        self.backend.bulk_upsert(session, item_rows, snapshot_rows, batch_size=batch_size)
+    
+    def _after_commit(self, items: List[dict], item_rows: List[dict], snapshot_rows: List[dict],
+                      crawl_time: datetime):
+        """事务提交后使查询缓存失效，并增量更新检索索引和列式快照"""
+        self.invalidate_cache()
+        self._update_search_index(items, crawl_time)
+        self._update_column_store(item_rows, snapshot_rows)
+    
+    def _update_search_index(self, items: List[dict], crawl_time: datetime):
+        """将新数据加入检索索引，索引失败不影响数据保存"""
+        if self.search_index is None:
+            return
+        try:
+            added = self.search_index.add_items(items, crawl_time)
+            logger.debug("检索索引新增 %d 篇文档", added)
+        except Exception as e:
+            logger.error("更新检索索引失败: %s", e)
+    
+    def _update_column_store(self, item_rows: List[dict], snapshot_rows: List[dict]):
+        """将本次爬取的快照追加到列式存储，追加失败不影响数据保存"""
+        if self.column_store is None:
+            return
+        try:
+            titles = {row['question_id']: row['title'] for row in item_rows if row.get('title')}
+            self.column_store.append(snapshot_rows, titles)
+        except Exception as e:
+            logger.error("追加列式快照失败: %s", e)
+    
+    def invalidate_cache(self):
+        """使查询缓存失效，在写入新数据后调用"""
+        if self.query_cache is not None:
+            self.query_cache.invalidate()
+
+
+class DatabaseManager(CrawlWriteMixin):
     """数据库管理器"""
     
-    def __init__(self):
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        self.backend = backend or create_backend()
         self.engine = None
         self.SessionLocal = None
+        self.pool_telemetry = None
+        self._init_write_hooks()
         self._init_database()
     
     def _init_database(self):
         """初始化数据库连接"""
         try:
-            # 构建数据库连接字符串
-            db_url = (
-                f"postgresql://{DATABASE_CONFIG['username']}:"
-                f"{DATABASE_CONFIG['password']}@{DATABASE_CONFIG['host']}:"
-                f"{DATABASE_CONFIG['port']}/{DATABASE_CONFIG['database']}"
-            )
-            
+            # 连接字符串和连接池参数由存储后端决定
             self.engine = create_engine(
-                db_url,
+                self.backend.url(),
                 echo=False,  # 设置为True可以看到SQL语句
-                pool_size=10,
-                max_overflow=20,
-                pool_recycle=3600
+                **self.backend.engine_kwargs()
             )
+            self.backend.configure_engine(self.engine)
+            if POOL_CONFIG['telemetry']:
+                self.pool_telemetry = PoolTelemetry(self.engine, self.backend.name)
             
             # 创建会话工厂
             self.SessionLocal = sessionmaker(
@@ -45,7 +141,7 @@ class DatabaseManager:
                 bind=self.engine
             )
             
-            logger.info("数据库连接初始化成功")
+            logger.info("数据库连接初始化成功 (后端: %s)", self.backend.name)
             
         except Exception as e:
             logger.error(f"数据库连接初始化失败: {e}")
@@ -54,12 +150,17 @@ class DatabaseManager:
     def create_tables(self):
         """创建数据表"""
         try:
-            Base.metadata.create_all(bind=self.engine)
+            with self.engine.begin() as conn:
+                self._create_schema(conn)
             logger.info("数据表创建成功")
         except SQLAlchemyError as e:
             logger.error(f"创建数据表失败: {e}")
             raise
     
+    def pool_stats(self) -> Optional[Dict]:
+        """连接池监控指标，未开启监控时返回None"""
+        return self.pool_telemetry.stats() if self.pool_telemetry else None
+    
     @contextmanager
     def get_session(self):
         """获取数据库会话上下文管理器"""
@@ -74,12 +175,13 @@ class DatabaseManager:
         finally:
             session.close()
     
-    def save_hot_items(self, items: List[dict]) -> int:
+    def save_hot_items(self, items: List[dict], crawl_time: Optional[datetime] = None) -> int:
         """
-        保存热榜数据到数据库
+        保存热榜数据到数据库，并为本次爬取写入历史快照
         
         Args:
             items: 热榜数据列表
+            crawl_time: 爬取时间，默认为当前时间
             
         Returns:
             成功保存的条目数量
@@ -87,37 +189,31 @@ class DatabaseManager:
         if not items:
             return 0
             
-        saved_count = 0
-        
+        crawl_time = crawl_time or datetime.now()
+        item_rows, snapshot_rows = build_upsert_rows(items, crawl_time)
         with self.get_session() as session:
-            for item_data in items:
-                try:
-                    # 检查是否已存在
-                    existing_item = session.query(ZhihuHotItem).filter_by(
-                        question_id=item_data.get('question_id')
-                    ).first()
-                    
-                    if existing_item:
-                        # 更新现有记录
-                        for key, value in item_data.items():
-                            if hasattr(existing_item, key) and key != 'id':
-                                setattr(existing_item, key, value)
-                        logger.debug(f"更新热榜条目: {item_data.get('title', '')[:20]}...")
-                    else:
-                        # 创建新记录
-                        new_item = ZhihuHotItem(**item_data)
-                        session.add(new_item)
-                        logger.debug(f"添加新热榜条目: {item_data.get('title', '')[:20]}...")
-                    
-                    saved_count += 1
-                    
-                except Exception as e:
-                    logger.error(f"保存热榜条目失败: {e}, 数据: {item_data}")
-                    continue
+            # 汇总表与条目、快照在同一事务中更新
+            self._write_crawl(session, item_rows, snapshot_rows, crawl_time)
+        saved_count = len(item_rows)
         
+        self._after_commit(items, item_rows, snapshot_rows, crawl_time)
         logger.info(f"成功保存 {saved_count} 条热榜数据")
         return saved_count
     
+    def bulk_upsert(self, item_rows: List[dict], snapshot_rows: List[dict]):
+        """
+        使用存储后端的原生upsert批量写入热榜条目和历史快照
+        
+        Args:
+            item_rows: 热榜条目行列表
+            snapshot_rows: 历史快照行列表
+        """
+        if not item_rows and not snapshot_rows:
+            return
+        
+        with self.get_session() as session:
+            self.backend.bulk_upsert(session, item_rows, snapshot_rows)
+    
     def get_hot_items(self, limit: Optional[int] = None) -> List[ZhihuHotItem]:
         """
         获取热榜数据
@@ -126,13 +222,420 @@ class DatabaseManager:
             limit: 限制返回数量
             
         Returns:
-            热榜数据列表
+            热榜数据列表。启用查询缓存时列表是新建的，其中已分离的 ORM 对象与缓存及其他调用方共享，
+            调用方不应修改其属性
         """
+        if self.query_cache is None:
+            return self._query_hot_items(limit)
+        
+        items = self.query_cache.get_or_load(
+            'hot_items', {'limit': limit}, lambda: self._query_hot_items(limit)
+        )
+        return list(items)
+    
+    def _query_hot_items(self, limit: Optional[int] = None) -> List[ZhihuHotItem]:
+        """从数据库查询热榜数据"""
         with self.get_session() as session:
             query = session.query(ZhihuHotItem).order_by(ZhihuHotItem.created_time.desc())
             if limit:
                 query = query.limit(limit)
-            return query.all()
+            items = query.all()
+            # 在提交前分离对象，使其在会话关闭后仍可访问已加载的属性
+            session.expunge_all()
+            return items
+    
+    def get_snapshots(self, since: Optional[datetime] = None,
+                      until: Optional[datetime] = None) -> List[ZhihuHotSnapshot]:
+        """
+        获取历史快照数据
+        
+        Args:
+            since: 起始爬取时间（含）
+            until: 截止爬取时间（不含）
+            
+        Returns:
+            按爬取时间和排名排序的快照列表
+        """
+        with self.get_session() as session:
+            query = session.query(ZhihuHotSnapshot)
+            if since:
+                query = query.filter(ZhihuHotSnapshot.crawl_time >= since)
+            if until:
+                query = query.filter(ZhihuHotSnapshot.crawl_time < until)
+            snapshots = query.order_by(ZhihuHotSnapshot.crawl_time, ZhihuHotSnapshot.rank).all()
+            session.expunge_all()
+            return snapshots
+    
+    def get_snapshot_rows(self, since: Optional[datetime] = None,
+                          until: Optional[datetime] = None) -> List[tuple]:
+        """
+        以元组形式获取历史快照，跳过ORM对象构造，适合大批量分析读取
+        
+        Args:
+            since: 起始爬取时间（含）
+            until: 截止爬取时间（不含）
+            
+        Returns:
+            (question_id, crawl_time, rank, hot_index) 元组列表，按爬取时间排序
+        """
+        table = ZhihuHotSnapshot.__table__
+        stmt = select(table.c.question_id, table.c.crawl_time, table.c.rank, table.c.hot_index)
+        if since:
+            stmt = stmt.where(table.c.crawl_time >= since)
+        if until:
+            stmt = stmt.where(table.c.crawl_time < until)
+        stmt = stmt.order_by(table.c.crawl_time)
+        
+        with self.engine.connect() as conn:
+            return [tuple(row) for row in conn.execute(stmt)]
+    
+    def iter_snapshot_columns(self, batch_size: int = 10000):
+        """
+        按爬取时间逐批读取全部快照，用于重建列式存储
+        
+        Args:
+            batch_size: 每批读取的行数
+            
+        Yields:
+            含 question_id、crawl_time、rank、hot_index、answer_count、follower_count 的快照行字典
+        """
+        table = ZhihuHotSnapshot.__table__
+        columns = ('question_id', 'crawl_time', 'rank', 'hot_index', 'answer_count', 'follower_count')
+        stmt = select(*(table.c[name] for name in columns)).order_by(table.c.crawl_time, table.c.rank)
+        
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(stmt)
+            for rows in result.partitions(batch_size):
+                for row in rows:
+                    yield dict(zip(columns, row))
+    
+    def get_rollups(self, granularity: str = 'day', since: Optional[datetime] = None,
+                    until: Optional[datetime] = None) -> List[Dict]:
+        """
+        获取小时或天汇总统计
+        
+        Args:
+            granularity: 汇总粒度，hour 或 day
+            since: 起始时间桶（含）
+            until: 截止时间桶（不含）
+            
+        Returns:
+            按时间桶排序的汇总字典列表，含平均热度和换榜率
+        """
+        if granularity not in rollups.ROLLUP_MODELS:
+            raise ValueError(f"不支持的汇总粒度: {granularity}，可选: {', '.join(rollups.ROLLUP_MODELS)}")
+        
+        def load():
+            model = rollups.ROLLUP_MODELS[granularity]
+            with self.get_session() as session:
+                query = session.query(model)
+                if since:
+                    query = query.filter(model.bucket >= since)
+                if until:
+                    query = query.filter(model.bucket < until)
+                return [row.to_dict() for row in query.order_by(model.bucket)]
+        
+        if self.query_cache is None:
+            return load()
+        params = {'granularity': granularity, 'since': since, 'until': until}
+        return list(self.query_cache.get_or_load('rollups', params, load))
+    
+    def rebuild_rollups(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> int:
+        """
+        从历史快照重建汇总表，批量导入或修改历史数据后调用
+        
+        Args:
+            since: 起始时间（含），默认全部
+            until: 截止时间（不含），默认全部
+            
+        Returns:
+            写入的汇总行数
+        """
+        # 降采样后的快照已被删除，只能从完整快照开始的第一个整天重建，否则会清空更早的汇总
+        with self.engine.connect() as conn:
+            start = retention.raw_history_start(conn)
+        if start is not None:
+            start = rollups.bucket_start(start - timedelta(microseconds=1), 'day') + timedelta(days=1)
+            if since is None or since < start:
+                logger.warning("%s 之前的快照已降采样，汇总只从该时间开始重建", start)
+                since = start
+                if until is not None and until <= since:
+                    return 0
+        
+        written = rollups.rebuild(self.engine, since, until)
+        self.invalidate_cache()
+        return written
+    
+    def apply_retention(self, max_batches: Optional[int] = None, now: Optional[datetime] = None) -> Dict:
+        """
+        按分级保留策略降采样过期的历史快照
+        
+        Args:
+            max_batches: 本次最多处理的批数，默认处理到没有过期数据为止
+            now: 当前时间，默认 datetime.now()
+            
+        Returns:
+            retention.apply 的处理结果
+        """
+        result = retention.apply(self.engine, self.backend, now=now, max_batches=max_batches)
+        if result['batches']:
+            self.invalidate_cache()
+        return result
+    
+    def get_retention_counts(self) -> Dict[str, int]:
+        """
+        获取各级排名历史的行数
+        
+        Returns:
+            {'raw': 快照行数, 'hour': 小时桶行数, 'day': 天桶行数}
+        """
+        with self.engine.connect() as conn:
+            return retention.tier_counts(conn)
+    
+    def get_rank_history(self, question_id: str, since: Optional[datetime] = None,
+                         until: Optional[datetime] = None) -> List[Dict]:
+        """
+        获取一个问题的完整排名历史，近期为每次爬取的快照，较早的为小时桶和天桶
+        
+        Args:
+            question_id: 问题ID
+            since: 起始时间（含）
+            until: 截止时间（不含）
+            
+        Returns:
+            按时间排序的时间桶字典列表，含首末/最高/最低排名和热度指数
+        """
+        with self.engine.connect() as conn:
+            return retention.rank_history(conn, question_id, since, until)
+    
+    def get_latest_crawl_time(self) -> Optional[datetime]:
+        """
+        获取最近一次爬取的时间
+        
+        Returns:
+            最近一次爬取时间，无数据时返回None
+        """
+        with self.get_session() as session:
+            return session.query(func.max(ZhihuHotSnapshot.crawl_time)).scalar()
+    
+    def get_items_by_question_ids(self, question_ids: List[str]) -> Dict[str, ZhihuHotItem]:
+        """
+        按问题ID批量获取热榜条目
+        
+        Args:
+            question_ids: 问题ID列表
+            
+        Returns:
+            问题ID到热榜条目的映射
+        """
+        if not question_ids:
+            return {}
+        
+        with self.get_session() as session:
+            items = session.query(ZhihuHotItem).filter(
+                ZhihuHotItem.question_id.in_(list(question_ids))
+            ).all()
+            session.expunge_all()
+            return {item.question_id: item for item in items}
+    
+    def iter_search_documents(self, batch_size: int = 10000):
+        """
+        按首次出现时间逐批读取全部热榜条目，用于重建检索索引和事件聚类
+        
+        Args:
+            batch_size: 每批读取的行数
+            
+        Yields:
+            包含 question_id、title、excerpt、first_seen、last_seen 的文档字典
+        """
+        table = ZhihuHotItem.__table__
+        stmt = select(table.c.question_id, table.c.title, table.c.excerpt,
+                      table.c.created_time, table.c.updated_time).order_by(table.c.created_time, table.c.id)
+        
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(stmt)
+            for rows in result.partitions(batch_size):
+                for question_id, title, excerpt, created_time, updated_time in rows:
+                    yield {
+                        'question_id': question_id,
+                        'title': title,
+                        'excerpt': excerpt,
+                        'first_seen': created_time,
+                        'last_seen': updated_time or created_time
+                    }
+    
+    def update_item_fields(self, question_id: str, fields: Dict) -> bool:
+        """
+        更新单个热榜条目的字段（如问题详情中的回答数、关注数）
+        
+        Args:
+            question_id: 问题ID
+            fields: 字段名到新值的映射
+            
+        Returns:
+            条目是否存在
+        """
+        if not fields:
+            return False
+        
+        table = ZhihuHotItem.__table__
+        stmt = table.update().where(table.c.question_id == question_id).values(**fields)
+        with self.get_session() as session:
+            updated = session.execute(stmt).rowcount
+        
+        self.invalidate_cache()
+        return updated > 0
+    
+    def update_cluster_ids(self, cluster_ids: Dict[str, str], batch_size: int = 1000) -> int:
+        """
+        批量更新热榜条目的事件簇ID
+        
+        Args:
+            cluster_ids: 问题ID到簇ID的映射
+            batch_size: 每批更新的行数
+            
+        Returns:
+            提交更新的条目数
+        """
+        if not cluster_ids:
+            return 0
+        
+        table = ZhihuHotItem.__table__
+        stmt = table.update().where(table.c.question_id == bindparam('qid')).values(cluster_id=bindparam('cid'))
+        rows = [{'qid': question_id, 'cid': cluster_id} for question_id, cluster_id in cluster_ids.items()]
+        
+        with self.get_session() as session:
+            for start in range(0, len(rows), batch_size):
+                session.execute(stmt, rows[start:start + batch_size])
+        
+        self.invalidate_cache()
+        return len(rows)
+    
+    def get_answer_versions(self, answer_ids: List[str]) -> Dict[str, Optional[datetime]]:
+        """
+        获取已保存回答的最后编辑时间，用于增量爬取时判断回答是否已存在且未修改
+        
+        Args:
+            answer_ids: 回答ID列表
+            
+        Returns:
+            已存在的回答ID到最后编辑时间的映射
+        """
+        if not answer_ids:
+            return {}
+        
+        table = ZhihuAnswer.__table__
+        stmt = select(table.c.answer_id, table.c.updated_at).where(table.c.answer_id.in_(list(answer_ids)))
+        with self.engine.connect() as conn:
+            return {answer_id: updated_at for answer_id, updated_at in conn.execute(stmt)}
+    
+    def upsert_answers(self, rows: List[Dict], batch_size: int = 1000) -> int:
+        """
+        批量写入回答
+        
+        Args:
+            rows: 回答行列表，同一回答出现多次时以最后编辑时间最新的一行为准
+            batch_size: 每批写入的行数
+            
+        Returns:
+            写入的行数
+        """
+        # 同一条语句中重复的主键在 PostgreSQL 的 ON CONFLICT DO UPDATE 中会报错
+        latest = {}
+        for row in rows:
+            current = latest.get(row['answer_id'])
+            if current is None or (row['updated_at'] or datetime.min) >= (current['updated_at'] or datetime.min):
+                latest[row['answer_id']] = row
+        rows = list(latest.values())
+        if not rows:
+            return 0
+        
+        stmt = self.backend.answer_upsert_statement()
+        with self.get_session() as session:
+            for start in range(0, len(rows), batch_size):
+                session.execute(stmt, rows[start:start + batch_size])
+        return len(rows)
+    
+    def mark_answers_crawled(self, question_id: str, crawl_time: datetime) -> bool:
+        """
+        记录问题的回答已完整爬取一遍，之后的增量爬取遇到已保存的回答即可停止翻页
+        
+        Args:
+            question_id: 问题ID
+            crawl_time: 本次爬取开始时间
+            
+        Returns:
+            条目是否存在
+        """
+        table = ZhihuHotItem.__table__
+        # 显式保留 updated_time，避免 onupdate 把条目的最后上榜时间改成回答爬取时间
+        stmt = table.update().where(table.c.question_id == question_id).values(
+            answers_crawled_time=crawl_time, updated_time=table.c.updated_time
+        )
+        with self.get_session() as session:
+            updated = session.execute(stmt).rowcount
+        return updated > 0
+    
+    def get_watch_hit_keys(self, question_ids: List[str]) -> set:
+        """
+        获取问题已有的关注词命中，用于判断本次命中是否为首次命中
+        
+        Args:
+            question_ids: 问题ID列表
+            
+        Returns:
+            (question_id, watchlist, keyword) 集合
+        """
+        if not question_ids:
+            return set()
+        
+        table = ZhihuWatchHit.__table__
+        stmt = select(table.c.question_id, table.c.watchlist, table.c.keyword).where(
+            table.c.question_id.in_(list(question_ids))
+        )
+        with self.engine.connect() as conn:
+            return {tuple(row) for row in conn.execute(stmt)}
+    
+    def record_watch_hits(self, rows: List[Dict], batch_size: int = 1000) -> int:
+        """
+        批量记录关注词命中
+        
+        Args:
+            rows: 含 question_id、watchlist、keyword、field、first_seen、last_seen 的命中行
+            batch_size: 每批写入的行数
+            
+        Returns:
+            写入的行数
+        """
+        if not rows:
+            return 0
+        
+        stmt = self.backend.watch_hit_upsert_statement()
+        with self.get_session() as session:
+            for start in range(0, len(rows), batch_size):
+                session.execute(stmt, rows[start:start + batch_size])
+        return len(rows)
+    
+    def get_watch_hits(self, watchlist: Optional[str] = None, since: Optional[datetime] = None,
+                       limit: int = 100) -> List[Dict]:
+        """
+        获取最近的关注词命中
+        
+        Args:
+            watchlist: 词表名称，默认全部
+            since: 最近一次命中时间的下限
+            limit: 返回条数
+            
+        Returns:
+            按最近命中时间倒序的命中字典列表
+        """
+        with self.get_session() as session:
+            query = session.query(ZhihuWatchHit)
+            if watchlist:
+                query = query.filter(ZhihuWatchHit.watchlist == watchlist)
+            if since:
+                query = query.filter(ZhihuWatchHit.last_seen >= since)
+            return [hit.to_dict() for hit in query.order_by(ZhihuWatchHit.last_seen.desc()).limit(limit)]
     
     def clear_old_data(self, days: int = 7):
         """
@@ -141,8 +644,6 @@ class DatabaseManager:
         Args:
             days: 保留最近几天的数据
         """
-        from datetime import datetime, timedelta
-        
         cutoff_date = datetime.now() - timedelta(days=days)
         
         with self.get_session() as session:
@@ -150,6 +651,7 @@ class DatabaseManager:
                 ZhihuHotItem.created_time < cutoff_date
             ).delete()
             
+        self.invalidate_cache()
         logger.info(f"清理了 {deleted_count} 条旧数据")
         return deleted_count
 
@@ -0,0 +1,403 @@
+"""
+变更事件模块 - 比较相邻两次爬取生成变更事件，并发布到可插拔的事件接收端
+"""
+import os
+import json
+import socket
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import requests
+from sqlalchemy import text
+
+from config import EVENTS_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 事件类型
+EVENT_ENTRY = 'entry'              # 新上榜
+EVENT_EXIT = 'exit'                # 下榜
+EVENT_RANK_UP = 'rank_up'          # 排名上升 N 名
+EVENT_RANK_DOWN = 'rank_down'      # 排名下降 N 名
+EVENT_HOT_THRESHOLD = 'hot_threshold'  # 热度越过阈值
+EVENT_TITLE_EDIT = 'title_edit'    # 标题被修改
+EVENT_WATCH_HIT = 'watch_hit'      # 首次命中关注词，见 watchlist.py
+
+EVENT_TYPES = (EVENT_ENTRY, EVENT_EXIT, EVENT_RANK_UP, EVENT_RANK_DOWN,
+               EVENT_HOT_THRESHOLD, EVENT_TITLE_EDIT, EVENT_WATCH_HIT)
+
+
+class ChangeDetector:
+    """
+    爬取变更检测器
+
+    在内存中保留上一次爬取的榜单（问题ID -> 排名、热度、标题），每次爬取与之比较生成事件。
+    进程启动后的第一次比较从数据库加载最近一次爬取的快照作为基线。
+    """
+
+    def __init__(self, rank_change_min: Optional[int] = None, hot_thresholds: Optional[List[float]] = None):
+        self.rank_change_min = rank_change_min or EVENTS_CONFIG['rank_change_min']
+        self.hot_thresholds = sorted(hot_thresholds if hot_thresholds is not None else EVENTS_CONFIG['hot_thresholds'])
+        self.previous = None
+        self.previous_time = None
+        self._sequence = 0
+
+    def load_baseline(self, db_manager):
+        """
+        从数据库加载最近一次爬取作为比较基线
+
+        Args:
+            db_manager: 数据库管理器
+        """
+        latest = db_manager.get_latest_crawl_time()
+        if latest is None:
+            self.previous = {}
+            return
+
+        rows = db_manager.get_snapshot_rows(since=latest)
+        items = db_manager.get_items_by_question_ids([row[0] for row in rows])
+        self.previous = {
+            question_id: {
+                'rank': rank,
+                'hot_index': hot_index or 0.0,
+                'title': items[question_id].title if question_id in items else None
+            }
+            for question_id, _, rank, hot_index in rows
+        }
+        self.previous_time = latest
+        logger.info("变更检测基线已加载: %s 的 %d 条数据", latest, len(self.previous))
+
+    def diff(self, items: List[Dict], crawl_time: datetime) -> List[Dict]:
+        """
+        计算本次爬取相对上一次爬取的变更事件（不修改基线）
+
+        Args:
+            items: 本次爬取的热榜数据（按榜单顺序）
+            crawl_time: 本次爬取时间
+
+        Returns:
+            事件列表
+        """
+        current = self._index(items)
+        if self.previous is None:
+            return []
+
+        events = []
+        for question_id, now in current.items():
+            before = self.previous.get(question_id)
+            if before is None:
+                events.append(self._event(EVENT_ENTRY, question_id, now, crawl_time))
+                continue
+
+            delta = (before['rank'] or 0) - now['rank']
+            if before['rank'] and abs(delta) >= self.rank_change_min:
+                event_type = EVENT_RANK_UP if delta > 0 else EVENT_RANK_DOWN
+                events.append(self._event(event_type, question_id, now, crawl_time,
+                                          previous_rank=before['rank'], delta=abs(delta)))
+
+            for threshold in self.hot_thresholds:
+                if (before['hot_index'] < threshold) != (now['hot_index'] < threshold):
+                    events.append(self._event(
+                        EVENT_HOT_THRESHOLD, question_id, now, crawl_time,
+                        previous_hot_index=before['hot_index'], threshold=threshold,
+                        direction='up' if now['hot_index'] >= threshold else 'down'
+                    ))
+
+            if before['title'] and now['title'] and before['title'] != now['title']:
+                events.append(self._event(EVENT_TITLE_EDIT, question_id, now, crawl_time,
+                                          previous_title=before['title']))
+
+        for question_id, before in self.previous.items():
+            if question_id not in current:
+                events.append(self._event(EVENT_EXIT, question_id, before, crawl_time,
+                                          previous_rank=before['rank'], rank=None))
+        return events
+
+    def update(self, items: List[Dict], crawl_time: datetime):
+        """
+        将本次爬取设为新的基线，在数据保存成功后调用
+
+        Args:
+            items: 本次爬取的热榜数据
+            crawl_time: 本次爬取时间
+        """
+        self.previous = self._index(items)
+        self.previous_time = crawl_time
+
+    @staticmethod
+    def _index(items: List[Dict]) -> Dict[str, Dict]:
+        """按问题ID索引榜单，排名缺失时取榜单位置"""
+        index = {}
+        for position, item in enumerate(items, 1):
+            question_id = item.get('question_id')
+            if question_id:
+                index[question_id] = {
+                    'rank': item.get('rank') or position,
+                    'hot_index': item.get('hot_index') or 0.0,
+                    'title': item.get('title')
+                }
+        return index
+
+    def _event(self, event_type: str, question_id: str, state: Dict, crawl_time: datetime, **fields) -> Dict:
+        """构造事件字典"""
+        self._sequence += 1
+        event = {
+            'id': f"{crawl_time.strftime('%Y%m%d%H%M%S')}-{self._sequence}",
+            'type': event_type,
+            'question_id': question_id,
+            'crawl_time': crawl_time.isoformat(),
+            'title': state['title'],
+            'rank': state['rank'],
+            'hot_index': state['hot_index']
+        }
+        event.update(fields)
+        return event
+
+
+class EventSink:
+    """事件接收端基类"""
+
+    name = None
+
+    def publish(self, events: List[Dict]):
+        """发布一批事件"""
+        raise NotImplementedError
+
+    def close(self):
+        """释放资源"""
+
+
+class FileSink(EventSink):
+    """只追加的 JSON Lines 事件日志"""
+
+    name = 'file'
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def publish(self, events: List[Dict]):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(event, ensure_ascii=False) + '\n' for event in events)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class UnixSocketSink(EventSink):
+    """
+    Unix 套接字广播
+
+    监听 socket_path，向所有已连接的客户端逐行推送 JSON 事件，断开或阻塞的客户端会被移除。
+    需要常驻进程（定时模式或服务模式）才能保持连接。
+    """
+
+    name = 'unix'
+
+    def __init__(self, path: str, send_timeout: float = 1.0):
+        self.path = path
+        self.send_timeout = send_timeout
+        self._clients = []
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            os.remove(path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen()
+        self._thread = threading.Thread(target=self._accept_loop, name='event-socket', daemon=True)
+        self._thread.start()
+        logger.info("事件套接字已监听: %s", path)
+
+    def _accept_loop(self):
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            client.settimeout(self.send_timeout)
+            with self._lock:
+                self._clients.append(client)
+
+    def publish(self, events: List[Dict]):
+        payload = ''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in events).encode('utf-8')
+        with self._lock:
+            alive = []
+            for client in self._clients:
+                try:
+                    client.sendall(payload)
+                    alive.append(client)
+                except OSError:
+                    client.close()
+            self._clients = alive
+
+    def close(self):
+        self._server.close()
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            self._clients = []
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class WebhookSink(EventSink):
+    """将每批事件以 JSON POST 到指定URL"""
+
+    name = 'webhook'
+
+    def __init__(self, urls: List[str], timeout: float = 3.0):
+        self.urls = urls
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def publish(self, events: List[Dict]):
+        for url in self.urls:
+            try:
+                response = self.session.post(url, json={'events': events}, timeout=self.timeout)
+                response.raise_for_status()
+            except requests.RequestException as e:
+                logger.error("推送事件到 %s 失败: %s", url, e)
+
+    def close(self):
+        self.session.close()
+
+
+class PgNotifySink(EventSink):
+    """通过 PostgreSQL NOTIFY 发布事件，消费者 LISTEN 同一频道即可实时收到"""
+
+    name = 'pg_notify'
+
+    # NOTIFY 载荷上限为 8000 字节
+    MAX_PAYLOAD = 7900
+
+    def __init__(self, engine, channel: str):
+        self.engine = engine
+        self.channel = channel
+
+    def publish(self, events: List[Dict]):
+        params = []
+        for event in events:
+            payload = json.dumps(event, ensure_ascii=False)
+            if len(payload.encode('utf-8')) > self.MAX_PAYLOAD:
+                payload = json.dumps(dict(event, title=None, previous_title=None), ensure_ascii=False)
+            params.append({'channel': self.channel, 'payload': payload})
+
+        # 同一事务内的通知在提交时一并送达
+        with self.engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), params)
+
+
+class EventPublisher:
+    """将事件分发到全部接收端，单个接收端失败不影响其他接收端"""
+
+    def __init__(self, sinks: List[EventSink]):
+        self.sinks = sinks
+
+    def publish(self, events: List[Dict]) -> int:
+        """
+        发布事件
+
+        Args:
+            events: 事件列表
+
+        Returns:
+            发布成功的接收端数量
+        """
+        if not events:
+            return 0
+
+        succeeded = 0
+        for sink in self.sinks:
+            try:
+                sink.publish(events)
+                succeeded += 1
+            except Exception as e:
+                logger.error("事件接收端 %s 发布失败: %s", sink.name, e)
+        return succeeded
+
+    def close(self):
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                logger.warning("关闭事件接收端 %s 失败: %s", sink.name, e)
+
+
+def create_publisher(db_manager=None, config: Optional[Dict] = None) -> EventPublisher:
+    """
+    按配置创建事件发布器
+
+    Args:
+        db_manager: 数据库管理器，pg_notify 接收端需要
+        config: 事件配置，默认使用 EVENTS_CONFIG
+
+    Returns:
+        事件发布器
+    """
+    config = config or EVENTS_CONFIG
+    sinks = []
+    for name in config['sinks']:
+        if name == FileSink.name:
+            sinks.append(FileSink(config['log_file']))
+        elif name == UnixSocketSink.name:
+            sinks.append(UnixSocketSink(config['socket_path']))
+        elif name == WebhookSink.name:
+            if config['webhook_urls']:
+                sinks.append(WebhookSink(config['webhook_urls'], timeout=config['webhook_timeout']))
+        elif name == PgNotifySink.name:
+            if db_manager is None or db_manager.backend.name != 'postgresql':
+                logger.warning("pg_notify 事件接收端需要 PostgreSQL 存储后端，已跳过")
+                continue
+            sinks.append(PgNotifySink(db_manager.engine, config['pg_channel']))
+        else:
+            raise ValueError(f"不支持的事件接收端: {name}")
+    return EventPublisher(sinks)
+
+
+def iter_socket_events(path: Optional[str] = None) -> Iterator[Dict]:
+    """
+    连接事件套接字并逐条读取事件
+
+    Args:
+        path: 套接字路径，默认使用 EVENTS_CONFIG['socket_path']
+
+    Yields:
+        事件字典
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path or EVENTS_CONFIG['socket_path'])
+        with client.makefile('r', encoding='utf-8') as stream:
+            for line in stream:
+                yield json.loads(line)
+
+
+def iter_pg_notifications(engine, channel: Optional[str] = None, timeout: float = 5.0) -> Iterator[Dict]:
+    """
+    LISTEN 指定频道并逐条读取事件
+
+    Args:
+        engine: PostgreSQL 引擎
+        channel: 频道名，默认使用 EVENTS_CONFIG['pg_channel']
+        timeout: 每次等待通知的超时时间（秒）
+
+    Yields:
+        事件字典
+    """
+    import select
+
+    connection = engine.raw_connection()
+    dbapi_connection = connection.dbapi_connection
+    try:
+        dbapi_connection.autocommit = True
+        with dbapi_connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {channel or EVENTS_CONFIG['pg_channel']}")
+        while True:
+            if select.select([dbapi_connection], [], [], timeout) == ([], [], []):
+                continue
+            dbapi_connection.poll()
+            while dbapi_connection.notifies:
+                yield json.loads(dbapi_connection.notifies.pop(0).payload)
+    finally:
+        dbapi_connection.autocommit = False
+        connection.close()
@@ -0,0 +1,265 @@
+"""
+身份池模块 - 在多组 Cookie/User-Agent/请求头之间调度请求，每个身份有独立的请求预算
+"""
+import json
+import time
+import logging
+import threading
+from http.cookies import SimpleCookie
+from typing import Callable, Dict, Iterable, List, Optional
+
+from requests.cookies import RequestsCookieJar
+
+from config import IDENTITY_CONFIG, SPIDER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def parse_cookie_header(cookie: str) -> RequestsCookieJar:
+    """将浏览器中复制的 Cookie 请求头解析为 Cookie 容器"""
+    jar = RequestsCookieJar()
+    parsed = SimpleCookie()
+    try:
+        parsed.load(cookie or '')
+    except Exception:
+        parsed = SimpleCookie()
+    if parsed:
+        for name, morsel in parsed.items():
+            jar.set(name, morsel.value)
+    else:
+        # SimpleCookie 遇到非标准字符会整体放弃，退回按分号逐项切分
+        for part in (cookie or '').split(';'):
+            name, sep, value = part.strip().partition('=')
+            if sep and name:
+                jar.set(name, value)
+    return jar
+
+
+class Identity:
+    """
+    一个请求身份：Cookie 容器、User-Agent 和请求头，以及令牌桶形式的请求预算
+
+    同一身份的请求始终带同一组 Cookie 和 User-Agent，响应中新下发的 Cookie 写回该身份的容器，
+    不会混入其他身份。
+    """
+
+    def __init__(self, name: str, cookie: str = '', user_agent: str = '', headers: Optional[Dict] = None,
+                 rate_per_minute: float = 0, burst: int = 1):
+        self.name = name
+        self.cookies = parse_cookie_header(cookie)
+        self.headers = {key: value for key, value in (headers or {}).items() if key.lower() != 'cookie'}
+        if user_agent:
+            self.headers['User-Agent'] = user_agent
+        self.rate = rate_per_minute / 60.0  # 每秒补充的令牌数，0 表示不限
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.refilled_at = None
+        self.requests = 0
+        self.failures = 0
+        self.bans = 0
+        self.consecutive_failures = 0
+        self.in_flight = 0
+        self.cooldowns = 0           # 累计冷却次数，决定下一次冷却时长
+        self.cooldown_until = 0.0
+
+    def _refill(self, now: float):
+        if self.refilled_at is not None and self.rate:
+            self.tokens = min(float(self.burst), self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def wait_time(self, now: float) -> float:
+        """距离该身份可以发出下一个请求的秒数"""
+        if self.cooldown_until > now:
+            return self.cooldown_until - now
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def update_cookies(self, response):
+        """把响应（含重定向过程）中下发的 Cookie 写回身份的容器"""
+        for resp in list(response.history) + [response]:
+            self.cookies.update(resp.cookies)
+
+    def to_dict(self, now: float) -> Dict:
+        """转换为字典格式，用于监控"""
+        if self.rate:
+            self._refill(now)
+        return {
+            'name': self.name,
+            'healthy': self.cooldown_until <= now,
+            'requests': self.requests,
+            'failures': self.failures,
+            'bans': self.bans,
+            'in_flight': self.in_flight,
+            'tokens': round(self.tokens, 2) if self.rate else None,
+            'rate_per_minute': self.rate * 60,
+            'cooldowns': self.cooldowns,
+            'cooldown_in': max(0.0, round(self.cooldown_until - now, 1))
+        }
+
+
+class IdentityPool:
+    """
+    请求身份池
+
+    每次请求选择当前可用（不在冷却中且预算有剩余）的身份中剩余令牌最多的一个，
+    请求均匀分散到所有身份，总吞吐随身份数增长而单个身份不超过自己的预算。
+    所有身份的预算都用尽时等待最早可用的身份，最多等待 max_wait 秒。
+    收到封禁信号或连续失败的身份进入冷却，冷却时长随次数翻倍，到期后自动恢复。
+
+    身份池在多个爬虫实例和线程之间共享，所有状态修改都在锁内完成。
+    """
+
+    def __init__(self, identities: Iterable[Identity], config: Optional[Dict] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            identities: 身份列表
+            config: 身份池配置，默认使用 IDENTITY_CONFIG
+            clock: 单调时钟，测试时可替换
+            sleep: 等待函数，测试时可替换
+        """
+        self.config = config or IDENTITY_CONFIG
+        self.identities = list(identities)
+        if not self.identities:
+            raise ValueError("身份池至少需要一个身份")
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.identities)
+
+    def acquire(self, max_wait: Optional[float] = None) -> Optional[Identity]:
+        """
+        为一次请求选择身份并扣除一次预算，请求结束后必须调用 release
+
+        Args:
+            max_wait: 所有身份预算用尽时最多等待的秒数，默认使用配置
+
+        Returns:
+            选中的身份，等待超时返回None
+        """
+        max_wait = self.config['max_wait'] if max_wait is None else max_wait
+        deadline = self.clock() + max_wait
+        while True:
+            with self._lock:
+                now = self.clock()
+                # 可用身份中优先剩余令牌多的，其次在途请求和累计请求少的，不限速时即轮流使用
+                wait, *_, index = min(
+                    (identity.wait_time(now), -identity.tokens, identity.in_flight, identity.requests, n)
+                    for n, identity in enumerate(self.identities)
+                )
+                if wait <= 0:
+                    identity = self.identities[index]
+                    if identity.rate:
+                        identity.tokens -= 1
+                    identity.in_flight += 1
+                    return identity
+            if now + wait > deadline:
+                logger.warning("所有身份的请求预算已用尽，%.1f 秒后才有可用身份", wait)
+                return None
+            self.sleep(wait)
+
+    def release(self, identity: Optional[Identity], ok: bool = True, banned: bool = False):
+        """
+        记录请求结果并更新身份健康状态
+
+        Args:
+            identity: acquire 返回的身份
+            ok: 请求是否成功
+            banned: 是否收到封禁信号
+        """
+        if identity is None:
+            return
+
+        with self._lock:
+            identity.in_flight -= 1
+            identity.requests += 1
+            if ok and not banned:
+                identity.consecutive_failures = 0
+                return
+
+            identity.failures += 1
+            identity.consecutive_failures += 1
+            if banned:
+                identity.bans += 1
+                self._cool_down(identity, '收到封禁信号')
+            elif identity.consecutive_failures >= self.config['max_consecutive_failures']:
+                self._cool_down(identity, f'连续失败 {identity.consecutive_failures} 次')
+
+    def _cool_down(self, identity: Identity, reason: str):
+        now = self.clock()
+        if identity.cooldown_until > now:
+            return
+        duration = min(self.config['cooldown_seconds'] * 2 ** identity.cooldowns,
+                       self.config['max_cooldown_seconds'])
+        identity.cooldowns += 1
+        identity.cooldown_until = now + duration
+        identity.consecutive_failures = 0
+        logger.warning("身份 %s 冷却 %d 秒: %s", identity.name, duration, reason)
+
+    def stats(self) -> List[Dict]:
+        """各身份的健康指标"""
+        with self._lock:
+            now = self.clock()
+            return [identity.to_dict(now) for identity in self.identities]
+
+
+def load_identities(config: Optional[Dict] = None) -> List[Identity]:
+    """
+    按配置加载身份列表
+
+    配置了 IDENTITY_FILE 时从 JSON 文件读取；否则以 ZH_COOKIE 和 SPIDER_CONFIG['headers']
+    组成单个身份，与未使用身份池时发出的请求一致。
+
+    Args:
+        config: 身份池配置，默认使用 IDENTITY_CONFIG
+
+    Returns:
+        身份列表
+    """
+    config = config or IDENTITY_CONFIG
+    profiles = config['header_profiles']
+    budget = {'rate_per_minute': config['rate_per_minute'], 'burst': config['burst']}
+
+    if not config['file']:
+        headers = SPIDER_CONFIG['headers']
+        return [Identity('default', cookie=headers.get('cookie', ''), headers=headers, **budget)]
+
+    with open(config['file'], 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+
+    identities = []
+    for n, entry in enumerate(entries):
+        profile = entry.get('profile', 'default')
+        if profile not in profiles:
+            raise ValueError(f"身份 {entry.get('name', n)} 引用了未定义的请求头模板: {profile}")
+        user_agent = entry.get('user_agent')
+        if not user_agent:
+            from fake_useragent import UserAgent
+            user_agent = UserAgent().random
+        identities.append(Identity(
+            entry.get('name') or f'identity-{n}',
+            cookie=entry.get('cookie', ''),
+            user_agent=user_agent,
+            headers=dict(profiles[profile], **entry.get('headers', {})),
+            rate_per_minute=entry.get('rate_per_minute', budget['rate_per_minute']),
+            burst=entry.get('burst', budget['burst'])
+        ))
+    return identities
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_identity_pool() -> IdentityPool:
+    """进程内共享的身份池，按 IDENTITY_CONFIG 创建，预算在所有爬虫实例之间共享"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = IdentityPool(load_identities())
+            logger.info("身份池初始化完成: %d 个身份", len(_default_pool))
+        return _default_pool
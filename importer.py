@@ -0,0 +1,398 @@
+"""
+批量导入模块 - 将历史JSON数据批量导入数据库（PostgreSQL使用COPY，其他后端使用原生批量upsert）
+"""
+import io
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from backends import ITEM_FIELDS
+from config import IMPORT_CONFIG
+from database import db_manager
+from processor import DataProcessor
+from utils import load_from_json, ensure_directory
+
+logger = logging.getLogger(__name__)
+
+# 暂存表字段顺序，与COPY数据行保持一致
+STAGING_COLUMNS = [
+    'seq', 'question_id', 'title', 'excerpt', 'url', 'hot_index',
+    'answer_count', 'follower_count', 'rank', 'crawl_time'
+]
+
+CREATE_STAGING_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS zhihu_import_staging (
+    seq BIGINT,
+    question_id VARCHAR(50),
+    title VARCHAR(500),
+    excerpt TEXT,
+    url VARCHAR(500),
+    hot_index DOUBLE PRECISION,
+    answer_count INTEGER,
+    follower_count INTEGER,
+    rank INTEGER,
+    crawl_time TIMESTAMP
+) ON COMMIT DELETE ROWS
+"""
+
+COPY_STAGING_SQL = f"COPY zhihu_import_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN"
+
+# 每个问题只保留最新的一条记录合并到主表，较旧的导入数据不会覆盖较新的数据
+MERGE_ITEMS_SQL = """
+INSERT INTO zhihu_hot_items (
+    question_id, title, excerpt, url, hot_index,
+    answer_count, follower_count, created_time, updated_time
+)
+SELECT DISTINCT ON (question_id)
+    question_id, title, excerpt, url, hot_index,
+    answer_count, follower_count, crawl_time, crawl_time
+FROM zhihu_import_staging
+ORDER BY question_id, crawl_time DESC, seq DESC
+ON CONFLICT (question_id) DO UPDATE SET
+    title = EXCLUDED.title,
+    excerpt = EXCLUDED.excerpt,
+    url = EXCLUDED.url,
+    hot_index = EXCLUDED.hot_index,
+    answer_count = EXCLUDED.answer_count,
+    follower_count = EXCLUDED.follower_count,
+    created_time = LEAST(zhihu_hot_items.created_time, EXCLUDED.created_time),
+    updated_time = EXCLUDED.updated_time
+WHERE zhihu_hot_items.updated_time IS NULL
+   OR zhihu_hot_items.updated_time <= EXCLUDED.updated_time
+"""
+
+# 历史快照按 (question_id, crawl_time) 幂等写入，断点续传时重复的批次不会产生重复数据
+MERGE_SNAPSHOTS_SQL = """
+INSERT INTO zhihu_hot_snapshots (
+    question_id, crawl_time, rank, hot_index, answer_count, follower_count
+)
+SELECT DISTINCT ON (question_id, crawl_time)
+    question_id, crawl_time, rank, hot_index, answer_count, follower_count
+FROM zhihu_import_staging
+ORDER BY question_id, crawl_time, seq DESC
+ON CONFLICT (question_id, crawl_time) DO NOTHING
+"""
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _copy_value(value) -> str:
+    """将单个值编码为COPY文本格式"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _parse_time(value) -> Optional[datetime]:
+    """解析记录中的时间字段"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _parse_hot_index(text) -> float:
+    """从热度文本（如 "1234 万热度"）中提取热度指数，规则与爬虫解析页面热度时一致"""
+    numbers = re.findall(r'(\d+(?:\.\d+)?)', str(text or ''))
+    return float(max(numbers, key=float)) if numbers else 0.0
+
+
+class BulkImporter:
+    """历史数据批量导入器"""
+
+    def __init__(self, batch_size: Optional[int] = None, checkpoint_dir: Optional[str] = None, manager=None):
+        """
+        Args:
+            batch_size: 每批导入的记录数，默认使用 IMPORT_CONFIG['batch_size']
+            checkpoint_dir: 检查点目录，默认使用 IMPORT_CONFIG['checkpoint_dir']
+            manager: 数据库管理器，默认使用全局 db_manager
+        """
+        self.db = manager or db_manager
+        self.batch_size = batch_size or IMPORT_CONFIG['batch_size']
+        self.checkpoint_dir = checkpoint_dir or IMPORT_CONFIG['checkpoint_dir']
+        # 已导入数据的 (最早, 最晚) 爬取时间，供导入后重建统计汇总
+        self.crawl_time_range = None
+
+    def import_file(self, filename: str, restart: bool = False) -> int:
+        """
+        导入单个JSON/JSON Lines文件
+
+        Args:
+            filename: 文件路径
+            restart: 是否忽略已有检查点从头导入
+
+        Returns:
+            本次导入的记录数
+        """
+        checkpoint_file = self._checkpoint_path(filename)
+        file_stat = os.stat(filename)
+
+        skip = 0
+        if not restart:
+            checkpoint = load_from_json(checkpoint_file) if os.path.exists(checkpoint_file) else None
+            if checkpoint and checkpoint.get('size') == file_stat.st_size \
+                    and checkpoint.get('mtime') == file_stat.st_mtime:
+                skip = checkpoint.get('records_done', 0)
+                logger.info("从检查点恢复导入: %s，跳过前 %d 条记录", filename, skip)
+
+        default_crawl_time = self._default_crawl_time(filename, file_stat.st_mtime)
+        records_done = skip
+        loaded_count = 0
+        started = time.monotonic()
+        last_report = started
+
+        # PostgreSQL 使用 COPY + 暂存表，其他后端使用各自的原生批量upsert
+        use_copy = self.db.backend.supports_copy
+        conn = self.db.engine.raw_connection() if use_copy else None
+        try:
+            if use_copy:
+                cursor = conn.cursor()
+                cursor.execute(CREATE_STAGING_SQL)
+                conn.commit()
+            else:
+                logger.info("存储后端 %s 不支持COPY，使用批量upsert导入", self.db.backend.name)
+
+            for batch_records, batch_rows in self._iter_batches(filename, skip, default_crawl_time):
+                if use_copy:
+                    self._copy_batch(conn, batch_rows)
+                elif batch_rows:
+                    self._upsert_batch(batch_rows)
+
+                records_done += batch_records
+                loaded_count += len(batch_rows)
+                self._extend_time_range(batch_rows)
+                self._save_checkpoint(checkpoint_file, filename, file_stat, records_done)
+
+                now = time.monotonic()
+                if now - last_report >= IMPORT_CONFIG['progress_interval']:
+                    rate = loaded_count / max(now - started, 1e-6)
+                    logger.info("导入进度: %s 已处理 %d 条记录，%.0f 行/秒", filename, records_done, rate)
+                    last_report = now
+        except Exception as e:
+            if conn is not None:
+                conn.rollback()
+            logger.error("批量导入失败: %s, 已提交 %d 条记录: %s", filename, records_done, e)
+            raise
+        finally:
+            if conn is not None:
+                conn.close()
+            # 已提交的批次改变了数据，无论成功与否都使查询缓存失效
+            self.db.invalidate_cache()
+
+        if os.path.exists(checkpoint_file):
+            os.remove(checkpoint_file)
+
+        elapsed = time.monotonic() - started
+        logger.info("导入完成: %s 共导入 %d 条记录，耗时 %.2f 秒（%.0f 行/秒）",
+                    filename, loaded_count, elapsed, loaded_count / max(elapsed, 1e-6))
+        return loaded_count
+
+    def import_files(self, filenames: List[str], restart: bool = False) -> int:
+        """
+        依次导入多个文件
+
+        Args:
+            filenames: 文件路径列表
+            restart: 是否忽略已有检查点从头导入
+
+        Returns:
+            导入的记录总数
+        """
+        total = 0
+        for filename in filenames:
+            total += self.import_file(filename, restart=restart)
+        return total
+
+    def _iter_batches(self, filename: str, skip: int, default_crawl_time: datetime) -> Iterator:
+        """按批次生成 (原始记录数, 清洗后的数据行列表)"""
+        batch_rows = []
+        batch_records = 0
+        # 每次爬取中已读到的记录数，缺少排名的记录按其在本次爬取中的位置补齐；
+        # 断点续传时跳过的记录也要计数，否则续传后的排名与一次导入不一致
+        positions = {}
+
+        for seq, record in enumerate(self._iter_records(filename)):
+            crawl_time = self._record_crawl_time(record, default_crawl_time)
+            position = positions[crawl_time] = positions.get(crawl_time, 0) + 1
+            if seq < skip:
+                continue
+
+            batch_records += 1
+            row = self._to_row(seq, record, crawl_time, position)
+            if row:
+                batch_rows.append(row)
+
+            if batch_records >= self.batch_size:
+                yield batch_records, batch_rows
+                batch_rows = []
+                batch_records = 0
+
+        if batch_records:
+            yield batch_records, batch_rows
+
+    @staticmethod
+    def _iter_records(filename: str) -> Iterator[Dict]:
+        """
+        逐条读取文件中的记录
+
+        支持 save_to_json 生成的JSON数组、带 data 字段的归档对象以及JSON Lines文件
+        """
+        if filename.endswith(('.jsonl', '.ndjson')):
+            with open(filename, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line)
+            return
+
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if isinstance(data, dict):
+            data = data.get('data', [])
+
+        for record in data:
+            yield record
+
+    @staticmethod
+    def _record_crawl_time(record, default_crawl_time: datetime) -> datetime:
+        """记录的爬取时间，缺失时使用文件的默认爬取时间"""
+        if not isinstance(record, dict):
+            return default_crawl_time
+        return (
+            _parse_time(record.get('crawl_time'))
+            or _parse_time(record.get('updated_time'))
+            or _parse_time(record.get('created_time'))
+            or default_crawl_time
+        )
+
+    @staticmethod
+    def _to_row(seq: int, record: Dict, crawl_time: datetime, position: int) -> Optional[Dict]:
+        """
+        将原始记录清洗为暂存表的一行数据
+
+        Args:
+            seq: 记录在文件中的序号
+            record: 原始记录
+            crawl_time: 记录的爬取时间
+            position: 记录在同一次爬取中的位置（从1开始），记录没有排名时作为排名
+        """
+        if not isinstance(record, dict):
+            return None
+
+        source = record
+        target = record.get('target')
+        if isinstance(target, dict):
+            # 第三方归档保存的是热榜接口的原始条目：问题ID为 target.id，target.url 是接口地址，
+            # 热度只在外层的 detail_text 中
+            source = {key: value for key, value in target.items() if key not in ('id', 'url')}
+            source['question_id'] = target.get('question_id', target.get('id'))
+            if not source.get('hot_index'):
+                source['hot_index'] = _parse_hot_index(record.get('detail_text'))
+            source.setdefault('rank', record.get('rank'))
+        item = DataProcessor._clean_item(source)
+        if not DataProcessor.validate_item(item):
+            return None
+
+        return {
+            'seq': seq,
+            'question_id': item['question_id'],
+            'title': item['title'],
+            'excerpt': item.get('excerpt', ''),
+            'url': item.get('url') or f"https://www.zhihu.com/question/{item['question_id']}",
+            'hot_index': item.get('hot_index', 0.0),
+            'answer_count': item.get('answer_count', 0),
+            'follower_count': item.get('follower_count', 0),
+            'rank': item.get('rank') or position,
+            'crawl_time': crawl_time
+        }
+
+    @staticmethod
+    def _copy_batch(conn, rows: List[Dict]):
+        """通过COPY写入暂存表，再用集合式upsert合并到正式表"""
+        if rows:
+            buffer = io.StringIO(''.join(
+                '\t'.join(_copy_value(row[column]) for column in STAGING_COLUMNS) + '\n'
+                for row in rows
+            ))
+            cursor = conn.cursor()
+            cursor.copy_expert(COPY_STAGING_SQL, buffer)
+            cursor.execute(MERGE_ITEMS_SQL)
+            cursor.execute(MERGE_SNAPSHOTS_SQL)
+        conn.commit()
+
+    def _upsert_batch(self, rows: List[Dict]):
+        """使用存储后端的原生批量upsert写入一批数据"""
+        latest_items = {}
+        snapshots = {}
+        for row in rows:
+            order = (row['crawl_time'], row['seq'])
+            current = latest_items.get(row['question_id'])
+            if current is None or order >= (current['crawl_time'], current['seq']):
+                latest_items[row['question_id']] = row
+            snapshots[(row['question_id'], row['crawl_time'])] = row
+
+        item_rows = [
+            dict({field: row[field] for field in ITEM_FIELDS},
+                 created_time=row['crawl_time'], updated_time=row['crawl_time'])
+            for row in latest_items.values()
+        ]
+        snapshot_rows = [
+            {field: row[field] for field in
+             ('question_id', 'crawl_time', 'rank', 'hot_index', 'answer_count', 'follower_count')}
+            for row in snapshots.values()
+        ]
+        self.db.bulk_upsert(item_rows, snapshot_rows)
+
+    def _extend_time_range(self, rows: List[Dict]):
+        """记录已导入数据的爬取时间范围"""
+        if not rows:
+            return
+        earliest = min(row['crawl_time'] for row in rows)
+        latest = max(row['crawl_time'] for row in rows)
+        if self.crawl_time_range:
+            earliest = min(earliest, self.crawl_time_range[0])
+            latest = max(latest, self.crawl_time_range[1])
+        self.crawl_time_range = (earliest, latest)
+
+    @staticmethod
+    def _default_crawl_time(filename: str, mtime: float) -> datetime:
+        """从 zhihu_hot_YYYYmmdd_HHMMSS.json 文件名推断爬取时间，失败时使用文件修改时间"""
+        match = re.search(r'(\d{8}_\d{6})', os.path.basename(filename))
+        if match:
+            try:
+                return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+            except ValueError:
+                pass
+        return datetime.fromtimestamp(mtime)
+
+    def _checkpoint_path(self, filename: str) -> str:
+        """检查点文件路径"""
+        ensure_directory(self.checkpoint_dir)
+        digest = hashlib.md5(os.path.abspath(filename).encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.checkpoint_dir, f"{os.path.basename(filename)}.{digest}.json")
+
+    @staticmethod
+    def _save_checkpoint(checkpoint_file: str, filename: str, file_stat, records_done: int):
+        """保存检查点（先写临时文件再替换，避免中断时留下损坏的检查点）"""
+        tmp_file = checkpoint_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'file': os.path.abspath(filename),
+                'size': file_stat.st_size,
+                'mtime': file_stat.st_mtime,
+                'records_done': records_done,
+                'updated': datetime.now().isoformat()
+            }, f, ensure_ascii=False)
+        os.replace(tmp_file, checkpoint_file)
@@ -0,0 +1,161 @@
+"""
+主节点选举模块 - 保证多个定时爬取实例中只有一个在执行爬取
+"""
+import os
+import socket
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+
+from config import LEADER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """主节点锁基类，持有锁的进程退出或失联后锁自动释放"""
+
+    def __init__(self):
+        self.is_leader = False
+
+    def acquire(self) -> bool:
+        """尝试获取锁（非阻塞），返回是否成为主节点"""
+        raise NotImplementedError
+
+    def check(self) -> bool:
+        """确认仍持有锁，失去锁时将 is_leader 置为False"""
+        return self.is_leader
+
+    def release(self):
+        """主动释放锁"""
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        """锁的说明，用于日志"""
+        raise NotImplementedError
+
+
+class AdvisoryLock(LeaderLock):
+    """
+    PostgreSQL 会话级 advisory lock
+
+    锁绑定在一条专用连接上，主节点进程退出或网络断开后连接关闭，锁由数据库自动释放，
+    备用节点下一次尝试即可接管。
+    """
+
+    def __init__(self, engine, key: int):
+        super().__init__()
+        self.engine = engine
+        self.key = key
+        self._connection = None
+
+    def acquire(self) -> bool:
+        try:
+            if self._connection is None:
+                self._connection = self.engine.connect()
+            acquired = self._connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {'key': self.key}
+            ).scalar()
+            self._connection.commit()
+            self.is_leader = bool(acquired)
+        except Exception as e:
+            logger.warning("获取 advisory lock 失败: %s", e)
+            self._reset()
+        return self.is_leader
+
+    def check(self) -> bool:
+        if not self.is_leader:
+            return False
+        try:
+            # 会话级锁在连接存活期间一直有效，连接断开即失去锁
+            self._connection.execute(text("SELECT 1"))
+            self._connection.commit()
+        except Exception as e:
+            logger.warning("主节点锁连接已断开: %s", e)
+            self._reset()
+        return self.is_leader
+
+    def release(self):
+        if self._connection is not None and self.is_leader:
+            try:
+                self._connection.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': self.key})
+                self._connection.commit()
+            except Exception as e:
+                logger.warning("释放 advisory lock 失败: %s", e)
+        self._reset()
+
+    def _reset(self):
+        self.is_leader = False
+        if self._connection is not None:
+            try:
+                self._connection.invalidate()
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    def describe(self) -> str:
+        return f"PostgreSQL advisory lock {self.key}"
+
+
+class FileLock(LeaderLock):
+    """
+    本地文件锁（fcntl.flock），用于 SQLite/DuckDB 等单机存储后端
+
+    锁文件中记录当前主节点的主机名和进程号，便于排查。
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._file = None
+
+    def acquire(self) -> bool:
+        import fcntl
+
+        if self.is_leader:
+            return True
+        lock_file = open(self.path, 'a+')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{socket.gethostname()}:{os.getpid()}\n")
+        lock_file.flush()
+        self._file = lock_file
+        self.is_leader = True
+        return True
+
+    def release(self):
+        import fcntl
+
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self.is_leader = False
+
+    def describe(self) -> str:
+        return f"文件锁 {self.path}"
+
+
+def create_leader_lock(manager, config: Optional[dict] = None) -> LeaderLock:
+    """
+    按存储后端创建主节点锁：PostgreSQL 使用 advisory lock，其他后端使用本地文件锁
+
+    Args:
+        manager: 数据库管理器
+        config: 选举配置，默认使用 LEADER_CONFIG
+
+    Returns:
+        主节点锁
+    """
+    config = config or LEADER_CONFIG
+    if manager.backend.name == 'postgresql':
+        return AdvisoryLock(manager.engine, config['lock_key'])
+    return FileLock(config['lock_file'])
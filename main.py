@@ -10,7 +10,9 @@ from typing import Optional
 from utils import setup_logging, print_banner, save_to_json, format_timestamp
 from scraper import ZhihuSpider
 from processor import DataProcessor
+from records import to_dicts
 from database import db_manager
+from config import ANSWER_CONFIG, CLUSTER_CONFIG, EVENTS_CONFIG, QUEUE_CONFIG, LEADER_CONFIG, MEDIA_CONFIG, POOL_CONFIG, RETENTION_CONFIG, TERMS_CONFIG, WATCHLIST_CONFIG
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +22,12 @@ class ZhihuHotSpider:
     def __init__(self):
         self.spider = None
         self.processor = DataProcessor()
+        self.clusterer = None
+        self.change_detector = None
+        self.event_publisher = None
+        self.asset_fetcher = None
+        self.watchlist_monitor = None
+        self.term_stats = None
         
     def setup(self):
         """初始化设置"""
@@ -70,15 +78,46 @@ class ZhihuHotSpider:
             unique_data = self.processor.deduplicate_items(processed_data)
             # sorted_data = self.processor.sort_by_hot_index(unique_data)
             
+            # 近似重复问题聚类，为每条数据分配事件簇ID
+            if CLUSTER_CONFIG['enabled']:
+                self._event_clusterer().assign_clusters(unique_data)
+            
+            # 与上一次爬取比较生成变更事件
+            crawl_time = datetime.now()
+            events = self._detect_changes(unique_data, crawl_time)
+            
             # 保存到数据库
-            saved_count = db_manager.save_hot_items(unique_data)
+            saved_count = db_manager.save_hot_items(unique_data, crawl_time=crawl_time)
             logger.info(f"成功保存 {saved_count} 条数据到数据库")
             
+            # 关注词命中在数据提交后记录，首次命中的事件与变更事件一起发布
+            if WATCHLIST_CONFIG['dir']:
+                events += self._match_watchlists(unique_data, crawl_time)
+            
+            # 数据提交后再发布事件，消费者收到事件时即可查询到对应数据
+            if self.change_detector is not None:
+                self.change_detector.update(unique_data, crawl_time)
+            if events and self.event_publisher is not None:
+                self.event_publisher.publish(events)
+                logger.info("发布 %d 条变更事件", len(events))
+            
+            # 标题热词统计
+            if TERMS_CONFIG['enabled']:
+                self._update_term_stats(unique_data, crawl_time)
+            
+            # 图片在后台下载，不等待下载完成
+            if MEDIA_CONFIG['enabled']:
+                self._submit_assets(unique_data)
+            
+            # 每次爬取后降采样少量过期快照，积压的数据分摊到之后的爬取中
+            if RETENTION_CONFIG['enabled']:
+                self._apply_retention(RETENTION_CONFIG['batches_per_crawl'])
+            
             # 可选：保存为JSON文件
             if save_json:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 json_filename = f"zhihu_hot_{timestamp}.json"
-                save_to_json(unique_data, json_filename)
+                save_to_json(to_dicts(unique_data), json_filename)
             
             # 生成并显示摘要
             summary = self.processor.generate_summary(unique_data)
@@ -95,27 +134,179 @@ class ZhihuHotSpider:
         """
         定时执行爬取
         
+        同时启动多个实例时通过主节点锁选举，只有主节点执行爬取；备用节点保持初始化状态，
+        每隔 LEADER_CONFIG['poll_interval'] 秒尝试接管，主节点退出后数秒内即可继续爬取。
+        
         Args:
             interval: 间隔时间（秒）
         """
         import time
+        from leader import create_leader_lock
         
-        logger.info(f"开始定时爬取，间隔 {interval} 秒")
+        lock = create_leader_lock(db_manager)
+        poll_interval = LEADER_CONFIG['poll_interval']
+        last_attempt = None
+        logger.info("开始定时爬取，间隔 %s 秒，主节点选举: %s", interval, lock.describe())
         
         try:
             while True:
+                if not lock.is_leader:
+                    if not lock.acquire():
+                        time.sleep(poll_interval)
+                        continue
+                    logger.info("已成为主节点，负责定时爬取")
+                
+                # 接管后沿用上一次爬取的节奏，避免与原主节点的爬取间隔过近
+                wait = self._seconds_until_due(interval, last_attempt)
+                if wait > 0:
+                    time.sleep(min(wait, poll_interval))
+                    if not lock.check():
+                        logger.warning("已失去主节点身份，转为备用节点")
+                    continue
+                
+                last_attempt = datetime.now()
                 success = self.run_once()
                 if success:
-                    logger.info(f"下次执行时间: {format_timestamp(datetime.now().replace(second=0, microsecond=0).replace(minute=0) + timedelta(hours=1))}")
+                    logger.info("下次执行时间: %s", format_timestamp(last_attempt + timedelta(seconds=interval)))
                 else:
                     logger.warning("本次爬取失败")
                 
-                time.sleep(interval)
-                
         except KeyboardInterrupt:
             logger.info("收到停止信号，程序退出")
-        except Exception as e:
-            logger.error(f"定时爬取异常: {e}")
+        finally:
+            lock.release()
+    
+    def _seconds_until_due(self, interval: int, last_attempt: Optional[datetime]) -> float:
+        """距离下一次应执行爬取的秒数，以数据库中最近一次爬取和本进程最近一次尝试中较晚者为准"""
+        latest = db_manager.get_latest_crawl_time()
+        if last_attempt and (latest is None or last_attempt > latest):
+            latest = last_attempt
+        if latest is None:
+            return 0
+        return (latest + timedelta(seconds=interval) - datetime.now()).total_seconds()
+    
+    def run_worker(self, interval: int = 3600, concurrency: Optional[int] = None):
+        """
+        作为采集节点运行：从共享任务队列领取热榜、问题详情和回答任务
+        
+        多个节点可同时运行，每个周期的热榜任务只会被一个节点执行，
+        问题详情任务由所有节点分担；节点宕机后其任务在租约过期后由其他节点接管。
+        
+        Args:
+            interval: 热榜爬取周期（秒）
+            concurrency: 同时执行的任务数
+        """
+        import threading
+        from task_queue import TaskQueue, CrawlWorker
+        
+        self._task_queue = TaskQueue()
+        self._thread_spiders = threading.local()
+        worker = CrawlWorker(
+            self._task_queue,
+            handlers={
+                'hot_list': self._handle_hot_list_task,
+                'question_detail': self._handle_question_detail_task,
+                'answers': self._handle_answers_task
+            },
+            concurrency=concurrency,
+            periodic=[('hot_list', interval, 10)]
+        )
+        
+        try:
+            worker.run()
+        except KeyboardInterrupt:
+            logger.info("收到停止信号，采集节点退出")
+            worker.stop()
+    
+    def _handle_hot_list_task(self, payload: dict) -> bool:
+        """热榜任务：执行一次爬取，并为本次上榜的问题入队详情任务"""
+        if not self.run_once():
+            return False
+        
+        if QUEUE_CONFIG['detail_tasks']:
+            latest = db_manager.get_latest_crawl_time()
+            question_ids = [row[0] for row in db_manager.get_snapshot_rows(since=latest)]
+            slot = latest.strftime('%Y%m%d%H%M%S')
+            queued = self._task_queue.enqueue_many([
+                {
+                    'kind': 'question_detail',
+                    'payload': {'question_id': question_id},
+                    'dedupe_key': f"question_detail:{question_id}:{slot}"
+                }
+                for question_id in question_ids
+            ])
+            logger.info("入队 %d 个问题详情任务", queued)
+        
+        if QUEUE_CONFIG['answer_tasks']:
+            latest = db_manager.get_latest_crawl_time()
+            slot = latest.strftime('%Y%m%d%H%M%S')
+            queued = self._task_queue.enqueue_many([
+                {
+                    'kind': 'answers',
+                    'payload': {'question_id': question_id},
+                    'dedupe_key': f"answers:{question_id}:{slot}"
+                }
+                for question_id in self._answer_crawler().top_question_ids()
+            ])
+            logger.info("入队 %d 个回答任务", queued)
+        return True
+    
+    def _handle_question_detail_task(self, payload: dict) -> bool:
+        """问题详情任务：获取问题详情并更新回答数、关注数等字段"""
+        # requests.Session 不保证线程安全，每个工作线程使用独立的爬虫会话
+        spider = getattr(self._thread_spiders, 'spider', None)
+        if spider is None:
+            spider = self._thread_spiders.spider = ZhihuSpider()
+        
+        question_id = payload['question_id']
+        detail = spider.fetch_question_detail(question_id)
+        if detail is None:
+            return False
+        
+        detail = self.processor._clean_item(detail)
+        fields = {field: detail[field] for field in ('excerpt', 'answer_count', 'follower_count') if field in detail}
+        db_manager.update_item_fields(question_id, fields)
+        return True
+    
+    def _handle_answers_task(self, payload: dict) -> bool:
+        """回答任务：增量爬取单个问题的回答"""
+        result = self._answer_crawler().crawl_question(payload['question_id'])
+        return 'error' not in result
+    
+    def _answer_crawler(self):
+        """回答爬虫，首次使用时创建"""
+        if getattr(self, '_answers', None) is None:
+            from answers import AnswerCrawler
+            self._answers = AnswerCrawler()
+        return self._answers
+    
+    def crawl_answers(self, limit: Optional[int] = None, concurrency: Optional[int] = None,
+                      full: bool = False) -> bool:
+        """
+        爬取最近一次热榜中排名靠前的问题的回答
+        
+        Args:
+            limit: 问题数，默认使用 ANSWER_CONFIG['top_n']
+            concurrency: 同时爬取的问题数
+            full: 是否忽略已保存的回答，完整翻页
+            
+        Returns:
+            是否全部成功
+        """
+        from answers import AnswerCrawler
+        
+        crawler = AnswerCrawler(concurrency=concurrency)
+        question_ids = crawler.top_question_ids(limit or ANSWER_CONFIG['top_n'])
+        if not question_ids:
+            logger.warning("数据库中没有热榜数据，请先执行一次爬取")
+            return False
+        
+        summary = crawler.crawl_questions(question_ids, incremental=not full)
+        print(f"\n回答爬取完成: {summary['questions']} 个问题，写入 {summary['answers']} 条回答")
+        for result in summary['results']:
+            status = '失败' if 'error' in result else ('增量' if result['stopped_early'] else '完整')
+            print(f"{result['question_id']} | {status} | 页数: {result['pages']} | 回答: {result['answers']}")
+        return not summary['failed']
     
     def cleanup_old_data(self, days: int = 7):
         """
@@ -127,9 +318,86 @@ class ZhihuHotSpider:
         try:
             deleted_count = db_manager.clear_old_data(days)
             logger.info(f"清理了 {deleted_count} 条超过 {days} 天的旧数据")
+            
+            from task_queue import TaskQueue
+            purged = TaskQueue().purge(days)
+            logger.info("清理了 %d 个已结束的爬取任务", purged)
         except Exception as e:
             logger.error(f"清理旧数据失败: {e}")
     
+    def apply_retention(self) -> bool:
+        """
+        执行分级保留策略直到没有过期快照，并显示各级历史的行数
+        
+        Returns:
+            是否成功
+        """
+        try:
+            result = db_manager.apply_retention()
+            counts = db_manager.get_retention_counts()
+            print(f"\n降采样完成: {result['hour']} 条快照并入小时桶，{result['day']} 个小时桶并入天桶")
+            print(f"完整快照: {counts['raw']} 条 | 小时桶: {counts['hour']} 个 | 天桶: {counts['day']} 个")
+            return True
+        except Exception as e:
+            logger.error("执行保留策略失败: %s", e)
+            return False
+    
+    def serve(self, host: Optional[str] = None, port: Optional[int] = None,
+              crawl: bool = False, interval: int = 3600):
+        """
+        启动只读HTTP查询服务
+        
+        Args:
+            host: 监听地址
+            port: 监听端口
+            crawl: 是否在同一进程中定时爬取，爬取完成后立即刷新快照
+            interval: 定时爬取的间隔时间（秒）
+        """
+        import threading
+        import time
+        from server import HotListService
+        
+        service = HotListService(host=host, port=port)
+        
+        if crawl:
+            def crawl_loop():
+                while True:
+                    if self.run_once():
+                        service.refresh()
+                    time.sleep(interval)
+            
+            threading.Thread(target=crawl_loop, name='crawler', daemon=True).start()
+        
+        service.serve_forever()
+    
+    def import_history(self, filenames: list, batch_size: Optional[int] = None, restart: bool = False) -> bool:
+        """
+        批量导入历史JSON数据
+        
+        Args:
+            filenames: 待导入的文件列表
+            batch_size: 每批导入的记录数
+            restart: 是否忽略检查点从头导入
+            
+        Returns:
+            是否成功
+        """
+        from importer import BulkImporter
+        
+        try:
+            importer = BulkImporter(batch_size=batch_size)
+            total = importer.import_files(filenames, restart=restart)
+            logger.info("历史数据导入完成，共 %d 条记录", total)
+            
+            # 批量导入绕过了汇总表的增量更新，按导入数据的时间范围重建
+            if importer.crawl_time_range:
+                since, until = importer.crawl_time_range
+                db_manager.rebuild_rollups(since, until + timedelta(microseconds=1))
+            return True
+        except Exception as e:
+            logger.error("历史数据导入失败: %s", e)
+            return False
+    
     def show_recent_data(self, limit: int = 20):
         """
         显示最近的数据
@@ -151,10 +419,280 @@ class ZhihuHotSpider:
                 print(f"    热度: {item.hot_index} | 回答: {item.answer_count} | 关注: {item.follower_count}")
                 print(f"    时间: {format_timestamp(item.created_time)} | URL: {item.url}")
                 print()
+            
+            if db_manager.query_cache is not None:
+                logger.debug("查询缓存统计: %s", db_manager.query_cache.stats())
                 
         except Exception as e:
             logger.error(f"显示数据失败: {e}")
     
+    def show_trends(self, limit: int = 20, hours: Optional[int] = None):
+        """
+        显示时间窗口内上升最快的问题
+        
+        Args:
+            limit: 显示条数
+            hours: 分析窗口（小时）
+        """
+        from analytics import TrendAnalyzer
+        
+        try:
+            analyzer = TrendAnalyzer(window_hours=hours)
+            if not analyzer.refresh():
+                print("数据库中暂无历史快照")
+                return
+            
+            risers = analyzer.top_risers(limit)
+            items = db_manager.get_items_by_question_ids([r['question_id'] for r in risers])
+            
+            print(f"\n最近 {analyzer.window.total_seconds() / 3600:.0f} 小时上升最快的 {len(risers)} 个问题:")
+            print("-" * 80)
+            for i, stats in enumerate(risers, 1):
+                item = items.get(stats['question_id'])
+                title = item.title if item else stats['question_id']
+                print(f"{i:2d}. {title}")
+                print(f"    当前排名: {stats['current_rank']} | 最高排名: {stats['peak_rank']} | "
+                      f"每小时上升: {stats['rank_velocity']:.2f} 名 | 在榜: {stats['time_on_list_hours']:.1f} 小时")
+                print()
+                
+        except Exception as e:
+            logger.error("显示趋势失败: %s", e)
+    
+    def show_watch_hits(self, limit: int = 20, hours: Optional[int] = None, watchlist: Optional[str] = None):
+        """
+        显示最近的关注词命中
+        
+        Args:
+            limit: 显示条数
+            hours: 只显示最近若干小时内命中过的
+            watchlist: 词表名称，默认全部
+        """
+        try:
+            since = datetime.now() - timedelta(hours=hours) if hours else None
+            hits = db_manager.get_watch_hits(watchlist=watchlist, since=since, limit=limit)
+            items = db_manager.get_items_by_question_ids(list({hit['question_id'] for hit in hits}))
+            
+            print(f"\n最近的 {len(hits)} 个关注词命中:")
+            print("-" * 80)
+            for i, hit in enumerate(hits, 1):
+                item = items.get(hit['question_id'])
+                print(f"{i:2d}. [{hit['watchlist']}] {hit['keyword']} -> {item.title if item else hit['question_id']}")
+                print(f"    字段: {hit['field']} | 首次命中: {hit['first_seen'][:19].replace('T', ' ')} | "
+                      f"最近命中: {hit['last_seen'][:19].replace('T', ' ')} | 命中次数: {hit['hit_count']}")
+                
+        except Exception as e:
+            logger.error("显示关注词命中失败: %s", e)
+    
+    def show_terms(self, window: str = 'day', limit: int = 20):
+        """
+        显示窗口内的标题热词
+        
+        Args:
+            window: 统计窗口名称
+            limit: 显示条数
+        """
+        try:
+            from terms import TermStats
+            top = TermStats().top(window, limit, now=datetime.now())
+            
+            span = TERMS_CONFIG['windows'][window][0]
+            print(f"\n最近 {span // 3600} 小时（{window}）的标题热词:")
+            print("-" * 40)
+            for i, entry in enumerate(top, 1):
+                print(f"{i:2d}. {entry['term']:<8} 估计出现次数: {entry['count']}")
+                
+        except Exception as e:
+            logger.error("显示热词失败: %s", e)
+    
+    def search(self, query: str, limit: int = 20, since: Optional[str] = None,
+               until: Optional[str] = None):
+        """
+        全文检索历史热榜问题
+        
+        Args:
+            query: 查询文本
+            limit: 显示条数
+            since: 起始日期（YYYY-MM-DD），只显示之后仍在榜的问题
+            until: 截止日期（YYYY-MM-DD），只显示之前已上榜的问题
+        """
+        try:
+            index = self._search_index()
+            results = index.search(
+                query, limit=limit,
+                since=datetime.fromisoformat(since) if since else None,
+                until=datetime.fromisoformat(until) if until else None
+            )
+            if not results:
+                print(f"没有找到与 \"{query}\" 相关的问题")
+                return
+            
+            items = db_manager.get_items_by_question_ids([r['question_id'] for r in results])
+            print(f"\n与 \"{query}\" 相关的 {len(results)} 个问题:")
+            print("-" * 80)
+            for i, result in enumerate(results, 1):
+                item = items.get(result['question_id'])
+                title = item.title if item else result['question_id']
+                print(f"{i:2d}. {title}")
+                print(f"    得分: {result['score']:.2f} | 首次上榜: {format_timestamp(result['first_seen'])} | "
+                      f"最后上榜: {format_timestamp(result['last_seen'])}")
+                print()
+                
+        except Exception as e:
+            logger.error("检索失败: %s", e)
+    
+    def rebuild_search_index(self) -> bool:
+        """
+        从数据库重建全文检索索引
+        
+        Returns:
+            是否成功
+        """
+        try:
+            count = self._search_index().rebuild(db_manager.iter_search_documents())
+            logger.info("检索索引重建完成，共 %d 篇文档", count)
+            return True
+        except Exception as e:
+            logger.error("重建检索索引失败: %s", e)
+            return False
+    
+    def _search_index(self):
+        """获取检索索引，未开启增量索引时直接打开索引目录"""
+        if db_manager.search_index is not None:
+            return db_manager.search_index
+        
+        from search import SearchIndex
+        from config import SEARCH_CONFIG
+        return SearchIndex(SEARCH_CONFIG['index_dir'], merge_threshold=SEARCH_CONFIG['merge_threshold'])
+    
+    def rebuild_column_store(self) -> bool:
+        """
+        从数据库中的历史快照重建列式存储，导入历史数据后调用
+        
+        Returns:
+            是否成功
+        """
+        try:
+            from columnar import ColumnStore
+            from config import COLUMNAR_CONFIG
+            store = db_manager.column_store or ColumnStore(COLUMNAR_CONFIG['data_dir'])
+            titles = {doc['question_id']: doc['title'] for doc in db_manager.iter_search_documents()}
+            count = store.rebuild(db_manager.iter_snapshot_columns(),
+                                  titles, batch_size=COLUMNAR_CONFIG['rebuild_batch_size'])
+            logger.info("列式快照重建完成，共 %d 行", count)
+            return True
+        except Exception as e:
+            logger.error("重建列式快照失败: %s", e)
+            return False
+    
+    def rebuild_rollups(self, since: Optional[str] = None, until: Optional[str] = None,
+                        days: int = 7) -> bool:
+        """
+        从历史快照重建小时/天汇总表，并显示最近几天的天汇总
+        
+        Args:
+            since: 起始日期（YYYY-MM-DD），默认全部
+            until: 截止日期（YYYY-MM-DD），默认全部
+            days: 显示最近几天的天汇总
+            
+        Returns:
+            是否成功
+        """
+        try:
+            written = db_manager.rebuild_rollups(
+                since=datetime.fromisoformat(since) if since else None,
+                until=datetime.fromisoformat(until) if until else None
+            )
+            logger.info("统计汇总重建完成，共 %d 行", written)
+            
+            rows = db_manager.get_rollups('day', since=datetime.now() - timedelta(days=days))
+            print(f"\n最近 {days} 天的热榜汇总:")
+            print("-" * 80)
+            for row in rows:
+                print(f"{row['bucket'][:10]} | 爬取: {row['crawl_count']} | 新上榜: {row['entered_count']} | "
+                      f"新问题: {row['new_question_count']} | 平均热度: {row['mean_hot_index']:.1f} | "
+                      f"最高热度: {row['max_hot_index']:.1f} | 换榜率: {row['churn_rate']:.1%}")
+            return True
+        except Exception as e:
+            logger.error("重建统计汇总失败: %s", e)
+            return False
+    
+    def recluster(self) -> bool:
+        """
+        按首次出现时间对全部历史问题重新聚类，并回写事件簇ID
+        
+        Returns:
+            是否成功
+        """
+        try:
+            cluster_ids = self._event_clusterer().rebuild(db_manager.iter_search_documents())
+            db_manager.update_cluster_ids(cluster_ids)
+            logger.info("重新聚类完成: %d 个问题，%d 个事件簇", len(cluster_ids), len(set(cluster_ids.values())))
+            return True
+        except Exception as e:
+            logger.error("重新聚类失败: %s", e)
+            return False
+    
+    def _detect_changes(self, items: list, crawl_time: datetime) -> list:
+        """计算本次爬取的变更事件，未配置事件接收端时返回空列表"""
+        if not EVENTS_CONFIG['sinks']:
+            return []
+        
+        try:
+            if self.change_detector is None:
+                from events import ChangeDetector, create_publisher
+                self.event_publisher = create_publisher(db_manager)
+                self.change_detector = ChangeDetector()
+                self.change_detector.load_baseline(db_manager)
+            return self.change_detector.diff(items, crawl_time)
+        except Exception as e:
+            logger.error("计算变更事件失败: %s", e)
+            return []
+    
+    def _match_watchlists(self, items: list, crawl_time: datetime) -> list:
+        """匹配关注词并记录命中，返回首次命中的事件，失败不影响爬取结果"""
+        try:
+            if self.watchlist_monitor is None:
+                from watchlist import WatchlistMonitor
+                self.watchlist_monitor = WatchlistMonitor(db_manager)
+            return self.watchlist_monitor.process(items, crawl_time)
+        except Exception as e:
+            logger.error("匹配关注词失败: %s", e)
+            return []
+    
+    def _update_term_stats(self, items: list, crawl_time: datetime):
+        """将本次爬取计入热词统计，首次使用时加载保存的草图，失败不影响爬取结果"""
+        try:
+            if self.term_stats is None:
+                from terms import TermStats
+                self.term_stats = TermStats()
+            self.term_stats.update(items, crawl_time)
+        except Exception as e:
+            logger.error("更新热词统计失败: %s", e)
+    
+    def _apply_retention(self, max_batches: int):
+        """降采样有限批数的过期快照，失败不影响爬取结果"""
+        try:
+            db_manager.apply_retention(max_batches=max_batches)
+        except Exception as e:
+            logger.error("降采样历史快照失败: %s", e)
+    
+    def _submit_assets(self, items: list):
+        """提交条目中的图片链接，下载器首次使用时创建，提交失败不影响爬取结果"""
+        try:
+            if self.asset_fetcher is None:
+                from assets import AssetFetcher
+                self.asset_fetcher = AssetFetcher()
+            self.asset_fetcher.submit(items)
+        except Exception as e:
+            logger.error("提交图片下载失败: %s", e)
+    
+    def _event_clusterer(self):
+        """首次使用时加载事件聚类语料"""
+        if self.clusterer is None:
+            from clustering import EventClusterer
+            self.clusterer = EventClusterer()
+        return self.clusterer
+    
     def _print_summary(self, summary: dict, top_items: list):
         """打印摘要信息"""
         print("\n" + "="*50)
@@ -178,13 +716,29 @@ class ZhihuHotSpider:
     def cleanup(self):
         """清理资源"""
         if self.spider:
+            http = self.spider.pool_stats()
+            logger.info("HTTP 连接池统计: %d 个请求，新建 %d 个连接，淘汰 %d 次",
+                        http['requests'], http['connections'], http['evictions'])
             self.spider.close()
+        if self.event_publisher:
+            self.event_publisher.close()
+        if self.asset_fetcher:
+            # 单次爬取模式下进程随即退出，等待已提交的图片下载完成
+            self.asset_fetcher.close(wait=True)
+            logger.info("图片下载统计: %s", self.asset_fetcher.stats())
+        if db_manager.pool_telemetry:
+            stats = db_manager.pool_stats()
+            logger.info("数据库连接池统计: 峰值检出 %d 个，新建 %d 个连接，重连 %d 次",
+                        stats['peak_in_use'], stats['connects'], stats['recycled'])
+            # 自适应模式下记录本次运行的检出峰值，下次启动时据此确定常驻连接数
+            if POOL_CONFIG['adaptive']:
+                db_manager.pool_telemetry.save()
         logger.info("资源清理完成")
 
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description='知乎热榜爬虫程序')
-    parser.add_argument('--mode', choices=['once', 'schedule', 'show', 'cleanup'], 
+    parser.add_argument('--mode', choices=['once', 'schedule', 'show', 'cleanup', 'import', 'serve', 'trends', 'search', 'reindex', 'recluster', 'rollup', 'worker', 'answers', 'columns', 'watch', 'terms', 'retention'], 
                        default='once', help='运行模式')
     parser.add_argument('--interval', type=int, default=3600, 
                        help='定时模式的间隔时间（秒）')
@@ -194,6 +748,36 @@ def main():
                        help='显示数据的条数')
     parser.add_argument('--days', type=int, default=7, 
                        help='清理超过指定天数的旧数据')
+    parser.add_argument('--hours', type=int, 
+                       help='趋势模式的分析窗口（小时）')
+    parser.add_argument('--file', nargs='+', 
+                       help='导入模式下要导入的JSON/JSON Lines文件')
+    parser.add_argument('--batch-size', type=int, 
+                       help='导入模式下每批COPY的记录数')
+    parser.add_argument('--restart', action='store_true', 
+                       help='导入模式下忽略检查点从头导入')
+    parser.add_argument('--host', 
+                       help='服务模式的监听地址')
+    parser.add_argument('--port', type=int, 
+                       help='服务模式的监听端口')
+    parser.add_argument('--crawl', action='store_true', 
+                       help='服务模式下同时按 --interval 定时爬取')
+    parser.add_argument('--concurrency', type=int, 
+                       help='采集节点/回答模式下同时执行的任务数')
+    parser.add_argument('--top', type=int, 
+                       help='回答模式下爬取榜单前N个问题，默认 ANSWER_TOP_N')
+    parser.add_argument('--full', action='store_true', 
+                       help='回答模式下忽略已保存的回答完整翻页')
+    parser.add_argument('--query', 
+                       help='检索模式的查询文本')
+    parser.add_argument('--watchlist', 
+                       help='关注词模式下只显示该词表的命中')
+    parser.add_argument('--window', choices=list(TERMS_CONFIG['windows']), default='day', 
+                       help='热词模式的统计窗口')
+    parser.add_argument('--since', 
+                       help='检索/汇总模式的起始日期（YYYY-MM-DD）')
+    parser.add_argument('--until', 
+                       help='检索/汇总模式的截止日期（YYYY-MM-DD）')
     
     args = parser.parse_args()
     
@@ -222,6 +806,56 @@ def main():
         elif args.mode == 'cleanup':
             spider_app.cleanup_old_data(days=args.days)
             
+        elif args.mode == 'import':
+            if not args.file:
+                parser.error('导入模式需要通过 --file 指定文件')
+            success = spider_app.import_history(args.file, batch_size=args.batch_size, restart=args.restart)
+            sys.exit(0 if success else 1)
+            
+        elif args.mode == 'trends':
+            spider_app.show_trends(limit=args.limit, hours=args.hours)
+            
+        elif args.mode == 'search':
+            if not args.query:
+                parser.error('检索模式需要通过 --query 指定查询文本')
+            spider_app.search(args.query, limit=args.limit, since=args.since, until=args.until)
+            
+        elif args.mode == 'reindex':
+            success = spider_app.rebuild_search_index()
+            sys.exit(0 if success else 1)
+            
+        elif args.mode == 'recluster':
+            success = spider_app.recluster()
+            sys.exit(0 if success else 1)
+            
+        elif args.mode == 'rollup':
+            success = spider_app.rebuild_rollups(since=args.since, until=args.until, days=args.days)
+            sys.exit(0 if success else 1)
+            
+        elif args.mode == 'watch':
+            spider_app.show_watch_hits(limit=args.limit, hours=args.hours, watchlist=args.watchlist)
+            
+        elif args.mode == 'terms':
+            spider_app.show_terms(window=args.window, limit=args.limit)
+            
+        elif args.mode == 'retention':
+            success = spider_app.apply_retention()
+            sys.exit(0 if success else 1)
+            
+        elif args.mode == 'columns':
+            success = spider_app.rebuild_column_store()
+            sys.exit(0 if success else 1)
+            
+        elif args.mode == 'answers':
+            success = spider_app.crawl_answers(limit=args.top, concurrency=args.concurrency, full=args.full)
+            sys.exit(0 if success else 1)
+            
+        elif args.mode == 'worker':
+            spider_app.run_worker(interval=args.interval, concurrency=args.concurrency)
+            
+        elif args.mode == 'serve':
+            spider_app.serve(host=args.host, port=args.port, crawl=args.crawl, interval=args.interval)
+            
     except KeyboardInterrupt:
         logger.info("程序被用户中断")
     except Exception as e:
@@ -1,7 +1,7 @@
 """
 数据模型定义模块
 """
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -20,6 +20,8 @@ class ZhihuHotItem(Base):
     hot_index = Column(Float, comment='热度指数')
     answer_count = Column(Integer, default=0, comment='回答数')
     follower_count = Column(Integer, default=0, comment='关注数')
+    cluster_id = Column(String(50), index=True, comment='事件簇ID')
+    answers_crawled_time = Column(DateTime, comment='最近一次完整爬取回答的时间')
     created_time = Column(DateTime, default=datetime.now, comment='创建时间')
     updated_time = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment='更新时间')
     
@@ -37,6 +39,249 @@ class ZhihuHotItem(Base):
             'hot_index': self.hot_index,
             'answer_count': self.answer_count,
             'follower_count': self.follower_count,
+            'cluster_id': self.cluster_id,
             'created_time': self.created_time.isoformat() if self.created_time else None,
             'updated_time': self.updated_time.isoformat() if self.updated_time else None
         }
+
+
+class ZhihuHotSnapshot(Base):
+    """知乎热榜历史快照模型 - 每次爬取中每个条目对应一行"""
+    __tablename__ = 'zhihu_hot_snapshots'
+    __table_args__ = (
+        UniqueConstraint('question_id', 'crawl_time', name='uq_snapshot_question_crawl'),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    question_id = Column(String(50), nullable=False, index=True, comment='问题ID')
+    crawl_time = Column(DateTime, nullable=False, index=True, comment='爬取时间')
+    rank = Column(Integer, comment='榜单排名')
+    hot_index = Column(Float, comment='热度指数')
+    answer_count = Column(Integer, default=0, comment='回答数')
+    follower_count = Column(Integer, default=0, comment='关注数')
+    
+    def __repr__(self):
+        return f"<ZhihuHotSnapshot(question_id={self.question_id}, crawl_time={self.crawl_time}, rank={self.rank})>"
+    
+    def to_dict(self):
+        """转换为字典格式"""
+        return {
+            'question_id': self.question_id,
+            'crawl_time': self.crawl_time.isoformat() if self.crawl_time else None,
+            'rank': self.rank,
+            'hot_index': self.hot_index,
+            'answer_count': self.answer_count,
+            'follower_count': self.follower_count
+        }
+
+
+class ZhihuAnswer(Base):
+    """知乎回答模型 - 热榜问题下的回答"""
+    __tablename__ = 'zhihu_answers'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    answer_id = Column(String(50), unique=True, nullable=False, comment='回答ID')
+    question_id = Column(String(50), nullable=False, index=True, comment='问题ID')
+    author_id = Column(String(100), comment='作者 url_token')
+    author_name = Column(String(100), comment='作者昵称')
+    excerpt = Column(Text, comment='回答摘要')
+    content = Column(Text, comment='回答正文(HTML)')
+    voteup_count = Column(Integer, default=0, comment='赞同数')
+    comment_count = Column(Integer, default=0, comment='评论数')
+    created_at = Column(DateTime, comment='回答创建时间')
+    updated_at = Column(DateTime, comment='回答最后编辑时间')
+    crawl_time = Column(DateTime, default=datetime.now, comment='最近一次爬取时间')
+    
+    def __repr__(self):
+        return f"<ZhihuAnswer(answer_id={self.answer_id}, question_id={self.question_id})>"
+    
+    def to_dict(self):
+        """转换为字典格式"""
+        return {
+            'answer_id': self.answer_id,
+            'question_id': self.question_id,
+            'author_id': self.author_id,
+            'author_name': self.author_name,
+            'excerpt': self.excerpt,
+            'content': self.content,
+            'voteup_count': self.voteup_count,
+            'comment_count': self.comment_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'crawl_time': self.crawl_time.isoformat() if self.crawl_time else None
+        }
+
+
+class ZhihuWatchHit(Base):
+    """关注词命中模型 - 每个问题、词表和关注词的组合对应一行"""
+    __tablename__ = 'zhihu_watch_hits'
+    __table_args__ = (
+        UniqueConstraint('question_id', 'watchlist', 'keyword', name='uq_watch_hit'),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    question_id = Column(String(50), nullable=False, index=True, comment='问题ID')
+    watchlist = Column(String(100), nullable=False, index=True, comment='词表名称')
+    keyword = Column(String(200), nullable=False, comment='命中的关注词')
+    field = Column(String(20), comment='最近一次命中的字段: title/excerpt')
+    first_seen = Column(DateTime, nullable=False, comment='首次命中的爬取时间')
+    last_seen = Column(DateTime, nullable=False, comment='最近一次命中的爬取时间')
+    hit_count = Column(Integer, nullable=False, default=1, comment='命中的爬取次数')
+    
+    def __repr__(self):
+        return f"<ZhihuWatchHit(question_id={self.question_id}, watchlist={self.watchlist}, keyword={self.keyword})>"
+    
+    def to_dict(self):
+        """转换为字典格式"""
+        return {
+            'question_id': self.question_id,
+            'watchlist': self.watchlist,
+            'keyword': self.keyword,
+            'field': self.field,
+            'first_seen': self.first_seen.isoformat() if self.first_seen else None,
+            'last_seen': self.last_seen.isoformat() if self.last_seen else None,
+            'hit_count': self.hit_count
+        }
+
+
+class CrawlTask(Base):
+    """爬取任务队列模型 - 多个采集节点通过租约领取任务"""
+    __tablename__ = 'crawl_tasks'
+    __table_args__ = (
+        Index('ix_crawl_tasks_claim', 'status', 'available_at'),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(50), nullable=False, comment='任务类型')
+    payload = Column(Text, comment='任务参数(JSON)')
+    dedupe_key = Column(String(200), unique=True, nullable=False, comment='去重键，同一键只入队一次')
+    status = Column(String(20), nullable=False, default='pending', comment='状态: pending/leased/done/failed')
+    priority = Column(Integer, nullable=False, default=0, comment='优先级，越大越先执行')
+    attempts = Column(Integer, nullable=False, default=0, comment='已领取次数')
+    max_attempts = Column(Integer, nullable=False, default=3, comment='最大尝试次数')
+    available_at = Column(DateTime, nullable=False, default=datetime.now, comment='可领取时间')
+    lease_owner = Column(String(100), comment='持有租约的节点')
+    lease_expires_at = Column(DateTime, index=True, comment='租约到期时间')
+    heartbeat_at = Column(DateTime, comment='最近一次心跳时间')
+    last_error = Column(Text, comment='最近一次失败原因')
+    created_time = Column(DateTime, default=datetime.now, comment='创建时间')
+    finished_time = Column(DateTime, comment='完成时间')
+    
+    def __repr__(self):
+        return f"<CrawlTask(id={self.id}, kind={self.kind}, status={self.status})>"
+    
+    def to_dict(self):
+        """转换为字典格式"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'payload': self.payload,
+            'dedupe_key': self.dedupe_key,
+            'status': self.status,
+            'priority': self.priority,
+            'attempts': self.attempts,
+            'lease_owner': self.lease_owner,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None,
+            'last_error': self.last_error,
+            'created_time': self.created_time.isoformat() if self.created_time else None,
+            'finished_time': self.finished_time.isoformat() if self.finished_time else None
+        }
+
+
+class RollupMixin:
+    """热榜统计汇总表的公共列，所有计数和热度合计均可累加，便于按爬取增量更新"""
+    
+    bucket = Column(DateTime, primary_key=True, comment='时间桶起点')
+    crawl_count = Column(Integer, nullable=False, default=0, comment='爬取次数')
+    entry_count = Column(Integer, nullable=False, default=0, comment='上榜条目数（各次爬取之和）')
+    entered_count = Column(Integer, nullable=False, default=0, comment='相比上一次爬取新上榜的条目数')
+    exited_count = Column(Integer, nullable=False, default=0, comment='相比上一次爬取下榜的条目数')
+    new_question_count = Column(Integer, nullable=False, default=0, comment='首次出现的问题数')
+    hot_sum = Column(Float, nullable=False, default=0.0, comment='热度指数合计')
+    hot_max = Column(Float, nullable=False, default=0.0, comment='最高热度指数')
+    
+    def to_dict(self):
+        """转换为字典格式，附带平均热度和换榜率"""
+        return {
+            'bucket': self.bucket.isoformat() if self.bucket else None,
+            'crawl_count': self.crawl_count,
+            'entry_count': self.entry_count,
+            'entered_count': self.entered_count,
+            'exited_count': self.exited_count,
+            'new_question_count': self.new_question_count,
+            'mean_hot_index': self.hot_sum / self.entry_count if self.entry_count else 0.0,
+            'max_hot_index': self.hot_max,
+            'churn_rate': self.entered_count / self.entry_count if self.entry_count else 0.0
+        }
+
+
+class ZhihuHotHourlyRollup(RollupMixin, Base):
+    """按小时汇总的热榜统计"""
+    __tablename__ = 'zhihu_hot_rollup_hourly'
+    
+    def __repr__(self):
+        return f"<ZhihuHotHourlyRollup(bucket={self.bucket}, crawl_count={self.crawl_count})>"
+
+
+class ZhihuHotDailyRollup(RollupMixin, Base):
+    """按天汇总的热榜统计"""
+    __tablename__ = 'zhihu_hot_rollup_daily'
+    
+    def __repr__(self):
+        return f"<ZhihuHotDailyRollup(bucket={self.bucket}, crawl_count={self.crawl_count})>"
+
+
+class SnapshotBucketMixin:
+    """降采样后的排名历史公共列，每个问题每个时间桶一行，保留桶内首末值和极值"""
+    
+    question_id = Column(String(50), primary_key=True, comment='问题ID')
+    bucket = Column(DateTime, primary_key=True, index=True, comment='时间桶起点')
+    sample_count = Column(Integer, nullable=False, default=0, comment='桶内快照数')
+    first_time = Column(DateTime, nullable=False, comment='桶内首次爬取时间')
+    last_time = Column(DateTime, nullable=False, comment='桶内最后爬取时间')
+    first_rank = Column(Integer, comment='首次排名')
+    last_rank = Column(Integer, comment='最后排名')
+    min_rank = Column(Integer, comment='最高名次（数值最小）')
+    max_rank = Column(Integer, comment='最低名次（数值最大）')
+    first_hot_index = Column(Float, comment='首次热度指数')
+    last_hot_index = Column(Float, comment='最后热度指数')
+    min_hot_index = Column(Float, comment='最低热度指数')
+    max_hot_index = Column(Float, comment='最高热度指数')
+    answer_count = Column(Integer, comment='最后一次的回答数')
+    follower_count = Column(Integer, comment='最后一次的关注数')
+    
+    def to_dict(self):
+        """转换为字典格式"""
+        return {
+            'question_id': self.question_id,
+            'bucket': self.bucket.isoformat() if self.bucket else None,
+            'sample_count': self.sample_count,
+            'first_time': self.first_time.isoformat() if self.first_time else None,
+            'last_time': self.last_time.isoformat() if self.last_time else None,
+            'first_rank': self.first_rank,
+            'last_rank': self.last_rank,
+            'min_rank': self.min_rank,
+            'max_rank': self.max_rank,
+            'first_hot_index': self.first_hot_index,
+            'last_hot_index': self.last_hot_index,
+            'min_hot_index': self.min_hot_index,
+            'max_hot_index': self.max_hot_index,
+            'answer_count': self.answer_count,
+            'follower_count': self.follower_count
+        }
+
+
+class ZhihuHotSnapshotHourly(SnapshotBucketMixin, Base):
+    """按小时降采样的排名历史"""
+    __tablename__ = 'zhihu_hot_snapshots_hourly'
+    
+    def __repr__(self):
+        return f"<ZhihuHotSnapshotHourly(question_id={self.question_id}, bucket={self.bucket})>"
+
+
+class ZhihuHotSnapshotDaily(SnapshotBucketMixin, Base):
+    """按天降采样的排名历史"""
+    __tablename__ = 'zhihu_hot_snapshots_daily'
+    
+    def __repr__(self):
+        return f"<ZhihuHotSnapshotDaily(question_id={self.question_id}, bucket={self.bucket})>"
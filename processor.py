@@ -6,6 +6,8 @@ import logging
 from typing import List, Dict, Optional
 from datetime import datetime
 
+from records import HotItem
+
 logger = logging.getLogger(__name__)
 
 class DataProcessor:
@@ -70,7 +72,7 @@ class DataProcessor:
         return True
     
     @staticmethod
-    def process_hot_items(raw_items: List[Dict]) -> List[Dict]:
+    def process_hot_items(raw_items: List[Dict]) -> List[HotItem]:
         """
         处理热榜数据
         
@@ -78,7 +80,7 @@ class DataProcessor:
             raw_items: 原始数据列表
             
         Returns:
-            处理后的数据列表
+            处理后的热榜条目记录列表
         """
         if not raw_items:
             return []
@@ -104,16 +106,31 @@ class DataProcessor:
         return processed_items
     
     @staticmethod
-    def _clean_item(item: Dict) -> Dict:
+    def _clean_item(item: Dict) -> HotItem:
         """
         清洗单个数据项
         
         Args:
-            item: 原始数据项
+            item: 原始数据项（字典或 HotItem）
             
         Returns:
-            清洗后的数据项
+            清洗后的热榜条目记录，原始数据中缺少的字段取默认值
         """
+        # 爬虫产出的记录字段齐全，直接按属性读取，避免逐字段的字典兼容调用
+        if isinstance(item, HotItem):
+            return HotItem(
+                str(item.question_id).strip(),
+                DataProcessor.clean_text(str(item.title)),
+                DataProcessor.clean_text(str(item.excerpt)),
+                str(item.url).strip(),
+                DataProcessor._to_number(item.hot_index, float),
+                DataProcessor._to_number(item.answer_count, int),
+                DataProcessor._to_number(item.follower_count, int),
+                DataProcessor._to_rank(item.rank),
+                item.cluster_id,
+                tuple(item.image_urls)
+            )
+        
         cleaned_item = {}
         
         # 处理文本字段
@@ -126,14 +143,7 @@ class DataProcessor:
         numeric_fields = ['hot_index', 'answer_count', 'follower_count']
         for field in numeric_fields:
             if field in item:
-                try:
-                    value = item[field]
-                    if value is None:
-                        cleaned_item[field] = 0
-                    else:
-                        cleaned_item[field] = float(value) if field == 'hot_index' else int(value)
-                except (ValueError, TypeError):
-                    cleaned_item[field] = 0
+                cleaned_item[field] = DataProcessor._to_number(item[field], float if field == 'hot_index' else int)
         
         # 处理其他字段
         other_fields = ['question_id', 'url']
@@ -141,7 +151,32 @@ class DataProcessor:
             if field in item:
                 cleaned_item[field] = str(item[field]).strip()
         
-        return cleaned_item
+        # 榜单排名和事件簇ID原样保留
+        cleaned_item['rank'] = DataProcessor._to_rank(item.get('rank'))
+        cleaned_item['cluster_id'] = item.get('cluster_id')
+        cleaned_item['image_urls'] = tuple(item.get('image_urls') or ())
+        
+        return HotItem(**cleaned_item)
+    
+    @staticmethod
+    def _to_number(value, cast):
+        """转换数字字段，空值或无法转换时取0"""
+        if value is None:
+            return 0
+        try:
+            return cast(value)
+        except (ValueError, TypeError):
+            return 0
+    
+    @staticmethod
+    def _to_rank(value) -> Optional[int]:
+        """转换榜单排名，无效时返回None"""
+        if not value:
+            return None
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            return None
     
     @staticmethod
     def deduplicate_items(items: List[Dict]) -> List[Dict]:
@@ -0,0 +1,115 @@
+"""
+数据记录模块 - 爬取流水线中使用的紧凑热榜条目类型
+"""
+import json
+from operator import attrgetter
+from typing import Dict, Iterable, List
+
+# 热榜条目字段及默认值，顺序与数据库列一致；image_urls 只在流水线中传递，不写入数据库
+HOT_ITEM_DEFAULTS = {
+    'question_id': '',
+    'title': '',
+    'excerpt': '',
+    'url': '',
+    'hot_index': 0.0,
+    'answer_count': 0,
+    'follower_count': 0,
+    'rank': None,
+    'cluster_id': None,
+    'image_urls': ()
+}
+
+HOT_ITEM_FIELDS = tuple(HOT_ITEM_DEFAULTS)
+_FIELD_SET = frozenset(HOT_ITEM_FIELDS)
+_get_fields = attrgetter(*HOT_ITEM_FIELDS)
+
+
+class HotItem:
+    """
+    热榜条目记录
+
+    使用 __slots__ 存储固定字段，不为每个实例分配 __dict__，内存占用约为等价字典的
+    三分之一。从爬虫、数据处理到数据库写入全程传递同一种记录，只在输出JSON或接口
+    响应时才转换为字典。
+
+    为兼容原有按字典访问的代码，支持 item['title']、item.get('title')、'title' in item
+    以及 dict(item)；字段集合固定，写入未知字段会抛出 KeyError。
+    """
+
+    __slots__ = HOT_ITEM_FIELDS
+
+    def __init__(self, question_id: str = '', title: str = '', excerpt: str = '', url: str = '',
+                 hot_index: float = 0.0, answer_count: int = 0, follower_count: int = 0,
+                 rank=None, cluster_id=None, image_urls=()):
+        self.question_id = question_id
+        self.title = title
+        self.excerpt = excerpt
+        self.url = url
+        self.hot_index = hot_index
+        self.answer_count = answer_count
+        self.follower_count = follower_count
+        self.rank = rank
+        self.cluster_id = cluster_id
+        self.image_urls = image_urls
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'HotItem':
+        """从字典创建记录，忽略未知字段"""
+        return cls(**{field: data[field] for field in HOT_ITEM_FIELDS if field in data})
+
+    def to_dict(self) -> Dict:
+        """转换为字典格式"""
+        return dict(zip(HOT_ITEM_FIELDS, _get_fields(self)))
+
+    def to_json(self) -> str:
+        """转换为JSON字符串"""
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    # ------------------------------------------------------------------
+    # 字典兼容接口
+    # ------------------------------------------------------------------
+
+    def __getitem__(self, key: str):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in _FIELD_SET:
+            raise KeyError(f"HotItem 没有字段: {key}")
+        setattr(self, key, value)
+
+    def __contains__(self, key) -> bool:
+        return key in _FIELD_SET
+
+    def __iter__(self):
+        return iter(HOT_ITEM_FIELDS)
+
+    def __len__(self) -> int:
+        return len(HOT_ITEM_FIELDS)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in _FIELD_SET else default
+
+    def keys(self):
+        return HOT_ITEM_FIELDS
+
+    def items(self):
+        return list(zip(HOT_ITEM_FIELDS, _get_fields(self)))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, HotItem):
+            other = other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"<HotItem(question_id={self.question_id}, rank={self.rank}, title='{self.title[:20]}')>"
+
+
+def to_dicts(items: Iterable) -> List[Dict]:
+    """将记录列表转换为字典列表，已经是字典的元素原样保留"""
+    return [item.to_dict() if isinstance(item, HotItem) else item for item in items]
@@ -0,0 +1,292 @@
+"""
+分级保留模块 - 将过期的历史快照逐级降采样为小时和天粒度的排名历史
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+
+from config import RETENTION_CONFIG
+from models import ZhihuHotSnapshot, ZhihuHotSnapshotDaily, ZhihuHotSnapshotHourly
+from rollups import bucket_start
+
+logger = logging.getLogger(__name__)
+
+# 降采样粒度 -> 排名历史表模型，按此顺序逐级降采样
+RETENTION_MODELS = {
+    'hour': ZhihuHotSnapshotHourly,
+    'day': ZhihuHotSnapshotDaily
+}
+
+# 各粒度时间桶的长度
+BUCKET_SPANS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1)
+}
+
+# 时间桶除 question_id、bucket 外的列
+BUCKET_COLUMNS = ('sample_count', 'first_time', 'last_time', 'first_rank', 'last_rank', 'min_rank', 'max_rank',
+                  'first_hot_index', 'last_hot_index', 'min_hot_index', 'max_hot_index',
+                  'answer_count', 'follower_count')
+
+# 每条upsert语句写入的时间桶数
+INSERT_BATCH = 1000
+
+
+def snapshot_bucket(row: Dict) -> Dict:
+    """
+    将一条快照转换为只含一个样本的时间桶（不含 bucket）
+
+    Args:
+        row: 含 question_id、crawl_time、rank、hot_index、answer_count、follower_count 的快照行
+
+    Returns:
+        时间桶字典
+    """
+    rank, hot_index = row['rank'], row['hot_index']
+    return {
+        'question_id': row['question_id'],
+        'sample_count': 1,
+        'first_time': row['crawl_time'],
+        'last_time': row['crawl_time'],
+        'first_rank': rank, 'last_rank': rank, 'min_rank': rank, 'max_rank': rank,
+        'first_hot_index': hot_index, 'last_hot_index': hot_index,
+        'min_hot_index': hot_index, 'max_hot_index': hot_index,
+        'answer_count': row['answer_count'],
+        'follower_count': row['follower_count']
+    }
+
+
+def _pick(a, b, func):
+    """忽略空值取 func(a, b)"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return func(a, b)
+
+
+def merge_bucket(target: Dict, source: Dict):
+    """将时间桶 source 合并到 target，规则与 snapshot_bucket_upsert_statement 一致"""
+    target['sample_count'] += source['sample_count']
+    if source['first_time'] < target['first_time']:
+        target['first_time'] = source['first_time']
+        target['first_rank'] = source['first_rank']
+        target['first_hot_index'] = source['first_hot_index']
+    if source['last_time'] > target['last_time']:
+        target['last_time'] = source['last_time']
+        for field in ('last_rank', 'last_hot_index', 'answer_count', 'follower_count'):
+            target[field] = source[field]
+    for field in ('min_rank', 'min_hot_index'):
+        target[field] = _pick(target[field], source[field], min)
+    for field in ('max_rank', 'max_hot_index'):
+        target[field] = _pick(target[field], source[field], max)
+
+
+def aggregate(rows: Iterable[Dict], granularity: str) -> List[Dict]:
+    """
+    按问题和时间桶合并
+
+    Args:
+        rows: 时间桶字典（快照先经 snapshot_bucket 转换）
+        granularity: 目标粒度，hour 或 day
+
+    Returns:
+        合并后的时间桶列表
+    """
+    buckets = {}
+    for row in rows:
+        bucket = bucket_start(row['first_time'], granularity)
+        key = (row['question_id'], bucket)
+        if key in buckets:
+            merge_bucket(buckets[key], row)
+        else:
+            buckets[key] = dict(row, bucket=bucket)
+    return list(buckets.values())
+
+
+def _source(granularity: str):
+    """降采样到 granularity 时读取的源表及其时间列"""
+    if granularity == 'hour':
+        table = ZhihuHotSnapshot.__table__
+        return table, table.c.crawl_time
+    table = RETENTION_MODELS['hour'].__table__
+    return table, table.c.bucket
+
+
+def downsample_batch(engine, backend, granularity: str, cutoff: datetime, batch_size: int) -> Tuple[int, bool]:
+    """
+    将早于 cutoff 的一批源数据降采样到 granularity 粒度
+
+    一批取时间最早的约 batch_size 行，边界向后取齐到整次爬取（或整个小时桶），跨批的
+    时间桶由upsert合并。读取、删除源数据和写入时间桶在同一事务中完成；删除的行数
+    与读取的不一致说明有其他进程同时处理了这部分数据，回滚本批。
+
+    Args:
+        engine: 数据库引擎
+        backend: 存储后端
+        granularity: 目标粒度，hour（快照 -> 小时桶）或 day（小时桶 -> 天桶）
+        cutoff: 只处理早于该时间的源数据
+        batch_size: 每批行数
+
+    Returns:
+        (处理的源数据行数, 早于 cutoff 的源数据是否已全部处理)
+    """
+    source, column = _source(granularity)
+    target = RETENTION_MODELS[granularity].__table__
+    if granularity == 'hour':
+        columns = [source.c[name] for name in
+                   ('question_id', 'crawl_time', 'rank', 'hot_index', 'answer_count', 'follower_count')]
+    else:
+        columns = [source.c.question_id] + [source.c[name] for name in BUCKET_COLUMNS]
+
+    with engine.connect() as conn:
+        with conn.begin() as transaction:
+            boundary = conn.execute(
+                select(column).where(column < cutoff).order_by(column).offset(batch_size - 1).limit(1)
+            ).scalar()
+            condition = column <= boundary if boundary is not None else column < cutoff
+
+            rows = [dict(row) for row in conn.execute(select(*columns).where(condition)).mappings()]
+            if not rows:
+                return 0, True
+
+            deleted = conn.execute(delete(source).where(condition)).rowcount
+            if deleted >= 0 and deleted != len(rows):
+                transaction.rollback()
+                logger.warning("降采样到 %s 粒度时源数据被并发修改，本批已回滚", granularity)
+                return 0, True
+
+            if granularity == 'hour':
+                rows = [snapshot_bucket(row) for row in rows]
+            buckets = aggregate(rows, granularity)
+            stmt = backend.snapshot_bucket_upsert_statement(target)
+            for start in range(0, len(buckets), INSERT_BATCH):
+                conn.execute(stmt, buckets[start:start + INSERT_BATCH])
+
+    return len(rows), boundary is None
+
+
+def cutoffs(now: Optional[datetime] = None, config: Optional[Dict] = None) -> Dict[str, datetime]:
+    """
+    各粒度的降采样截止时间
+
+    快照保留 raw_days 天，截止时间向前取整到整点；小时桶保留 hourly_days 天，截止时间
+    向前取整到零点，保证被合并的时间桶完整。
+
+    Returns:
+        粒度到截止时间的映射
+    """
+    config = config or RETENTION_CONFIG
+    if config['raw_days'] > config['hourly_days']:
+        raise ValueError("快照保留天数不能超过小时桶保留天数")
+    now = now or datetime.now()
+    return {
+        'hour': bucket_start(now - timedelta(days=config['raw_days']), 'hour'),
+        'day': bucket_start(now - timedelta(days=config['hourly_days']), 'day')
+    }
+
+
+def apply(engine, backend, now: Optional[datetime] = None, max_batches: Optional[int] = None,
+          config: Optional[Dict] = None) -> Dict:
+    """
+    执行保留策略：过期快照降采样为小时桶，过期小时桶合并为天桶
+
+    Args:
+        engine: 数据库引擎
+        backend: 存储后端
+        now: 当前时间，默认 datetime.now()
+        max_batches: 本次最多处理的批数，默认处理到没有过期数据为止
+        config: 保留配置，默认使用 RETENTION_CONFIG
+
+    Returns:
+        {'hour': 降采样的快照行数, 'day': 合并的小时桶行数, 'batches': 批数, 'complete': 是否已无过期数据}
+    """
+    config = config or RETENTION_CONFIG
+    limits = cutoffs(now, config)
+    result = {'hour': 0, 'day': 0, 'batches': 0, 'complete': True}
+
+    for granularity in RETENTION_MODELS:
+        exhausted = False
+        while not exhausted:
+            if max_batches is not None and result['batches'] >= max_batches:
+                result['complete'] = False
+                break
+            consumed, exhausted = downsample_batch(engine, backend, granularity, limits[granularity],
+                                                   config['batch_size'])
+            if consumed:
+                result['batches'] += 1
+                result[granularity] += consumed
+        if not result['complete']:
+            break
+
+    if result['batches']:
+        logger.info("排名历史降采样完成: %d 条快照并入小时桶，%d 个小时桶并入天桶", result['hour'], result['day'])
+    return result
+
+
+def raw_history_start(connection) -> Optional[datetime]:
+    """
+    完整快照的起始时间
+
+    降采样总是处理截止时间之前的全部数据，最新时间桶结束之后的快照都是完整的。
+
+    Returns:
+        该时间点，尚未降采样过时返回None
+    """
+    ends = []
+    for granularity, model in RETENTION_MODELS.items():
+        latest = connection.execute(select(func.max(model.__table__.c.bucket))).scalar()
+        if latest is not None:
+            ends.append(latest + BUCKET_SPANS[granularity])
+    return max(ends, default=None)
+
+
+def tier_counts(connection) -> Dict[str, int]:
+    """各级历史的行数：raw 为快照，hour/day 为时间桶"""
+    counts = {'raw': connection.execute(select(func.count()).select_from(ZhihuHotSnapshot.__table__)).scalar()}
+    for granularity, model in RETENTION_MODELS.items():
+        counts[granularity] = connection.execute(select(func.count()).select_from(model.__table__)).scalar()
+    return counts
+
+
+def rank_history(connection, question_id: str, since: Optional[datetime] = None,
+                 until: Optional[datetime] = None) -> List[Dict]:
+    """
+    合并三级历史，返回一个问题的排名历史
+
+    Args:
+        connection: 数据库连接
+        question_id: 问题ID
+        since: 起始时间（含），按时间桶起点或爬取时间过滤
+        until: 截止时间（不含）
+
+    Returns:
+        按时间排序的时间桶字典列表，resolution 为 day、hour 或 raw，
+        快照以只含一个样本的时间桶表示，bucket 为其爬取时间
+    """
+    history = []
+    for granularity, model in reversed(list(RETENTION_MODELS.items())):
+        table = model.__table__
+        stmt = select(table).where(table.c.question_id == question_id)
+        if since:
+            stmt = stmt.where(table.c.bucket >= since)
+        if until:
+            stmt = stmt.where(table.c.bucket < until)
+        history.extend(dict(row, resolution=granularity) for row in connection.execute(stmt).mappings())
+
+    table = ZhihuHotSnapshot.__table__
+    stmt = select(table).where(table.c.question_id == question_id)
+    if since:
+        stmt = stmt.where(table.c.crawl_time >= since)
+    if until:
+        stmt = stmt.where(table.c.crawl_time < until)
+    for row in connection.execute(stmt).mappings():
+        history.append(dict(snapshot_bucket(row), bucket=row['crawl_time'], resolution='raw'))
+
+    history.sort(key=lambda row: (row['first_time'], row['last_time']))
+    for row in history:
+        for field in ('bucket', 'first_time', 'last_time'):
+            row[field] = row[field].isoformat()
+    return history
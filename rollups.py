@@ -0,0 +1,215 @@
+"""
+统计汇总模块 - 维护按小时和按天汇总的热榜统计表
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import delete, distinct, func, select
+
+from models import (ZhihuHotDailyRollup, ZhihuHotHourlyRollup, ZhihuHotSnapshot, ZhihuHotSnapshotDaily,
+                    ZhihuHotSnapshotHourly)
+
+logger = logging.getLogger(__name__)
+
+# 汇总粒度 -> 汇总表模型
+ROLLUP_MODELS = {
+    'hour': ZhihuHotHourlyRollup,
+    'day': ZhihuHotDailyRollup
+}
+
+# 降采样后的排名历史表，判断问题是否首次出现时与快照表一起查询
+HISTORY_MODELS = (ZhihuHotSnapshotHourly, ZhihuHotSnapshotDaily)
+
+# 合并两条统计时直接相加的列，hot_max 取较大值
+SUM_COLUMNS = ('crawl_count', 'entry_count', 'entered_count', 'exited_count', 'new_question_count', 'hot_sum')
+
+# 重建时每批插入的汇总行数
+INSERT_BATCH = 1000
+
+
+def bucket_start(crawl_time: datetime, granularity: str) -> datetime:
+    """爬取时间所在时间桶的起点"""
+    if granularity == 'hour':
+        return crawl_time.replace(minute=0, second=0, microsecond=0)
+    return crawl_time.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def crawl_stats(question_ids: List[str], hot_indices: Iterable[float],
+                previous_ids: Set[str], seen_ids: Set[str]) -> Dict:
+    """
+    计算单次爬取的可累加统计
+
+    Args:
+        question_ids: 本次爬取上榜的问题ID
+        hot_indices: 对应的热度指数
+        previous_ids: 上一次爬取上榜的问题ID
+        seen_ids: 本次爬取之前出现过的问题ID
+
+    Returns:
+        统计字典
+    """
+    current = set(question_ids)
+    hot = [value or 0.0 for value in hot_indices]
+    return {
+        'crawl_count': 1,
+        'entry_count': len(current),
+        'entered_count': len(current - previous_ids),
+        'exited_count': len(previous_ids - current),
+        'new_question_count': len(current - seen_ids),
+        'hot_sum': float(sum(hot)),
+        'hot_max': float(max(hot, default=0.0))
+    }
+
+
+def _merge_stats(target: Dict, stats: Dict):
+    """将一次爬取的统计累加到时间桶"""
+    for column in SUM_COLUMNS:
+        target[column] += stats[column]
+    target['hot_max'] = max(target['hot_max'], stats['hot_max'])
+
+
+def previous_question_ids(connection, before: datetime) -> Set[str]:
+    """
+    before 之前最后一次爬取上榜的问题ID
+
+    该次爬取的快照已降采样时，从时间桶的最后爬取时间还原：该次爬取上榜的问题
+    所在时间桶的 last_time 都等于该次爬取时间。
+    """
+    sources = [(ZhihuHotSnapshot.__table__, ZhihuHotSnapshot.__table__.c.crawl_time)]
+    sources += [(model.__table__, model.__table__.c.last_time) for model in HISTORY_MODELS]
+    for source, column in sources:
+        previous_time = connection.execute(select(func.max(column)).where(column < before)).scalar()
+        if previous_time is not None:
+            return set(connection.execute(select(source.c.question_id).where(column == previous_time)).scalars())
+    return set()
+
+
+def apply_crawl(connection, backend, snapshot_rows: List[Dict], crawl_time: datetime) -> bool:
+    """
+    将一次爬取累加到小时和天汇总表，需在写入该次快照之前、同一事务中调用
+
+    Args:
+        connection: 数据库连接或会话
+        backend: 存储后端
+        snapshot_rows: 本次爬取的快照行
+        crawl_time: 爬取时间
+
+    Returns:
+        是否更新了汇总；同一爬取时间已有快照（重复保存）时跳过，避免重复累加
+    """
+    if not snapshot_rows:
+        return False
+
+    table = ZhihuHotSnapshot.__table__
+    if connection.execute(select(table.c.question_id).where(table.c.crawl_time == crawl_time).limit(1)).first():
+        return False
+
+    previous_ids = previous_question_ids(connection, crawl_time)
+
+    question_ids = [row['question_id'] for row in snapshot_rows]
+    seen_ids = set(connection.execute(
+        select(distinct(table.c.question_id)).where(
+            table.c.question_id.in_(question_ids), table.c.crawl_time < crawl_time
+        )
+    ).scalars())
+    for model in HISTORY_MODELS:
+        history = model.__table__
+        seen_ids.update(connection.execute(
+            select(distinct(history.c.question_id)).where(history.c.question_id.in_(question_ids))
+        ).scalars())
+
+    stats = crawl_stats(question_ids, (row['hot_index'] for row in snapshot_rows), previous_ids, seen_ids)
+    for granularity, model in ROLLUP_MODELS.items():
+        connection.execute(backend.rollup_upsert_statement(model.__table__),
+                           [dict(stats, bucket=bucket_start(crawl_time, granularity))])
+    return True
+
+
+def rebuild(engine, since: Optional[datetime] = None, until: Optional[datetime] = None,
+            batch_size: int = 10000) -> int:
+    """
+    从历史快照重新计算汇总表，用于批量导入等绕过增量更新的写入之后
+
+    范围向外对齐到整天，区间内的小时和天汇总行先删除再整体写入，在一个事务中完成。
+
+    Args:
+        engine: 数据库引擎
+        since: 起始时间（含），默认从最早的快照开始
+        until: 截止时间（不含），默认到最新的快照
+        batch_size: 读取快照时每批的行数
+
+    Returns:
+        写入的汇总行数
+    """
+    if since is not None:
+        since = bucket_start(since, 'day')
+    if until is not None:
+        until = bucket_start(until - timedelta(microseconds=1), 'day') + timedelta(days=1)
+
+    table = ZhihuHotSnapshot.__table__
+    buckets = {granularity: {} for granularity in ROLLUP_MODELS}
+
+    with engine.begin() as conn:
+        seen_ids = set()
+        previous_ids = set()
+        if since is not None:
+            seen_ids = set(conn.execute(
+                select(distinct(table.c.question_id)).where(table.c.crawl_time < since)
+            ).scalars())
+            for model in HISTORY_MODELS:
+                history = model.__table__
+                seen_ids.update(conn.execute(
+                    select(distinct(history.c.question_id)).where(history.c.bucket < since)
+                ).scalars())
+            previous_ids = previous_question_ids(conn, since)
+
+        stmt = select(table.c.crawl_time, table.c.question_id, table.c.hot_index)
+        if since is not None:
+            stmt = stmt.where(table.c.crawl_time >= since)
+        if until is not None:
+            stmt = stmt.where(table.c.crawl_time < until)
+        stmt = stmt.order_by(table.c.crawl_time)
+
+        def flush(crawl_time, question_ids, hot_indices):
+            stats = crawl_stats(question_ids, hot_indices, previous_ids, seen_ids)
+            for granularity, granularity_buckets in buckets.items():
+                bucket = bucket_start(crawl_time, granularity)
+                if bucket in granularity_buckets:
+                    _merge_stats(granularity_buckets[bucket], stats)
+                else:
+                    granularity_buckets[bucket] = dict(stats, bucket=bucket)
+
+        # 快照按爬取时间有序读取，逐次爬取计算统计后归入时间桶
+        current_time, question_ids, hot_indices = None, [], []
+        result = conn.execute(stmt.execution_options(stream_results=True))
+        for rows in result.partitions(batch_size):
+            for crawl_time, question_id, hot_index in rows:
+                if crawl_time != current_time and question_ids:
+                    flush(current_time, question_ids, hot_indices)
+                    seen_ids.update(question_ids)
+                    previous_ids = set(question_ids)
+                    question_ids, hot_indices = [], []
+                current_time = crawl_time
+                question_ids.append(question_id)
+                hot_indices.append(hot_index)
+        if question_ids:
+            flush(current_time, question_ids, hot_indices)
+
+        written = 0
+        for granularity, model in ROLLUP_MODELS.items():
+            rollup = model.__table__
+            stmt = delete(rollup)
+            if since is not None:
+                stmt = stmt.where(rollup.c.bucket >= since)
+            if until is not None:
+                stmt = stmt.where(rollup.c.bucket < until)
+            conn.execute(stmt)
+
+            rows = sorted(buckets[granularity].values(), key=lambda row: row['bucket'])
+            for start in range(0, len(rows), INSERT_BATCH):
+                conn.execute(rollup.insert(), rows[start:start + INSERT_BATCH])
+            written += len(rows)
+
+    logger.info("统计汇总重建完成: %d 个天汇总，%d 个小时汇总", len(buckets['day']), len(buckets['hour']))
+    return written
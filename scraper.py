@@ -1,45 +1,71 @@
 """
 爬虫模块 - 负责从知乎获取热榜数据
 """
+import codecs
 import requests
 import json
 import time
 import logging
 import re
-from typing import List, Dict, Optional
-from fake_useragent import UserAgent
+from typing import Dict, Generator, Iterator, List, Optional
+from urllib.parse import urlsplit
 from bs4 import BeautifulSoup
+from lxml import etree
 from config import SPIDER_CONFIG
+from identities import IdentityPool, get_identity_pool
+from proxies import ProxyPool, get_proxy_pool, is_ban_response
+from records import HotItem
+from telemetry import mount_instrumented_adapter
 
 logger = logging.getLogger(__name__)
 
+# 热榜条目块的起始标签，如 <section class="HotItem">
+ENTRY_START_PATTERN = re.compile(r'<(section|div)\b[^>]*\bclass="[^"]*(?<![\w-])HotItem(?![\w-])[^"]*"[^>]*>', re.I)
+ENTRY_QUESTION_PATTERN = re.compile(r'href="([^"]*/question/(\d+)[^"]*)"')
+ENTRY_RANK_PATTERN = re.compile(r'class="[^"]*HotItem-rank[^"]*"[^>]*>\s*(\d+)')
+ENTRY_METRICS_PATTERN = re.compile(r'class="[^"]*HotItem-metrics[^"]*"[^>]*>([^<]*)')
+ENTRY_IMAGE_PATTERN = re.compile(r'<img\b[^>]*?\bsrc="(https?://[^"]+)"', re.I)
+# 每次爬取都会变化的排名和热度文本，计算条目指纹时剔除
+ENTRY_VOLATILE_PATTERN = re.compile(r'(class="[^"]*HotItem-(?:rank|metrics)[^"]*"[^>]*>)[^<]*')
+# 不属于热榜的条目标题关键词
+EXCLUDED_TITLE_KEYWORDS = ('辟谣', '谣言', '假消息')
+
 class ZhihuSpider:
     """知乎热榜爬虫"""
     
-    def __init__(self):
+    def __init__(self, proxy_pool: Optional[ProxyPool] = None,
+                 identity_pool: Optional[IdentityPool] = None):
+        """
+        Args:
+            proxy_pool: 出口代理池，默认使用按 PROXY_CONFIG 创建的共享代理池，未配置代理时直连
+            identity_pool: 请求身份池，默认使用按 IDENTITY_CONFIG 创建的共享身份池
+        """
         self.session = requests.Session()
-        self.ua = UserAgent()
+        self.proxy_pool = proxy_pool if proxy_pool is not None else get_proxy_pool()
+        self.identity_pool = identity_pool if identity_pool is not None else get_identity_pool()
+        # 每个出口代理各占一个连接池，连接池数不足时连接会被反复淘汰
+        self.http_adapter = mount_instrumented_adapter(
+            self.session, expected_pools=2 * (len(self.proxy_pool) if self.proxy_pool else 1))
+        # 上一次爬取的条目指纹 -> (问题ID, 标题, 摘要, 链接, 图片链接)，内容未变的条目直接复用
+        self._entry_cache = {}
         self._setup_session()
     
     def _setup_session(self):
         """设置会话"""
-        # 设置请求头
-        headers = SPIDER_CONFIG['headers'].copy()
-        headers['User-Agent'] = self.ua.random
-        self.session.headers.update(headers)
+        # Cookie 和请求头按请求所用的身份设置，会话本身不保存 Cookie，避免不同身份互相串用
+        self.session.cookies.clear()
         
-        # 设置超时
-        self.session.timeout = SPIDER_CONFIG['timeout']
-        
-        logger.info("爬虫会话初始化完成")
+        logger.info("爬虫会话初始化完成: %d 个请求身份", len(self.identity_pool))
     
-    def _make_request(self, url: str, max_retries: int = None) -> Optional[requests.Response]:
+    def _make_request(self, url: str, max_retries: int = None,
+                      stream: bool = False) -> Optional[requests.Response]:
         """
         发送HTTP请求
         
         Args:
             url: 请求URL
             max_retries: 最大重试次数
+            stream: 是否只读取响应头，响应体由调用方按块读取（读取完毕或放弃后需关闭响应）
             
         Returns:
             响应对象或None
@@ -47,32 +73,140 @@ class ZhihuSpider:
         if max_retries is None:
             max_retries = SPIDER_CONFIG['retry_times']
         
-        headers = SPIDER_CONFIG['headers'].copy()
+        host = urlsplit(url).hostname
         
         for attempt in range(max_retries + 1):
+            # 每次尝试重新选择身份和代理，失败的身份已进入冷却，失败的代理已被降权或剔除
+            identity = self.identity_pool.acquire()
+            if identity is None:
+                logger.warning("请求被限流 (尝试 %d/%d): 没有可用的请求身份", attempt + 1, max_retries + 1)
+                if attempt < max_retries:
+                    continue
+                logger.error("请求最终失败: %s", url)
+                return None
+            proxy = self.proxy_pool.acquire(host) if self.proxy_pool else None
+            started = time.monotonic()
             try:
-                logger.debug(f"正在请求URL: {url} (尝试 {attempt + 1}/{max_retries + 1})")
+                logger.debug("正在请求URL: %s (尝试 %d/%d，身份 %s)", url, attempt + 1, max_retries + 1,
+                             identity.name)
                 
-                response = self.session.get(url, headers=headers)
+                # 没有收到响应（连接失败、超时等）时计入代理失败，不影响身份的健康状态
+                identity_result, proxy_result = {}, {'ok': False}
+                try:
+                    try:
+                        response = self.session.get(url, headers=identity.headers, cookies=identity.cookies,
+                                                    timeout=SPIDER_CONFIG['timeout'], stream=stream,
+                                                    proxies=proxy.requests_kwargs if proxy else None)
+                    finally:
+                        self.session.cookies.clear()
+                    identity.update_cookies(response)
+                    banned = is_ban_response(response.status_code, response.url)
+                    # 401 表示该身份的登录态失效，其他 4xx 与身份无关；经代理发出时封禁优先归咎于出口IP，
+                    # 对身份只计一次失败，换了代理仍连续被封才让身份冷却
+                    identity_result = {'ok': response.status_code != 401 and not banned,
+                                       'banned': banned and proxy is None}
+                    proxy_result = {'latency': time.monotonic() - started,
+                                    'ok': response.status_code < 500, 'banned': banned}
+                finally:
+                    # 无论以何种异常退出，身份和代理的并发计数都恰好释放一次
+                    self.identity_pool.release(identity, **identity_result)
+                    if self.proxy_pool:
+                        self.proxy_pool.release(proxy, **proxy_result)
+                
+                if response.status_code >= 400:
+                    response.close()
                 response.raise_for_status()
                 
-                logger.debug(f"请求成功: {url}")
+                logger.debug("请求成功: %s", url)
                 return response
                 
             except requests.exceptions.RequestException as e:
-                logger.warning(f"请求失败 (尝试 {attempt + 1}/{max_retries + 1}): {e}")
+                logger.warning("请求失败 (尝试 %d/%d): %s", attempt + 1, max_retries + 1, e)
                 
                 if attempt < max_retries:
                     time.sleep(SPIDER_CONFIG['retry_delay'])
                 else:
-                    logger.error(f"请求最终失败: {url}")
+                    logger.error("请求最终失败: %s", url)
                     return None
         
         return None
     
 
     
-    def fetch_hot_list(self) -> List[Dict]:
+    def fetch_question_detail(self, question_id: str) -> Optional[HotItem]:
+        """
+        获取问题详情
+        
+        Args:
+            question_id: 问题ID
+            
+        Returns:
+            问题详情字典，失败时返回None
+        """
+        url = SPIDER_CONFIG['question_api_url'].format(question_id=question_id)
+        response = self._make_request(url)
+        if not response:
+            return None
+        
+        try:
+            data = response.json()
+        except ValueError as e:
+            logger.error("解析问题详情失败: %s, %s", question_id, e)
+            return None
+        
+        return HotItem(
+            question_id=str(data.get('id', question_id)),
+            title=data.get('title', ''),
+            excerpt=data.get('excerpt', ''),
+            url=f"https://www.zhihu.com/question/{question_id}",
+            answer_count=data.get('answer_count', 0),
+            follower_count=data.get('follower_count', 0)
+        )
+    
+    def iter_answer_pages(self, question_id: str, page_size: int = 20,
+                          max_pages: int = 0) -> Generator[List[Dict], None, bool]:
+        """
+        按游标逐页获取问题下的回答，回答按最后编辑时间倒序
+        
+        每次只持有一页数据，调用方停止迭代后不再请求后续页面。
+        达到 max_pages 时还有后续页面的，生成器的返回值（StopIteration.value）为 True。
+        
+        Args:
+            question_id: 问题ID
+            page_size: 每页回答数
+            max_pages: 最多获取的页数，0 表示直到最后一页
+            
+        Yields:
+            每页回答的原始数据列表
+            
+        Raises:
+            RuntimeError: 某一页获取或解析失败
+        """
+        url = SPIDER_CONFIG['answers_api_url'].format(question_id=question_id, limit=page_size)
+        pages = 0
+        while url:
+            response = self._make_request(url)
+            if not response:
+                raise RuntimeError(f"获取回答列表失败: {question_id}，第 {pages + 1} 页")
+            try:
+                data = response.json()
+            except ValueError as e:
+                raise RuntimeError(f"解析回答列表失败: {question_id}，第 {pages + 1} 页: {e}")
+            
+            answers = data.get('data') or []
+            if answers:
+                yield answers
+            pages += 1
+            
+            paging = data.get('paging') or {}
+            if paging.get('is_end') or not answers:
+                return False
+            if max_pages and pages >= max_pages:
+                return True
+            url = paging.get('next')
+        return False
+    
+    def fetch_hot_list(self) -> List[HotItem]:
         """
         获取知乎热榜数据
         
@@ -80,11 +214,112 @@ class ZhihuSpider:
             热榜数据列表
         """
         logger.info("开始获取知乎热榜数据")
+        # 两次爬取之间没有进行中的请求，可以安全地调整连接池数
+        self.http_adapter.adapt()
         
         # 使用HTML解析方法获取数据
+        if SPIDER_CONFIG['stream_parse']:
+            return list(self.iter_hot_list())
         return self._fetch_from_html()
     
-    def _fetch_from_html(self) -> List[Dict]:
+    def iter_hot_list(self, limit: Optional[int] = None) -> Iterator[HotItem]:
+        """
+        边下载边解析热榜页面，每个条目块闭合后立即产出条目
+        
+        响应体按块读取，交给 lxml 的增量解析器，已产出的条目块随即清空，不保留整个页面的
+        解码文本。条目列表闭合或达到条目数上限后停止下载；页面中没有条目块时才用通用解析方法。
+        
+        Args:
+            limit: 条目数上限，默认使用 SPIDER_CONFIG['max_hot_items']
+            
+        Yields:
+            热榜条目
+        """
+        limit = limit or SPIDER_CONFIG['max_hot_items']
+        response = self._make_request(SPIDER_CONFIG['zhihu_hot_url'], stream=True)
+        if not response:
+            logger.error("获取知乎热榜页面失败")
+            return
+        
+        state = {'bytes': 0, 'list_closed': False, 'html': None}
+        count = 0
+        try:
+            for count, item in enumerate(self._iter_entry_items(self._stream_entry_blocks(response, state), limit), 1):
+                yield item
+            
+            logger.info("流式解析: %d 条热榜数据，读取 %d 字节%s", count, state['bytes'],
+                        '，条目列表结束后停止下载' if state['list_closed'] else '')
+            if count or state['html'] is None:
+                return
+            
+            logger.info("HTML结构解析失败，尝试通用解析方法")
+            hot_items = self._parse_generic_structure(BeautifulSoup(state['html'], 'html.parser'))
+            if not hot_items:
+                logger.warning("所有HTML解析方法都失败，返回空列表")
+            yield from hot_items[:limit]
+        except Exception as e:
+            logger.error("流式解析热榜数据异常: %s", e)
+        finally:
+            response.close()
+    
+    def _stream_entry_blocks(self, response: requests.Response, state: Dict) -> Iterator[str]:
+        """
+        从流式响应中增量解析页面，产出每个已闭合的条目块
+        
+        条目列表取已出现条目的最近公共祖先元素，该元素闭合即说明列表结束。
+        
+        Args:
+            response: stream=True 的响应
+            state: 记录读取的字节数（bytes）和列表是否已闭合（list_closed）；
+                没有找到任何条目块时，读完后把整个页面放入 html
+            
+        Yields:
+            条目块HTML
+        """
+        # 响应头未声明编码时 requests 对 text/html 默认 ISO-8859-1，知乎页面实际为 UTF-8
+        content_type = response.headers.get('Content-Type', '')
+        encoding = response.encoding if 'charset' in content_type.lower() else 'utf-8'
+        decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+        parser = etree.HTMLPullParser(events=('end',))
+        
+        list_element = None
+        ancestors = None
+        pending = ''
+        for chunk in response.iter_content(chunk_size=SPIDER_CONFIG['stream_chunk_size']):
+            state['bytes'] += len(chunk)
+            # 只把到最后一个 '>' 为止的文本交给解析器：libxml2 的 HTML 增量解析在标签被数据块
+            # 截断时可能停止产出事件，直到文档结束
+            pending += decoder.decode(chunk)
+            cut = pending.rfind('>') + 1
+            if not cut:
+                continue
+            parser.feed(pending[:cut])
+            pending = pending[cut:]
+            for _, element in parser.read_events():
+                if list_element is not None and element is list_element:
+                    state['list_closed'] = True
+                    return
+                if element.tag not in ('section', 'div') or 'HotItem' not in (element.get('class') or '').split():
+                    continue
+                
+                yield etree.tostring(element, encoding='unicode', method='html', with_tail=False)
+                
+                # 第二个条目出现后才能确定列表元素，条目直接相邻或各自带包裹元素都适用
+                if ancestors is None:
+                    ancestors = list(element.iterancestors())
+                else:
+                    common = set(element.iterancestors())
+                    ancestors = [ancestor for ancestor in ancestors if ancestor in common]
+                    list_element = ancestors[0] if ancestors else None
+                element.clear(keep_tail=True)
+        
+        if ancestors is None:
+            parser.feed(pending + decoder.decode(b'', final=True))
+            root = parser.close()
+            if root is not None:
+                state['html'] = etree.tostring(root, encoding='unicode', method='html')
+    
+    def _fetch_from_html(self) -> List[HotItem]:
         """
         从HTML页面解析数据
         
@@ -102,8 +337,13 @@ class ZhihuSpider:
             logger.info(f"响应状态码: {response.status_code}")
             logger.info(f"响应内容长度: {len(response.text)} 字符")
             
+            # 优先按条目块增量解析，只有指纹变化的条目才重新解析
+            hot_items = self._parse_entry_blocks(response.text)
+            if hot_items:
+                logger.info("从HTML成功获取 %d 条热榜数据", len(hot_items))
+                return hot_items
+            
             soup = BeautifulSoup(response.text, 'html.parser')
-            hot_items = []
             
             # 方法3: 如果前两种方法都失败，使用更通用的解析方法
             if not hot_items:
@@ -115,14 +355,14 @@ class ZhihuSpider:
                 logger.warning("所有HTML解析方法都失败，返回空列表")
                 hot_items = []
             
-            logger.info(f"从HTML成功获取 {len(hot_items)} 条热榜数据")
+            logger.info("从HTML成功获取 %d 条热榜数据", len(hot_items))
             return hot_items
             
         except Exception as e:
             logger.error(f"HTML解析获取热榜数据异常: {e}")
             return []
     
-    def _extract_from_data_object(self, data: dict) -> List[Dict]:
+    def _extract_from_data_object(self, data: dict) -> List[HotItem]:
         """
         从数据对象中查找热榜数据
         
@@ -142,7 +382,7 @@ class ZhihuSpider:
                     # 查找热榜数据
                     for key in ['hotList', 'data', 'list']:
                         if key in topstory and isinstance(topstory[key], list):
-                            logger.debug(f"在topstory中找到热榜数据: {key}")
+                            logger.debug("在topstory中找到热榜数据: %s", key)
                             for item in topstory[key]:
                                 hot_item = self._extract_html_item_info(item)
                                 if hot_item:
@@ -153,7 +393,7 @@ class ZhihuSpider:
             # 如果没有找到topstory，查找其他可能的热榜数据键
             for key in ['hotList', 'hot']:
                 if key in data and isinstance(data[key], list):
-                    logger.debug(f"找到热榜数据: {key}")
+                    logger.debug("找到热榜数据: %s", key)
                     for item in data[key]:
                         hot_item = self._extract_html_item_info(item)
                         if hot_item:
@@ -166,7 +406,7 @@ class ZhihuSpider:
         
         return hot_items
     
-    def _parse_html_structure(self, soup: BeautifulSoup) -> List[Dict]:
+    def _parse_html_structure(self, soup: BeautifulSoup) -> List[HotItem]:
         """
         解析HTML结构获取热榜数据
         
@@ -229,7 +469,7 @@ class ZhihuSpider:
         
         return hot_items
     
-    def _parse_generic_structure(self, soup: BeautifulSoup) -> List[Dict]:
+    def _parse_generic_structure(self, soup: BeautifulSoup) -> List[HotItem]:
         """
         通用的HTML解析方法，当特定结构解析失败时使用
         
@@ -279,21 +519,22 @@ class ZhihuSpider:
                         continue
                     
                     # 过滤明显不是热榜的标题（比如包含"辟谣"等关键词）
-                    if any(keyword in title for keyword in ['辟谣', '谣言', '假消息']):
+                    if any(keyword in title for keyword in EXCLUDED_TITLE_KEYWORDS):
                         continue
                     
                     # 构建URL
                     url = f"https://www.zhihu.com{href}" if href.startswith('/') else href
                     
-                    hot_item = {
-                        'question_id': question_id,
-                        'title': title,
-                        'excerpt': '',
-                        'url': url,
-                        'hot_index': float(len(hot_items) + 1) * 10,
-                        'answer_count': 0,
-                        'follower_count': 0
-                    }
+                    hot_item = HotItem(
+                        question_id=question_id,
+                        title=title,
+                        excerpt='',
+                        url=url,
+                        hot_index=0.0,
+                        answer_count=0,
+                        follower_count=0,
+                        rank=len(hot_items) + 1
+                    )
                     
                     hot_items.append(hot_item)
                     
@@ -311,7 +552,131 @@ class ZhihuSpider:
         
         return hot_items
     
-    def _extract_from_html_element(self, element, index: int) -> Optional[Dict]:
+    def _parse_entry_blocks(self, html: str) -> List[HotItem]:
+        """
+        按热榜条目块增量解析页面
+        
+        直接在原始HTML中定位每个条目块，解析方式见 _iter_entry_items。
+        
+        Args:
+            html: 页面HTML
+            
+        Returns:
+            热榜数据列表，页面中没有条目块时返回空列表
+        """
+        return list(self._iter_entry_items(self._iter_entry_blocks(html)))
+    
+    def _iter_entry_items(self, blocks: Iterator[str], limit: Optional[int] = None) -> Iterator[HotItem]:
+        """
+        将条目块逐个转换为热榜条目
+        
+        剔除排名和热度文本后的块内容作为指纹。指纹与上一次爬取相同的条目复用缓存的标题、
+        摘要和链接，只有新上榜或内容有变化的条目才用 BeautifulSoup 解析。排名取条目中的
+        排名元素，没有时按出现顺序。
+        
+        Args:
+            blocks: 条目块HTML序列
+            limit: 条目数上限，达到后不再读取后续条目块
+            
+        Yields:
+            热榜条目
+        """
+        entry_cache = {}
+        seen_questions = set()
+        parsed = 0
+        count = 0
+        
+        try:
+            for block in blocks:
+                fingerprint = ENTRY_VOLATILE_PATTERN.sub(r'\1', block)
+                if fingerprint in entry_cache:
+                    fields = entry_cache[fingerprint]
+                elif fingerprint in self._entry_cache:
+                    fields = entry_cache[fingerprint] = self._entry_cache[fingerprint]
+                else:
+                    fields = entry_cache[fingerprint] = self._extract_entry_block(block)
+                    parsed += 1
+                
+                if fields is None or fields[0] in seen_questions:
+                    continue
+                seen_questions.add(fields[0])
+                
+                rank_match = ENTRY_RANK_PATTERN.search(block)
+                metrics_match = ENTRY_METRICS_PATTERN.search(block)
+                question_id, title, excerpt, url, image_urls = fields
+                count += 1
+                yield HotItem(
+                    question_id=question_id,
+                    title=title,
+                    excerpt=excerpt,
+                    url=url,
+                    hot_index=self._extract_hot_index(metrics_match.group(1)) if metrics_match else 0.0,
+                    rank=int(rank_match.group(1)) if rank_match else count,
+                    image_urls=image_urls
+                )
+                if limit and count >= limit:
+                    break
+        finally:
+            # 只保留本次出现的条目，缓存大小不随爬取次数增长；没有解析到条目时保留原缓存
+            if count:
+                self._entry_cache = entry_cache
+                logger.info("条目块解析: %d 条，重新解析 %d 条，复用 %d 条", count, parsed, count - parsed)
+    
+    @staticmethod
+    def _iter_entry_blocks(html: str):
+        """按标签嵌套层级切出每个热榜条目块的原始HTML"""
+        position = 0
+        while True:
+            start = ENTRY_START_PATTERN.search(html, position)
+            if not start:
+                return
+            
+            tag_pattern = re.compile(r'<(/?)%s\b' % start.group(1), re.I)
+            depth = 0
+            for tag in tag_pattern.finditer(html, start.start()):
+                depth += -1 if tag.group(1) else 1
+                if depth == 0:
+                    end = html.find('>', tag.end()) + 1
+                    break
+            else:
+                return
+            
+            yield html[start.start():end]
+            position = end
+    
+    @staticmethod
+    def _extract_entry_block(block: str) -> Optional[tuple]:
+        """
+        解析单个条目块中不随排名变化的字段
+        
+        Args:
+            block: 条目块HTML
+            
+        Returns:
+            (问题ID, 标题, 摘要, 链接, 图片链接)，不是有效热榜条目时返回None
+        """
+        question_match = ENTRY_QUESTION_PATTERN.search(block)
+        if not question_match:
+            return None
+        
+        soup = BeautifulSoup(block, 'html.parser')
+        href, question_id = question_match.groups()
+        link = soup.find('a', href=href)
+        title_elem = soup.find(class_=re.compile(r'HotItem-title')) or soup.find(['h2', 'h3'])
+        if title_elem:
+            title = title_elem.get_text(strip=True)
+        else:
+            title = (link.get('title') or link.get_text(strip=True)) if link else ''
+        if not title or len(title) < 5 or any(keyword in title for keyword in EXCLUDED_TITLE_KEYWORDS):
+            return None
+        
+        excerpt_elem = soup.find(class_=re.compile(r'HotItem-excerpt'))
+        excerpt = excerpt_elem.get_text(strip=True) if excerpt_elem else ''
+        url = f"https://www.zhihu.com{href}" if href.startswith('/') else href
+        image_urls = tuple(dict.fromkeys(ENTRY_IMAGE_PATTERN.findall(block)))
+        return question_id, title, excerpt, url, image_urls
+    
+    def _extract_from_html_element(self, element, index: int) -> Optional[HotItem]:
         """
         从HTML元素中提取热榜条目信息
         
@@ -393,15 +758,15 @@ class ZhihuSpider:
             # 计算热度
             hot_index = float(index) * 100
             
-            return {
-                'question_id': question_id,
-                'title': title,
-                'excerpt': excerpt,
-                'url': url,
-                'hot_index': hot_index,
-                'answer_count': answer_count,
-                'follower_count': follower_count
-            }
+            return HotItem(
+                question_id=question_id,
+                title=title,
+                excerpt=excerpt,
+                url=url,
+                hot_index=hot_index,
+                answer_count=answer_count,
+                follower_count=follower_count
+            )
             
         except Exception as e:
             logger.error(f"提取HTML元素信息失败: {e}")
@@ -409,7 +774,7 @@ class ZhihuSpider:
     
 
     
-    def _extract_html_item_info(self, item: Dict) -> Optional[Dict]:
+    def _extract_html_item_info(self, item: Dict) -> Optional[HotItem]:
         """
         提取HTML热榜条目信息
         
@@ -442,20 +807,45 @@ class ZhihuSpider:
             if not title or not question_id:
                 return None
             
-            return {
-                'question_id': question_id,
-                'title': title,
-                'excerpt': excerpt,
-                'url': url,
-                'hot_index': float(hot_index) if hot_index else 0.0,
-                'answer_count': int(answer_count) if answer_count else 0,
-                'follower_count': int(follower_count) if follower_count else 0
-            }
+            return HotItem(
+                question_id=question_id,
+                title=title,
+                excerpt=excerpt,
+                url=url,
+                hot_index=float(hot_index) if hot_index else 0.0,
+                answer_count=int(answer_count) if answer_count else 0,
+                follower_count=int(follower_count) if follower_count else 0,
+                image_urls=self._extract_image_urls(item)
+            )
             
         except Exception as e:
             logger.error(f"提取HTML条目信息失败: {e}")
             return None
     
+    @staticmethod
+    def _extract_image_urls(item: Dict) -> tuple:
+        """
+        提取条目数据中的缩略图和封面图链接
+        
+        Args:
+            item: 页面内嵌数据中的原始条目
+            
+        Returns:
+            去重后的图片链接
+        """
+        target = item.get('target', item)
+        children = item.get('children') or [{}]
+        candidates = [
+            target.get('thumbnail'),
+            (target.get('imageArea') or {}).get('url'),
+            children[0].get('thumbnail') if isinstance(children[0], dict) else None,
+            target.get('cover'),
+            target.get('coverUrl')
+        ]
+        return tuple(dict.fromkeys(
+            url for url in candidates if isinstance(url, str) and url.startswith(('http://', 'https://'))
+        ))
+    
     def _extract_hot_index(self, detail_text: str) -> float:
         """
         从详情文本中提取热度指数
@@ -486,6 +876,10 @@ class ZhihuSpider:
     
 
     
+    def pool_stats(self) -> Dict:
+        """HTTP 连接池的复用和淘汰统计"""
+        return self.http_adapter.stats()
+    
     def close(self):
         """关闭会话"""
         if self.session:
@@ -0,0 +1,652 @@
+"""
+全文检索模块 - 基于字符二元组(bigram)倒排索引的标题/摘要检索
+"""
+import os
+import re
+import json
+import math
+import shutil
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from utils import ensure_directory
+
+logger = logging.getLogger(__name__)
+
+# 标题中的词项权重高于摘要
+TITLE_WEIGHT = 2
+EXCERPT_WEIGHT = 1
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+CURRENT_FILE = 'CURRENT'
+DELTA_LOG = 'delta.log'
+LOCK_FILE = 'write.lock'
+
+# 段文件：词项字典、倒排表、文档属性，全部为定长数组，以 mmap 方式加载
+SEGMENT_ARRAYS = (
+    'terms', 'offsets', 'post_docs', 'post_tfs',
+    'doc_qid', 'doc_first', 'doc_last', 'doc_len', 'doc_hash',
+    'qid_sorted', 'qid_order'
+)
+
+_RUN_PATTERN = re.compile(r'[0-9a-z㐀-䶿一-鿿]+')
+
+
+def _term_code(a: str, b: str = '') -> int:
+    """将一个二元组编码为整数（每个码位占21位）"""
+    return (ord(a) << 21) | (ord(b) if b else 0)
+
+
+def tokenize(text: str, query: bool = False) -> List[int]:
+    """
+    将文本切分为字符二元组编码
+
+    中文没有词边界，按连续的汉字/字母数字片段取相邻字符对。片段末尾的字不是任何
+    二元组的首字，索引时额外记录为单字词项；查询中的单字匹配以该字开头的所有词项。
+
+    Args:
+        text: 原始文本
+        query: 是否为查询文本（查询不需要片段末尾的单字词项）
+
+    Returns:
+        词项编码列表（可能重复）
+    """
+    if not text:
+        return []
+
+    codes = []
+    for run in _RUN_PATTERN.findall(text.lower()):
+        codes.extend(_term_code(run[i], run[i + 1]) for i in range(len(run) - 1))
+        if len(run) == 1 or not query:
+            codes.append(_term_code(run[-1]))
+    return codes
+
+
+def _text_hash(title: str, excerpt: str) -> int:
+    """标题和摘要的内容哈希，用于判断文本是否被编辑"""
+    digest = hashlib.blake2b(f"{title}\x00{excerpt}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _to_epoch(value) -> int:
+    """时间转换为秒级时间戳"""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return int(value.timestamp())
+
+
+class SearchIndex:
+    """
+    字符二元组倒排索引
+
+    索引由一个只读的主段和一个内存中的增量段组成。主段是一组 .npy 数组文件，
+    以 mmap 方式加载；新增和修改的文档先写入增量段并追加到 delta.log，
+    增量文档数超过阈值后与主段合并，重新写出新的主段。
+
+    多个写入进程通过索引目录下的文件锁串行写入。拿到锁后先同步磁盘上的状态：
+    主段已被其他进程切换时重新加载，否则重放其他进程追加到 delta.log 的操作，
+    因此合并时不会丢失其他进程新增的文档。
+    """
+
+    def __init__(self, index_dir: str, merge_threshold: int = 5000):
+        self.index_dir = index_dir
+        self.merge_threshold = merge_threshold
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._reset()
+        ensure_directory(self.index_dir)
+        self.load()
+
+    def _reset(self):
+        """清空内存状态"""
+        self._segment = None
+        self._main = {name: np.zeros(0, dtype=np.int64) for name in SEGMENT_ARRAYS}
+        self._main_count = 0
+        self._main_deleted = np.zeros(0, dtype=bool)
+        self._main_last = np.zeros(0, dtype=np.int64)
+
+        # 增量段
+        self._delta_qid = []
+        self._delta_first = []
+        self._delta_last = []
+        self._delta_len = []
+        self._delta_hash = []
+        self._delta_deleted = []
+        self._delta_postings = {}
+        self._delta_doc_of_question = {}
+        self._total_len = 0
+        # 已重放的增量日志字节数
+        self._log_offset = 0
+
+    # ------------------------------------------------------------------
+    # 加载与持久化
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _exclusive(self):
+        """写锁：线程锁加索引目录下的文件锁（fcntl.flock），同一线程内可重入"""
+        import fcntl
+
+        with self._lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+
+            with open(os.path.join(self.index_dir, LOCK_FILE), 'a') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                self._lock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth = 0
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read_current(self) -> Optional[str]:
+        """磁盘上当前主段的目录名"""
+        current_path = os.path.join(self.index_dir, CURRENT_FILE)
+        if not os.path.exists(current_path):
+            return None
+        with open(current_path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+
+    def load(self):
+        """从磁盘加载主段并重放增量日志"""
+        # 持有写锁，避免加载途中主段被其他进程合并替换并删除
+        with self._exclusive():
+            self._reset()
+            self._segment = self._read_current()
+            if self._segment:
+                segment_dir = os.path.join(self.index_dir, self._segment)
+                self._main = {
+                    name: np.load(os.path.join(segment_dir, f'{name}.npy'), mmap_mode='r')
+                    for name in SEGMENT_ARRAYS
+                }
+                self._main_count = len(self._main['doc_qid'])
+                self._main_deleted = np.zeros(self._main_count, dtype=bool)
+                # 最后出现时间会随爬取更新，复制到内存中以便原地修改
+                self._main_last = np.array(self._main['doc_last'])
+                self._total_len = int(np.asarray(self._main['doc_len'], dtype=np.int64).sum())
+
+            replayed = self._replay_log()
+            logger.info("检索索引加载完成: 主段 %d 篇文档，重放增量日志 %d 条", self._main_count, replayed)
+
+    def _replay_log(self) -> int:
+        """重放增量日志中尚未应用的完整行，返回重放的操作数"""
+        log_path = os.path.join(self.index_dir, DELTA_LOG)
+        if not os.path.exists(log_path):
+            return 0
+        with open(log_path, 'rb') as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        # 只处理到最后一个换行，写入中途崩溃留下的半行在下次追加前被截掉
+        end = data.rfind(b'\n') + 1
+        replayed = 0
+        for line in data[:end].splitlines():
+            if line.strip():
+                self._apply(json.loads(line))
+                replayed += 1
+        self._log_offset += end
+        return replayed
+
+    def _sync(self):
+        """在写锁内同步其他进程的写入：主段已切换时重新加载，否则重放新追加的增量日志"""
+        log_path = os.path.join(self.index_dir, DELTA_LOG)
+        log_size = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+        if self._read_current() != self._segment or log_size < self._log_offset:
+            self.load()
+        else:
+            self._replay_log()
+
+    def _append_log(self, ops: List[Dict]):
+        """追加增量日志，须持有写锁"""
+        if not ops:
+            return
+        payload = ''.join(json.dumps(op, ensure_ascii=False) + '\n' for op in ops).encode('utf-8')
+        with open(os.path.join(self.index_dir, DELTA_LOG), 'ab') as f:
+            f.truncate(self._log_offset)
+            f.write(payload)
+        self._log_offset += len(payload)
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def add_documents(self, docs: Iterable[Dict]) -> int:
+        """
+        新增或更新文档
+
+        Args:
+            docs: 文档字典，包含 question_id、title、excerpt、first_seen、last_seen
+
+        Returns:
+            新建索引的文档数（仅时间变化的文档不计入）
+        """
+        ops = []
+        with self._exclusive():
+            self._sync()
+            for doc in docs:
+                question_id = str(doc.get('question_id', ''))
+                if not question_id.isdigit():
+                    continue
+
+                title = doc.get('title') or ''
+                excerpt = doc.get('excerpt') or ''
+                first_seen = _to_epoch(doc.get('first_seen'))
+                last_seen = _to_epoch(doc.get('last_seen')) or first_seen
+                text_hash = _text_hash(title, excerpt)
+
+                existing = self._find_doc(int(question_id))
+                if existing is not None and self._doc_hash(existing) == text_hash:
+                    if last_seen > self._doc_last(existing):
+                        op = {'op': 'touch', 'q': question_id, 'last': last_seen}
+                        self._apply(op)
+                        ops.append(op)
+                    continue
+
+                if existing is not None:
+                    first_seen = min(first_seen, self._doc_first(existing)) if first_seen else self._doc_first(existing)
+                op = {
+                    'op': 'add', 'q': question_id, 'title': title, 'excerpt': excerpt,
+                    'first': first_seen, 'last': last_seen
+                }
+                self._apply(op)
+                ops.append(op)
+
+            self._append_log(ops)
+            added = sum(1 for op in ops if op['op'] == 'add')
+
+            if len(self._delta_qid) >= self.merge_threshold:
+                self._merge()
+        return added
+
+    def add_items(self, items: List[Dict], crawl_time: datetime) -> int:
+        """
+        将一次爬取的热榜数据加入索引，供 save_hot_items 调用
+
+        Args:
+            items: 热榜数据列表
+            crawl_time: 爬取时间
+
+        Returns:
+            新建索引的文档数
+        """
+        return self.add_documents(
+            dict(item, first_seen=crawl_time, last_seen=crawl_time) for item in items
+        )
+
+    def _apply(self, op: Dict):
+        """将一条增量操作应用到内存状态"""
+        question_id = int(op['q'])
+        existing = self._find_doc(question_id)
+
+        if op['op'] == 'touch':
+            if existing is not None:
+                self._set_doc_last(existing, op['last'])
+            return
+
+        if existing is not None:
+            self._delete_doc(existing)
+
+        counts = {}
+        for code in tokenize(op['title']):
+            counts[code] = counts.get(code, 0) + TITLE_WEIGHT
+        for code in tokenize(op['excerpt']):
+            counts[code] = counts.get(code, 0) + EXCERPT_WEIGHT
+
+        doc_id = self._main_count + len(self._delta_qid)
+        doc_len = sum(counts.values())
+        self._delta_qid.append(question_id)
+        self._delta_first.append(op['first'])
+        self._delta_last.append(op['last'])
+        self._delta_len.append(doc_len)
+        self._delta_hash.append(_text_hash(op['title'], op['excerpt']))
+        self._delta_deleted.append(False)
+        self._delta_doc_of_question[question_id] = doc_id
+        self._total_len += doc_len
+
+        for code, tf in counts.items():
+            self._delta_postings.setdefault(code, []).append((doc_id, tf))
+
+    # ------------------------------------------------------------------
+    # 文档属性访问
+    # ------------------------------------------------------------------
+
+    def _find_doc(self, question_id: int) -> Optional[int]:
+        """查找问题对应的有效文档编号"""
+        doc_id = self._delta_doc_of_question.get(question_id)
+        if doc_id is not None:
+            return doc_id
+        if self._main_count:
+            qid_sorted = self._main['qid_sorted']
+            pos = int(np.searchsorted(qid_sorted, question_id))
+            if pos < len(qid_sorted) and int(qid_sorted[pos]) == question_id:
+                doc_id = int(self._main['qid_order'][pos])
+                if not self._main_deleted[doc_id]:
+                    return doc_id
+        return None
+
+    def _doc_hash(self, doc_id: int) -> int:
+        if doc_id < self._main_count:
+            return int(self._main['doc_hash'][doc_id])
+        return self._delta_hash[doc_id - self._main_count]
+
+    def _doc_first(self, doc_id: int) -> int:
+        if doc_id < self._main_count:
+            return int(self._main['doc_first'][doc_id])
+        return self._delta_first[doc_id - self._main_count]
+
+    def _doc_last(self, doc_id: int) -> int:
+        if doc_id < self._main_count:
+            return int(self._main_last[doc_id])
+        return self._delta_last[doc_id - self._main_count]
+
+    def _set_doc_last(self, doc_id: int, value: int):
+        if doc_id < self._main_count:
+            self._main_last[doc_id] = max(int(self._main_last[doc_id]), value)
+        else:
+            i = doc_id - self._main_count
+            self._delta_last[i] = max(self._delta_last[i], value)
+
+    def _delete_doc(self, doc_id: int):
+        if doc_id < self._main_count:
+            self._main_deleted[doc_id] = True
+            self._total_len -= int(self._main['doc_len'][doc_id])
+        else:
+            i = doc_id - self._main_count
+            self._delta_deleted[i] = True
+            self._total_len -= self._delta_len[i]
+            self._delta_doc_of_question.pop(self._delta_qid[i], None)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def search(self, query: str, limit: int = 20, since: Optional[datetime] = None,
+               until: Optional[datetime] = None) -> List[Dict]:
+        """
+        检索包含查询中全部二元组的文档，按BM25得分排序
+
+        Args:
+            query: 查询文本
+            limit: 返回条数
+            since: 只返回最后出现时间不早于该时间的文档
+            until: 只返回首次出现时间早于该时间的文档
+
+        Returns:
+            结果列表，包含 question_id、score、first_seen、last_seen
+        """
+        codes = sorted(set(tokenize(query, query=True)))
+        if not codes:
+            return []
+
+        with self._lock:
+            postings = [self._postings(code) for code in codes]
+            if any(len(docs) == 0 for docs, _ in postings):
+                return []
+
+            # 从最短的倒排表开始求交集
+            order = sorted(range(len(postings)), key=lambda i: len(postings[i][0]))
+            candidates = postings[order[0]][0]
+            for i in order[1:]:
+                candidates = np.intersect1d(candidates, postings[i][0], assume_unique=True)
+                if not len(candidates):
+                    return []
+
+            candidates = candidates[~self._deleted(candidates)]
+            first, last, doc_len = self._doc_arrays(candidates)
+            keep = np.ones(len(candidates), dtype=bool)
+            if since is not None:
+                keep &= last >= _to_epoch(since)
+            if until is not None:
+                keep &= first < _to_epoch(until)
+            candidates, first, last, doc_len = candidates[keep], first[keep], last[keep], doc_len[keep]
+            if not len(candidates):
+                return []
+
+            live_docs = self.doc_count
+            avg_len = self._total_len / live_docs if live_docs else 1.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / avg_len)
+            scores = np.zeros(len(candidates))
+            for docs, tfs in postings:
+                df = len(docs)
+                idf = math.log(1 + (live_docs - df + 0.5) / (df + 0.5))
+                tf = tfs[np.searchsorted(docs, candidates)].astype(np.float64)
+                scores += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            k = min(limit, len(candidates))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.lexsort((-last[top], -scores[top]))]
+
+            return [
+                {
+                    'question_id': str(self._doc_qid(int(candidates[i]))),
+                    'score': float(scores[i]),
+                    'first_seen': datetime.fromtimestamp(int(first[i])),
+                    'last_seen': datetime.fromtimestamp(int(last[i]))
+                }
+                for i in top
+            ]
+
+    def _postings(self, code: int):
+        """
+        合并主段和增量段中某个词项的倒排表（文档编号升序）
+
+        单字词项（低21位为0）匹配以该字开头的全部词项，对应词项字典中的一段连续区间
+        """
+        high = code + (1 << 21) if code & ((1 << 21) - 1) == 0 else code + 1
+        doc_parts, tf_parts = [], []
+        if self._main_count:
+            terms = self._main['terms']
+            start = int(np.searchsorted(terms, code))
+            end = int(np.searchsorted(terms, high))
+            if start < end:
+                lo, hi = int(self._main['offsets'][start]), int(self._main['offsets'][end])
+                doc_parts.append(np.asarray(self._main['post_docs'][lo:hi], dtype=np.int64))
+                tf_parts.append(np.asarray(self._main['post_tfs'][lo:hi], dtype=np.int64))
+
+        delta_codes = [code] if high == code + 1 else [c for c in self._delta_postings if code <= c < high]
+        for delta_code in delta_codes:
+            delta = self._delta_postings.get(delta_code)
+            if delta:
+                delta_docs, delta_tfs = zip(*delta)
+                doc_parts.append(np.array(delta_docs, dtype=np.int64))
+                tf_parts.append(np.array(delta_tfs, dtype=np.int64))
+
+        if not doc_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        docs = np.concatenate(doc_parts)
+        tfs = np.concatenate(tf_parts)
+        if high != code + 1:
+            # 多个词项的倒排表合并后按文档累加词频
+            docs, inverse = np.unique(docs, return_inverse=True)
+            tfs = np.bincount(inverse, weights=tfs).astype(np.int64)
+        return docs, tfs
+
+    def _deleted(self, doc_ids: np.ndarray) -> np.ndarray:
+        """文档是否已被删除"""
+        in_main = doc_ids < self._main_count
+        result = np.zeros(len(doc_ids), dtype=bool)
+        result[in_main] = self._main_deleted[doc_ids[in_main]]
+        if not in_main.all():
+            delta_deleted = np.array(self._delta_deleted, dtype=bool)
+            result[~in_main] = delta_deleted[doc_ids[~in_main] - self._main_count]
+        return result
+
+    def _doc_arrays(self, doc_ids: np.ndarray):
+        """批量获取文档的首次出现时间、最后出现时间和长度"""
+        in_main = doc_ids < self._main_count
+        first = np.zeros(len(doc_ids), dtype=np.int64)
+        last = np.zeros(len(doc_ids), dtype=np.int64)
+        doc_len = np.zeros(len(doc_ids), dtype=np.float64)
+
+        main_ids = doc_ids[in_main]
+        first[in_main] = self._main['doc_first'][main_ids]
+        last[in_main] = self._main_last[main_ids]
+        doc_len[in_main] = self._main['doc_len'][main_ids]
+
+        if not in_main.all():
+            delta_ids = doc_ids[~in_main] - self._main_count
+            first[~in_main] = np.array(self._delta_first, dtype=np.int64)[delta_ids]
+            last[~in_main] = np.array(self._delta_last, dtype=np.int64)[delta_ids]
+            doc_len[~in_main] = np.array(self._delta_len, dtype=np.float64)[delta_ids]
+        return first, last, doc_len
+
+    def _doc_qid(self, doc_id: int) -> int:
+        if doc_id < self._main_count:
+            return int(self._main['doc_qid'][doc_id])
+        return self._delta_qid[doc_id - self._main_count]
+
+    @property
+    def doc_count(self) -> int:
+        """有效文档数"""
+        return (self._main_count - int(self._main_deleted.sum())
+                + len(self._delta_deleted) - sum(self._delta_deleted))
+
+    def stats(self) -> Dict:
+        """索引统计信息"""
+        with self._lock:
+            return {
+                'documents': self.doc_count,
+                'main_documents': self._main_count,
+                'delta_documents': len(self._delta_qid),
+                'terms': len(self._main['terms']),
+                'postings': len(self._main['post_docs']),
+                'segment': self._segment
+            }
+
+    # ------------------------------------------------------------------
+    # 合并与重建
+    # ------------------------------------------------------------------
+
+    def merge(self):
+        """将增量段与主段合并为新的主段，并清空增量日志"""
+        with self._exclusive():
+            self._sync()
+            self._merge()
+
+    def _merge(self):
+        """合并当前内存中的主段和增量段，须持有写锁"""
+        # 主段中仍有效的文档
+        keep_main = np.flatnonzero(~self._main_deleted)
+        keep_delta = np.flatnonzero(~np.array(self._delta_deleted, dtype=bool))
+        new_id = np.full(self._main_count + len(self._delta_qid), -1, dtype=np.int64)
+        new_id[keep_main] = np.arange(len(keep_main))
+        new_id[self._main_count + keep_delta] = len(keep_main) + np.arange(len(keep_delta))
+
+        # 展开全部 (词项, 文档, 词频) 三元组
+        code_parts, doc_parts, tf_parts = [], [], []
+        if self._main_count:
+            counts = np.diff(np.asarray(self._main['offsets']))
+            code_parts.append(np.repeat(np.asarray(self._main['terms'], dtype=np.uint64), counts))
+            doc_parts.append(np.asarray(self._main['post_docs'], dtype=np.int64))
+            tf_parts.append(np.asarray(self._main['post_tfs'], dtype=np.int64))
+        for code, entries in self._delta_postings.items():
+            entry_docs, entry_tfs = zip(*entries)
+            code_parts.append(np.full(len(entries), code, dtype=np.uint64))
+            doc_parts.append(np.array(entry_docs, dtype=np.int64))
+            tf_parts.append(np.array(entry_tfs, dtype=np.int64))
+
+        codes = np.concatenate(code_parts) if code_parts else np.zeros(0, dtype=np.uint64)
+        docs = np.concatenate(doc_parts) if doc_parts else np.zeros(0, dtype=np.int64)
+        tfs = np.concatenate(tf_parts) if tf_parts else np.zeros(0, dtype=np.int64)
+
+        docs = new_id[docs] if len(docs) else docs
+        live = docs >= 0
+        codes, docs, tfs = codes[live], docs[live], tfs[live]
+        order = np.lexsort((docs, codes))
+        codes, docs, tfs = codes[order], docs[order], tfs[order]
+        terms, starts = np.unique(codes, return_index=True)
+
+        def doc_column(main_name, delta_values, dtype):
+            main_values = np.asarray(self._main[main_name], dtype=dtype)[keep_main] \
+                if self._main_count else np.zeros(0, dtype=dtype)
+            return np.concatenate([main_values, np.array(delta_values, dtype=dtype)[keep_delta]])
+
+        doc_qid = doc_column('doc_qid', self._delta_qid, np.uint64)
+        main_last = self._main_last[keep_main] if self._main_count else np.zeros(0, dtype=np.int64)
+        arrays = {
+            'terms': terms.astype(np.uint64),
+            'offsets': np.append(starts, len(codes)).astype(np.int64),
+            'post_docs': docs.astype(np.uint32),
+            'post_tfs': np.minimum(tfs, np.iinfo(np.uint16).max).astype(np.uint16),
+            'doc_qid': doc_qid,
+            'doc_first': doc_column('doc_first', self._delta_first, np.int64),
+            'doc_last': np.concatenate([main_last, np.array(self._delta_last, dtype=np.int64)[keep_delta]]),
+            'doc_len': doc_column('doc_len', self._delta_len, np.uint32),
+            'doc_hash': doc_column('doc_hash', self._delta_hash, np.uint64),
+            'qid_sorted': np.sort(doc_qid),
+            'qid_order': np.argsort(doc_qid, kind='stable').astype(np.uint32)
+        }
+        self._write_segment(arrays)
+        logger.info("检索索引合并完成: %d 篇文档，%d 个词项", len(doc_qid), len(terms))
+
+    def rebuild(self, docs: Iterable[Dict]) -> int:
+        """
+        丢弃现有索引并从给定文档重建
+
+        Args:
+            docs: 文档字典迭代器
+
+        Returns:
+            索引的文档数
+        """
+        with self._exclusive():
+            self._reset()
+            log_path = os.path.join(self.index_dir, DELTA_LOG)
+            if os.path.exists(log_path):
+                os.remove(log_path)
+            for doc in docs:
+                question_id = str(doc.get('question_id', ''))
+                if not question_id.isdigit():
+                    continue
+                first_seen = _to_epoch(doc.get('first_seen'))
+                self._apply({
+                    'op': 'add', 'q': question_id,
+                    'title': doc.get('title') or '', 'excerpt': doc.get('excerpt') or '',
+                    'first': first_seen, 'last': _to_epoch(doc.get('last_seen')) or first_seen
+                })
+            self._merge()
+            return self.doc_count
+
+    def _write_segment(self, arrays: Dict[str, np.ndarray]):
+        """写出新的主段，切换 CURRENT 并清理旧段和增量日志，须持有写锁"""
+        segment = f"seg-{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        segment_dir = os.path.join(self.index_dir, segment)
+        ensure_directory(segment_dir)
+        for name in SEGMENT_ARRAYS:
+            np.save(os.path.join(segment_dir, f'{name}.npy'), arrays[name])
+
+        current_path = os.path.join(self.index_dir, CURRENT_FILE)
+        old_segment = None
+        if os.path.exists(current_path):
+            with open(current_path, 'r', encoding='utf-8') as f:
+                old_segment = f.read().strip()
+
+        tmp_path = current_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(segment)
+        os.replace(tmp_path, current_path)
+
+        log_path = os.path.join(self.index_dir, DELTA_LOG)
+        if os.path.exists(log_path):
+            os.remove(log_path)
+
+        # 其他进程已映射的旧段文件在删除后仍可继续读取
+        self.load()
+        if old_segment and old_segment != segment:
+            shutil.rmtree(os.path.join(self.index_dir, old_segment), ignore_errors=True)
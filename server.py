@@ -0,0 +1,266 @@
+"""
+HTTP查询服务模块 - 基于内存快照提供只读的热榜查询接口
+"""
+import json
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from config import SERVER_CONFIG
+from database import db_manager
+from identities import get_identity_pool
+from proxies import get_proxy_pool
+
+logger = logging.getLogger(__name__)
+
+
+def _serialize(payload) -> Tuple[bytes, str]:
+    """序列化响应体并计算ETag"""
+    body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    return body, etag
+
+
+class HotListSnapshot:
+    """
+    热榜内存快照
+
+    每次刷新时一次性从数据库加载最近一次爬取的榜单和历史窗口，
+    并预先序列化所有响应，请求处理期间不访问数据库。
+    """
+
+    def __init__(self):
+        self.crawl_time = None
+        self.responses = {}
+
+    @classmethod
+    def build(cls, history_days: int, movers_limit: int, manager=None) -> 'HotListSnapshot':
+        """
+        从数据库构建快照
+
+        Args:
+            history_days: 问题历史保留天数
+            movers_limit: 涨跌榜条数
+            manager: 数据库管理器，默认使用全局 db_manager
+
+        Returns:
+            快照对象
+        """
+        manager = manager or db_manager
+        snapshot = cls()
+        latest_time = manager.get_latest_crawl_time()
+        snapshot.crawl_time = latest_time
+        if latest_time is None:
+            snapshot.responses['/hot/latest'] = _serialize({'crawl_time': None, 'items': []})
+            snapshot.responses['/hot/movers'] = _serialize({'crawl_time': None, 'items': []})
+            return snapshot
+
+        # 按问题分组历史快照，同时按爬取时间分组
+        history = {}
+        crawls = {}
+        for row in manager.get_snapshots(since=latest_time - timedelta(days=history_days)):
+            history.setdefault(row.question_id, []).append(row)
+            crawls.setdefault(row.crawl_time, []).append(row)
+
+        crawl_times = sorted(crawls)
+        latest_rows = crawls.get(latest_time, [])
+        previous_ranks = {}
+        if len(crawl_times) >= 2:
+            previous_ranks = {row.question_id: row.rank for row in crawls[crawl_times[-2]]}
+
+        items = manager.get_items_by_question_ids(list(history))
+
+        latest_list = []
+        movers = []
+        for row in latest_rows:
+            item = items.get(row.question_id)
+            entry = {
+                'rank': row.rank,
+                'question_id': row.question_id,
+                'title': item.title if item else None,
+                'url': item.url if item else None,
+                'hot_index': row.hot_index,
+                'answer_count': row.answer_count,
+                'follower_count': row.follower_count
+            }
+            latest_list.append(entry)
+
+            previous_rank = previous_ranks.get(row.question_id)
+            movers.append(dict(
+                entry,
+                previous_rank=previous_rank,
+                rank_change=(previous_rank - row.rank) if previous_rank and row.rank else None
+            ))
+
+        # 新上榜的条目排在最前，其余按名次上升幅度排序
+        movers.sort(key=lambda x: (x['previous_rank'] is not None, -(x['rank_change'] or 0)))
+
+        crawl_time = latest_time.isoformat()
+        snapshot.responses['/hot/latest'] = _serialize({'crawl_time': crawl_time, 'items': latest_list})
+        snapshot.responses['/hot/movers'] = _serialize({
+            'crawl_time': crawl_time,
+            'previous_crawl_time': crawl_times[-2].isoformat() if len(crawl_times) >= 2 else None,
+            'items': movers[:movers_limit]
+        })
+
+        for question_id, rows in history.items():
+            item = items.get(question_id)
+            snapshot.responses[f'/question/{question_id}/history'] = _serialize({
+                'question_id': question_id,
+                'title': item.title if item else None,
+                'history': [row.to_dict() for row in rows]
+            })
+
+        return snapshot
+
+
+class HotListService:
+    """热榜查询服务"""
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None, manager=None):
+        """
+        Args:
+            host: 监听地址，默认使用 SERVER_CONFIG['host']
+            port: 监听端口，默认使用 SERVER_CONFIG['port']，0 表示由系统分配
+            manager: 数据库管理器，默认使用全局 db_manager
+        """
+        self.host = host or SERVER_CONFIG['host']
+        self.port = port if port is not None else SERVER_CONFIG['port']
+        self.db = manager or db_manager
+        self.snapshot = HotListSnapshot()
+        self.httpd = None
+        self._stop_event = threading.Event()
+        self._refresh_lock = threading.Lock()
+        # 请求计数在多个处理线程中更新
+        self._stats_lock = threading.Lock()
+
+        self.request_count = 0
+        self.not_modified_count = 0
+        self.refresh_count = 0
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        刷新内存快照
+
+        Args:
+            force: 即使没有新的爬取数据也重新构建
+
+        Returns:
+            快照是否被更新
+        """
+        with self._refresh_lock:
+            try:
+                if not force and self.db.get_latest_crawl_time() == self.snapshot.crawl_time \
+                        and self.snapshot.responses:
+                    return False
+
+                started = time.monotonic()
+                self.snapshot = HotListSnapshot.build(
+                    SERVER_CONFIG['history_days'], SERVER_CONFIG['movers_limit'], self.db
+                )
+                self.refresh_count += 1
+                logger.info("查询服务快照已刷新: 爬取时间 %s，%d 个预计算响应，耗时 %.3f 秒",
+                            self.snapshot.crawl_time, len(self.snapshot.responses), time.monotonic() - started)
+                return True
+            except Exception as e:
+                logger.error("刷新查询服务快照失败: %s", e)
+                return False
+
+    def metrics(self) -> Dict:
+        """服务运行指标，含请求身份的健康状态和数据库连接池指标，同进程定时爬取使用代理池时还包含各代理的健康状态"""
+        with self._stats_lock:
+            requests, not_modified = self.request_count, self.not_modified_count
+        metrics = {
+            'crawl_time': self.snapshot.crawl_time,
+            'responses': len(self.snapshot.responses),
+            'requests': requests,
+            'not_modified': not_modified,
+            'refreshes': self.refresh_count,
+            'timestamp': datetime.now().isoformat()
+        }
+        metrics['identities'] = get_identity_pool().stats()
+        proxy_pool = get_proxy_pool()
+        if proxy_pool is not None:
+            metrics['proxies'] = proxy_pool.stats()
+        pool_stats = self.db.pool_stats()
+        if pool_stats is not None:
+            metrics['db_pool'] = pool_stats
+        return metrics
+
+    def serve_forever(self):
+        """启动HTTP服务并在后台定期检查新的爬取数据"""
+        self.refresh(force=True)
+
+        watcher = threading.Thread(target=self._watch, name='snapshot-watcher', daemon=True)
+        watcher.start()
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self.httpd.daemon_threads = True
+        logger.info("查询服务已启动: http://%s:%s", self.host, self.port)
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self._stop_event.set()
+            self.httpd.server_close()
+
+    def shutdown(self):
+        """停止HTTP服务"""
+        self._stop_event.set()
+        if self.httpd:
+            self.httpd.shutdown()
+
+    def _watch(self):
+        """后台检查是否有新的爬取数据"""
+        while not self._stop_event.wait(SERVER_CONFIG['refresh_interval']):
+            self.refresh()
+
+    def _make_handler(self):
+        """创建绑定到当前服务的请求处理类"""
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with service._stats_lock:
+                    service.request_count += 1
+                path = urlparse(self.path).path.rstrip('/') or '/'
+
+                if path == '/metrics':
+                    body, etag = _serialize(service.metrics())
+                else:
+                    response = service.snapshot.responses.get(path)
+                    if response is None:
+                        self._send(404, _serialize({'error': 'not found'})[0])
+                        return
+                    body, etag = response
+
+                if self.headers.get('If-None-Match') == etag:
+                    with service._stats_lock:
+                        service.not_modified_count += 1
+                    self._send(304, b'', etag)
+                    return
+
+                self._send(200, body, etag)
+
+            def _send(self, status: int, body: bytes, etag: Optional[str] = None):
+                self.send_response(status)
+                if etag:
+                    self.send_header('ETag', etag)
+                    self.send_header('Cache-Control', 'no-cache')
+                if status != 304:
+                    self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("%s - %s", self.address_string(), format % args)
+
+        return Handler
@@ -0,0 +1,397 @@
+"""
+分布式任务队列模块 - 多个采集节点通过数据库中的任务表按租约领取爬取任务
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, or_, select, update
+
+from config import QUEUE_CONFIG
+from database import db_manager
+from models import CrawlTask
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = 'pending'
+STATUS_LEASED = 'leased'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+class TaskQueue:
+    """
+    基于 crawl_tasks 表的任务队列
+
+    领取任务时以 SELECT ... FOR UPDATE SKIP LOCKED 锁定候选行（PostgreSQL），并在同一条
+    UPDATE 中再次校验任务仍可领取，多个节点并发领取时每个任务只会被一个节点拿到。
+    节点定期心跳续约；节点失联、租约过期后任务重新变为可领取。
+    """
+
+    def __init__(self, manager=None, owner: Optional[str] = None):
+        self.db = manager or db_manager
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.table = CrawlTask.__table__
+        self.lease_duration = timedelta(seconds=QUEUE_CONFIG['lease_seconds'])
+
+    def enqueue(self, kind: str, payload: Optional[Dict] = None, dedupe_key: Optional[str] = None,
+                priority: int = 0, available_at: Optional[datetime] = None) -> int:
+        """
+        入队单个任务
+
+        Args:
+            kind: 任务类型
+            payload: 任务参数
+            dedupe_key: 去重键，默认随机生成（不去重）
+            priority: 优先级
+            available_at: 最早可领取时间
+
+        Returns:
+            实际入队的任务数（0 表示去重键已存在）
+        """
+        return self.enqueue_many([{
+            'kind': kind, 'payload': payload, 'dedupe_key': dedupe_key,
+            'priority': priority, 'available_at': available_at
+        }])
+
+    def enqueue_many(self, tasks: List[Dict]) -> int:
+        """
+        批量入队，去重键已存在的任务会被忽略
+
+        Args:
+            tasks: 任务字典列表，包含 kind，可选 payload、dedupe_key、priority、available_at
+
+        Returns:
+            实际入队的任务数
+        """
+        if not tasks:
+            return 0
+
+        now = datetime.now()
+        rows = [
+            {
+                'kind': task['kind'],
+                'payload': json.dumps(task.get('payload') or {}, ensure_ascii=False),
+                'dedupe_key': task.get('dedupe_key') or f"{task['kind']}:{uuid.uuid4().hex}",
+                'status': STATUS_PENDING,
+                'priority': task.get('priority') or 0,
+                'attempts': 0,
+                'max_attempts': QUEUE_CONFIG['max_attempts'],
+                'available_at': task.get('available_at') or now,
+                'created_time': now
+            }
+            for task in tasks
+        ]
+        stmt = self.db.backend.insert(self.table).on_conflict_do_nothing(
+            index_elements=[self.table.c.dedupe_key]
+        ).returning(self.table.c.id)
+
+        # rowcount 在部分驱动上不可靠（DuckDB 返回 -1），以 RETURNING 的行数统计实际插入数
+        inserted = 0
+        with self.db.engine.begin() as conn:
+            for row in rows:
+                inserted += len(conn.execute(stmt, row).fetchall())
+        return inserted
+
+    def enqueue_periodic(self, kind: str, interval: int, payload: Optional[Dict] = None,
+                         priority: int = 0) -> int:
+        """
+        为当前时间片入队周期任务
+
+        去重键包含时间片编号，所有节点都调用本方法，每个时间片也只会产生一个任务
+
+        Args:
+            kind: 任务类型
+            interval: 周期（秒）
+            payload: 任务参数
+            priority: 优先级
+
+        Returns:
+            实际入队的任务数
+        """
+        slot = int(time.time() // interval)
+        return self.enqueue(kind, payload, dedupe_key=f"{kind}:{interval}:{slot}", priority=priority)
+
+    def lease(self, limit: int = 1) -> List[Dict]:
+        """
+        领取可执行的任务
+
+        Args:
+            limit: 最多领取的任务数
+
+        Returns:
+            任务字典列表，包含 id、kind、payload、attempts
+        """
+        if limit <= 0:
+            return []
+
+        table = self.table
+        now = datetime.now()
+        claimable = or_(
+            and_(table.c.status == STATUS_PENDING, table.c.available_at <= now),
+            and_(table.c.status == STATUS_LEASED, table.c.lease_expires_at < now,
+                 table.c.attempts < table.c.max_attempts)
+        )
+        candidates = (
+            select(table.c.id)
+            .where(claimable)
+            .order_by(table.c.priority.desc(), table.c.available_at)
+            .limit(limit)
+        )
+        if self.db.backend.supports_skip_locked:
+            candidates = candidates.with_for_update(skip_locked=True)
+
+        stmt = (
+            update(table)
+            .where(table.c.id.in_(candidates.scalar_subquery()), claimable)
+            .values(
+                status=STATUS_LEASED,
+                lease_owner=self.owner,
+                lease_expires_at=now + self.lease_duration,
+                heartbeat_at=now,
+                attempts=table.c.attempts + 1
+            )
+            .returning(table.c.id, table.c.kind, table.c.payload, table.c.attempts)
+        )
+
+        with self.db.engine.begin() as conn:
+            self._expire_exhausted(conn, now)
+            rows = conn.execute(stmt).fetchall()
+
+        return [
+            {'id': task_id, 'kind': kind, 'payload': json.loads(payload or '{}'), 'attempts': attempts}
+            for task_id, kind, payload, attempts in rows
+        ]
+
+    def _expire_exhausted(self, conn, now: datetime):
+        """租约过期且已达最大尝试次数的任务标记为失败，避免反复拖垮节点的任务无限重试"""
+        table = self.table
+        conn.execute(
+            update(table)
+            .where(table.c.status == STATUS_LEASED, table.c.lease_expires_at < now,
+                   table.c.attempts >= table.c.max_attempts)
+            .values(status=STATUS_FAILED, finished_time=now, last_error='租约过期且已达最大尝试次数')
+        )
+
+    def heartbeat(self, task_ids: List[int]) -> List[int]:
+        """
+        为本节点持有的任务续约
+
+        Args:
+            task_ids: 任务ID列表
+
+        Returns:
+            仍由本节点持有的任务ID列表
+        """
+        if not task_ids:
+            return []
+
+        table = self.table
+        now = datetime.now()
+        stmt = (
+            update(table)
+            .where(table.c.id.in_(task_ids), table.c.status == STATUS_LEASED,
+                   table.c.lease_owner == self.owner)
+            .values(lease_expires_at=now + self.lease_duration, heartbeat_at=now)
+            .returning(table.c.id)
+        )
+        with self.db.engine.begin() as conn:
+            return [row[0] for row in conn.execute(stmt)]
+
+    def complete(self, task_id: int) -> bool:
+        """
+        标记任务完成
+
+        Returns:
+            是否仍持有租约（租约已被其他节点接管时返回False）
+        """
+        return self._finish(task_id, status=STATUS_DONE, finished_time=datetime.now(),
+                            lease_owner=None, lease_expires_at=None)
+
+    def fail(self, task_id: int, error: str) -> bool:
+        """
+        标记任务失败，未达最大尝试次数时按指数退避重新入队
+
+        Returns:
+            是否仍持有租约
+        """
+        table = self.table
+        now = datetime.now()
+        with self.db.engine.begin() as conn:
+            attempts, max_attempts = conn.execute(
+                select(table.c.attempts, table.c.max_attempts).where(table.c.id == task_id)
+            ).one()
+            if attempts >= max_attempts:
+                values = {'status': STATUS_FAILED, 'finished_time': now}
+            else:
+                backoff = QUEUE_CONFIG['retry_backoff'] * 2 ** (attempts - 1)
+                values = {'status': STATUS_PENDING, 'available_at': now + timedelta(seconds=backoff)}
+            result = conn.execute(
+                update(table)
+                .where(table.c.id == task_id, table.c.lease_owner == self.owner,
+                       table.c.status == STATUS_LEASED)
+                .values(last_error=error[:2000], lease_owner=None, lease_expires_at=None, **values)
+                .returning(table.c.id)
+            )
+            return bool(result.fetchall())
+
+    def _finish(self, task_id: int, **values) -> bool:
+        table = self.table
+        with self.db.engine.begin() as conn:
+            result = conn.execute(
+                update(table)
+                .where(table.c.id == task_id, table.c.lease_owner == self.owner,
+                       table.c.status == STATUS_LEASED)
+                .values(**values)
+                .returning(table.c.id)
+            )
+            return bool(result.fetchall())
+
+    def stats(self) -> Dict[str, int]:
+        """各状态的任务数"""
+        table = self.table
+        with self.db.engine.connect() as conn:
+            rows = conn.execute(select(table.c.status, func.count()).group_by(table.c.status))
+            return {status: count for status, count in rows}
+
+    def purge(self, days: Optional[int] = None) -> int:
+        """
+        删除已结束的旧任务
+
+        Args:
+            days: 保留天数，默认使用 QUEUE_CONFIG['retention_days']
+
+        Returns:
+            删除的任务数
+        """
+        cutoff = datetime.now() - timedelta(days=QUEUE_CONFIG['retention_days'] if days is None else days)
+        table = self.table
+        with self.db.engine.begin() as conn:
+            result = conn.execute(
+                delete(table).where(table.c.status.in_([STATUS_DONE, STATUS_FAILED]),
+                                    table.c.finished_time < cutoff)
+                .returning(table.c.id)
+            )
+            return len(result.fetchall())
+
+
+class CrawlWorker:
+    """
+    采集节点
+
+    循环从队列领取任务并在线程池中执行，后台线程定期为执行中的任务心跳续约。
+    每轮循环都会尝试入队周期任务，所有节点共同维持调度，任一节点宕机不影响其他节点。
+    """
+
+    def __init__(self, queue: TaskQueue, handlers: Dict[str, Callable[[Dict], Any]],
+                 concurrency: Optional[int] = None, periodic: Optional[List[Tuple[str, int, int]]] = None):
+        """
+        Args:
+            queue: 任务队列
+            handlers: 任务类型到处理函数的映射，处理函数抛出异常或返回False视为失败
+            concurrency: 同时执行的任务数
+            periodic: 周期任务列表，每项为 (任务类型, 周期秒数, 优先级)
+        """
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency or QUEUE_CONFIG['concurrency']
+        self.periodic = periodic or []
+        self._running = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._exited = threading.Event()
+        self.processed = 0
+        self.failed = 0
+
+    def run(self, max_tasks: Optional[int] = None):
+        """
+        运行采集循环，直到 stop() 被调用或处理完 max_tasks 个任务
+
+        Args:
+            max_tasks: 处理的任务数上限，None表示不限
+        """
+        logger.info("采集节点 %s 启动，并发数 %d", self.queue.owner, self.concurrency)
+        self._exited.clear()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name='queue-heartbeat', daemon=True)
+        heartbeat.start()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='crawl-worker') as executor:
+            while not self._stop.is_set():
+                if max_tasks is not None and self.processed + self.failed >= max_tasks:
+                    break
+
+                try:
+                    for kind, interval, priority in self.periodic:
+                        self.queue.enqueue_periodic(kind, interval, priority=priority)
+
+                    with self._lock:
+                        free = self.concurrency - len(self._running)
+                    if max_tasks is not None:
+                        free = min(free, max_tasks - self.processed - self.failed - len(self._running))
+                    tasks = self.queue.lease(free)
+                except Exception as e:
+                    logger.error("领取任务失败: %s", e)
+                    tasks = []
+
+                for task in tasks:
+                    with self._lock:
+                        self._running[task['id']] = task
+                    executor.submit(self._execute, task)
+
+                if not tasks:
+                    self._stop.wait(QUEUE_CONFIG['poll_interval'])
+
+            # 等待执行中的任务结束后再退出，已领取的任务不会丢失
+            logger.info("采集节点停止领取任务，等待执行中的任务完成")
+
+        self._exited.set()
+        logger.info("采集节点 %s 退出: 成功 %d，失败 %d", self.queue.owner, self.processed, self.failed)
+
+    def stop(self):
+        """停止领取新任务"""
+        self._stop.set()
+
+    def _execute(self, task: Dict):
+        """执行单个任务并回写结果"""
+        handler = self.handlers.get(task['kind'])
+        try:
+            if handler is None:
+                raise ValueError(f"未知的任务类型: {task['kind']}")
+            if handler(task['payload']) is False:
+                raise RuntimeError("处理函数返回失败")
+            self.queue.complete(task['id'])
+            with self._lock:
+                self.processed += 1
+        except Exception as e:
+            logger.error("任务 %s (%s) 第 %d 次执行失败: %s", task['id'], task['kind'], task['attempts'], e)
+            try:
+                self.queue.fail(task['id'], str(e))
+            except Exception as fail_error:
+                logger.error("回写任务 %s 失败状态出错: %s", task['id'], fail_error)
+            with self._lock:
+                self.failed += 1
+        finally:
+            with self._lock:
+                self._running.pop(task['id'], None)
+
+    def _heartbeat_loop(self):
+        """定期为执行中的任务续约，停止领取后仍持续到执行中的任务全部结束"""
+        while not self._exited.wait(QUEUE_CONFIG['heartbeat_interval']):
+            with self._lock:
+                task_ids = list(self._running)
+            try:
+                held = set(self.queue.heartbeat(task_ids))
+                # 心跳期间刚结束的任务不算丢失
+                with self._lock:
+                    lost = [task_id for task_id in task_ids if task_id not in held and task_id in self._running]
+                if lost:
+                    logger.warning("任务租约已丢失，可能已被其他节点接管: %s", lost)
+            except Exception as e:
+                logger.error("任务心跳失败: %s", e)
@@ -0,0 +1,373 @@
+"""
+连接池监控模块 - 统计数据库连接池和 requests 连接池的占用、等待与建连情况，并按观测到的并发调整池大小
+"""
+import os
+import json
+import math
+import time
+import bisect
+import logging
+import threading
+import weakref
+from typing import Dict, List, Optional
+
+from requests.adapters import HTTPAdapter
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from config import POOL_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 延迟直方图的桶上界（毫秒），最后一个桶收集超过 10 秒的样本
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """固定分桶的延迟直方图，线程安全，分位数按桶上界估计"""
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.bounds = tuple(buckets_ms)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        """记录一个样本（秒）"""
+        ms = seconds * 1000
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+            self.count += 1
+            self.total += ms
+            self.max = max(self.max, ms)
+
+    def quantile(self, q: float) -> float:
+        """分位数的上界估计（毫秒），落在最后一个桶时返回最大值"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = q * self.count
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank and count:
+                    return self.bounds[index] if index < len(self.bounds) else self.max
+            return self.max
+
+    def to_dict(self) -> Dict:
+        """转换为字典格式，用于监控"""
+        p50, p95, p99 = self.quantile(0.5), self.quantile(0.95), self.quantile(0.99)
+        with self._lock:
+            labels = [f'<={bound}' for bound in self.bounds] + [f'>{self.bounds[-1]}']
+            return {
+                'count': self.count,
+                'mean_ms': round(self.total / self.count, 3) if self.count else 0.0,
+                'max_ms': round(self.max, 3),
+                'p50_ms': p50,
+                'p95_ms': p95,
+                'p99_ms': p99,
+                'buckets': {label: count for label, count in zip(labels, self.counts) if count}
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    记录检出耗时的 QueuePool
+
+    SQLAlchemy 的连接池事件只在检出完成后触发，无法得到调用方等待空闲连接的时间，
+    这里在 connect() 外计时：包括从队列取连接、池未满时新建连接以及池满时的阻塞等待。
+    """
+
+    telemetry = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            if self.telemetry is not None:
+                self.telemetry.checkout_wait.observe(time.perf_counter() - started)
+
+    def recreate(self) -> 'InstrumentedQueuePool':
+        # engine.dispose() 会用 recreate() 替换连接池，保留监控对象
+        pool = super().recreate()
+        pool.telemetry = self.telemetry
+        return pool
+
+
+class PoolTelemetry:
+    """
+    数据库连接池监控
+
+    通过 SQLAlchemy 的连接池事件统计：检出中的连接数及其峰值、溢出连接数、新建连接数和
+    建连耗时、因超过 pool_recycle 或失效而重连的次数；连接池为 InstrumentedQueuePool 时
+    还统计检出等待时间的直方图。开启自适应模式时，本进程的检出峰值会写入状态文件，
+    供下次启动时计算连接池大小。
+    """
+
+    def __init__(self, engine, name: str = 'default', config: Optional[Dict] = None):
+        """
+        Args:
+            engine: SQLAlchemy 引擎
+            name: 状态文件中的键，通常为后端名称
+            config: 连接池配置，默认使用 POOL_CONFIG
+        """
+        self.engine = engine
+        self.name = name
+        self.config = config or POOL_CONFIG
+        self.checkout_wait = LatencyHistogram()
+        self.connect_time = LatencyHistogram()
+        self.in_use = 0
+        self.peak_in_use = 0     # 本次运行同时检出的最大连接数
+        self.checkouts = 0
+        self.connects = 0
+        self.recycled = 0
+        self.invalidated = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # 连接槽位对象在重连前后不变，据此区分新建连接和重连
+        self._records = weakref.WeakSet()
+        self._invalidated_records = weakref.WeakSet()
+        self._last_save = time.monotonic()
+        self._started = time.time()
+        self._run_id = f"{os.getpid()}-{int(self._started)}"
+
+        if isinstance(engine.pool, InstrumentedQueuePool):
+            engine.pool.telemetry = self
+        event.listen(engine, 'do_connect', self._on_do_connect)
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+        event.listen(engine, 'soft_invalidate', self._on_invalidate)
+
+    def _on_do_connect(self, dialect, conn_rec, cargs, cparams):
+        self._local.connect_started = time.perf_counter()
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        started = getattr(self._local, 'connect_started', None)
+        if started is not None:
+            self.connect_time.observe(time.perf_counter() - started)
+            self._local.connect_started = None
+        with self._lock:
+            self.connects += 1
+            if connection_record in self._records:
+                if connection_record in self._invalidated_records:
+                    self._invalidated_records.discard(connection_record)
+                else:
+                    self.recycled += 1
+            else:
+                self._records.add(connection_record)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+        if self.config['adaptive'] and time.monotonic() - self._last_save >= self.config['save_interval']:
+            self.save()
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidated += 1
+            self._invalidated_records.add(connection_record)
+
+    def stats(self) -> Dict:
+        """连接池的当前状态和累计指标"""
+        pool = self.engine.pool
+        with self._lock:
+            stats = {
+                'pool_class': type(pool).__name__,
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'recycled': self.recycled,
+                'invalidated': self.invalidated
+            }
+        if isinstance(pool, QueuePool):
+            stats.update(pool_size=pool.size(), idle=pool.checkedin(), overflow=max(0, pool.overflow()),
+                         max_overflow=pool._max_overflow)
+        stats['connect_time'] = self.connect_time.to_dict()
+        if isinstance(pool, InstrumentedQueuePool):
+            stats['checkout_wait'] = self.checkout_wait.to_dict()
+        return stats
+
+    def save(self):
+        """将本次运行的检出峰值写入状态文件，只保留最近 history 次运行"""
+        self._last_save = time.monotonic()
+        path = self.config['state_file']
+        try:
+            state = load_pool_state(path)
+            runs = state.setdefault(self.name, {}).setdefault('runs', {})
+            runs[self._run_id] = [self._started, self.peak_in_use]
+            for run_id in sorted(runs, key=lambda key: runs[key][0])[:-self.config['history']]:
+                del runs[run_id]
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("保存连接池状态失败: %s", e)
+
+
+def load_pool_state(path: str) -> Dict:
+    """读取连接池状态文件，不存在或损坏时返回空字典"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def adaptive_pool_size(name: str, default_size: int, default_overflow: int,
+                       config: Optional[Dict] = None) -> Dict:
+    """
+    按历史检出峰值计算连接池大小
+
+    常驻连接数取最近若干次运行检出峰值的 90 分位乘以 headroom，突发部分由溢出连接承担，
+    常驻连接与溢出连接之和不超过原来的 pool_size + max_overflow。溢出连接归还时即关闭，
+    多个采集节点空闲时只各自保留常驻连接。
+
+    Args:
+        name: 状态文件中的键
+        default_size: 没有历史数据时的常驻连接数
+        default_overflow: 没有历史数据时的溢出连接数
+        config: 连接池配置，默认使用 POOL_CONFIG
+
+    Returns:
+        {'pool_size': 常驻连接数, 'max_overflow': 溢出连接数}
+    """
+    config = config or POOL_CONFIG
+    runs = load_pool_state(config['state_file']).get(name, {}).get('runs', {})
+    peaks = sorted(peak for _, peak in runs.values())
+    if not peaks:
+        return {'pool_size': default_size, 'max_overflow': default_overflow}
+    observed = peaks[min(len(peaks) - 1, int(0.9 * len(peaks)))]
+    limit = default_size + default_overflow
+    pool_size = min(limit, max(config['min_size'], math.ceil(observed * config['headroom'])))
+    return {'pool_size': pool_size, 'max_overflow': limit - pool_size}
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    """
+    统计连接复用情况的 requests 适配器
+
+    urllib3 为每个 (协议, 主机, 端口) 和每个代理各维护一个连接池，PoolManager 最多保留
+    pool_connections 个连接池，超出时淘汰最久未用的池，其中的空闲连接不再被复用。经多个代理出口时
+    池的数量随代理数增长，默认的 10 个很容易不够用，连接池被反复淘汰后每个请求都要重新握手。
+    这里统计淘汰次数和各池的请求数、建连数；开启自适应模式时 adapt() 按观测到的
+    池数量扩大 pool_connections。
+    """
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10, adaptive: bool = False, **kwargs):
+        self.evictions = 0
+        self.adaptive = adaptive
+        self._closed_requests = 0
+        self._closed_connections = 0
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, **kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        self._wrap_pools(self.poolmanager)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        created = proxy not in self.proxy_manager
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        if created:
+            self._wrap_pools(manager)
+        return manager
+
+    def _wrap_pools(self, manager):
+        """记录被淘汰的连接池，淘汰后的处理与原来一致（urllib3 1.x 关闭连接池，2.x 交给垃圾回收）"""
+        dispose = manager.pools.dispose_func
+
+        def on_evict(pool):
+            self.evictions += 1
+            self._closed_requests += pool.num_requests
+            self._closed_connections += pool.num_connections
+            if dispose is not None:
+                dispose(pool)
+
+        manager.pools.dispose_func = on_evict
+
+    def _managers(self) -> List:
+        return [self.poolmanager] + list(self.proxy_manager.values())
+
+    def stats(self) -> Dict:
+        """连接池数、淘汰次数和请求/建连数，reuse 为复用已有连接的请求比例"""
+        pools = []
+        for manager in self._managers():
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is not None:
+                    pools.append({
+                        'host': f"{key.key_scheme}://{key.key_host}:{key.key_port}",
+                        'requests': pool.num_requests,
+                        'connections': pool.num_connections,
+                        'idle': pool.pool.qsize() if pool.pool is not None else 0
+                    })
+        requests_count = self._closed_requests + sum(pool['requests'] for pool in pools)
+        connections = self._closed_connections + sum(pool['connections'] for pool in pools)
+        return {
+            'pool_connections': self._pool_connections,
+            'pool_maxsize': self._pool_maxsize,
+            'pools': len(pools),
+            'evictions': self.evictions,
+            'requests': requests_count,
+            'connections': connections,
+            'reuse': round(1 - connections / requests_count, 4) if requests_count else 0.0,
+            'hosts': pools
+        }
+
+    def adapt(self) -> bool:
+        """
+        发生过连接池淘汰时按观测到的池数量扩大 pool_connections
+
+        须在没有请求进行时调用（重建 PoolManager 会关闭现有连接）
+
+        Returns:
+            是否调整了大小
+        """
+        if not self.adaptive or not self.evictions:
+            return False
+        # 被淘汰过的池大多仍会被再次使用，需要的池数约为现有池数加淘汰次数
+        target = min(self.stats()['pools'] + self.evictions + 2, POOL_CONFIG['http_max_pools'])
+        if target <= self._pool_connections:
+            return False
+        logger.info("HTTP 连接池淘汰 %d 次，pool_connections %d -> %d",
+                    self.evictions, self._pool_connections, target)
+        for manager in self._managers():
+            manager.clear()
+        self.proxy_manager.clear()
+        self.evictions = 0
+        self.init_poolmanager(target, self._pool_maxsize, block=self._pool_block)
+        self._pool_connections = target
+        return True
+
+
+def mount_instrumented_adapter(session, expected_pools: int = 0, pool_maxsize: int = 10) -> InstrumentedAdapter:
+    """
+    为会话挂载 InstrumentedAdapter
+
+    Args:
+        session: requests.Session
+        expected_pools: 预计的连接池数（主机数 × 出口数），POOL_CONFIG['http_pool_connections']
+                        为0时按该值确定 pool_connections
+        pool_maxsize: 每个连接池保留的空闲连接数，与使用该会话的线程数一致即可
+
+    Returns:
+        挂载的适配器
+    """
+    pool_connections = POOL_CONFIG['http_pool_connections'] or max(10, expected_pools)
+    adapter = InstrumentedAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                  adaptive=POOL_CONFIG['adaptive'])
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return adapter
@@ -0,0 +1,316 @@
+"""
+热词统计模块 - 以 Count-Min Sketch 和 Space-Saving 在固定内存内统计标题 n-gram 的小时/日/周热度
+"""
+import os
+import re
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import TERMS_CONFIG
+from utils import ensure_directory
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = 'terms.npz'
+
+# 只对连续汉字片段取 n-gram，字母数字按字符切分没有意义
+_CJK_PATTERN = re.compile(r'[㐀-䶿一-鿿]+')
+
+# 每个字占21位，三元组恰好放进一个 uint64；首字不为0，长度由最高的非零字段决定
+_CHAR_BITS = 21
+_CHAR_MASK = (1 << _CHAR_BITS) - 1
+MAX_GRAM = 3
+
+# 各行哈希函数的乘数由固定种子生成，持久化的草图在不同进程间保持一致
+HASH_SEED = 20240101
+
+
+def encode_term(gram: str) -> int:
+    """将不超过三个字的词编码为整数"""
+    code = 0
+    for char in gram:
+        code = (code << _CHAR_BITS) | ord(char)
+    return code
+
+
+def decode_term(code: int) -> str:
+    """encode_term 的逆运算"""
+    chars = []
+    code = int(code)
+    while code:
+        chars.append(chr(code & _CHAR_MASK))
+        code >>= _CHAR_BITS
+    return ''.join(reversed(chars))
+
+
+def term_codes(text: str, sizes: Sequence[int] = (2, 3), stop_terms: Iterable[str] = ()) -> set:
+    """
+    将标题切分为字符 n-gram 编码
+
+    Args:
+        text: 原始文本
+        sizes: n-gram 长度，不超过 MAX_GRAM
+        stop_terms: 停用词，包含停用词的 n-gram 被丢弃
+
+    Returns:
+        去重后的词编码集合，同一标题中重复出现的词只计一次
+    """
+    codes = set()
+    if not text:
+        return codes
+    stop_terms = tuple(stop_terms)
+    for run in _CJK_PATTERN.findall(text):
+        for size in sizes:
+            for i in range(len(run) - size + 1):
+                gram = run[i:i + size]
+                if not any(stop in gram for stop in stop_terms):
+                    codes.add(encode_term(gram))
+    return codes
+
+
+class TermWindow:
+    """
+    滑动窗口内的词频
+
+    窗口等分为 panes 个时间片，每个时间片一个 Count-Min Sketch（depth × width 计数矩阵），
+    窗口总计矩阵等于存活时间片矩阵之和：时间片矩阵的增量同时加到总计矩阵，时间片过期时
+    整块从总计矩阵中减去，查询直接读取总计矩阵。时间片内使用保守更新（只抬高低于
+    估计值+增量的计数器），高估明显小于普通更新，各时间片之和仍不低于真实计数。
+
+    热词用 Space-Saving 式的定长计数器表跟踪：最多 capacity 个词，新出现的词估计计数
+    超过表中最小值时替换该词。经典 Space-Saving 的计数只增不减，无法表达滑动窗口，
+    这里的计数器每次更新都从总计矩阵重新读取，过期时间片的计数随之扣除，
+    原本靠前的词热度下降后会被新词替换。内存只与 panes、depth、width、capacity 有关。
+    """
+
+    def __init__(self, name: str, span: int, panes: int, width: int, depth: int, capacity: int):
+        """
+        Args:
+            name: 窗口名称
+            span: 窗口长度（秒）
+            panes: 时间片数
+            width: 每行计数器数，须为2的幂
+            depth: 哈希函数（行）数
+            capacity: 热词计数器数
+        """
+        if width & (width - 1):
+            raise ValueError("width 须为2的幂")
+        self.name = name
+        self.span = span
+        self.panes = panes
+        self.pane_seconds = max(1, span // panes)
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+
+        # 乘法移位哈希：h_d(x) = (a_d * x mod 2^64) >> (64 - log2(width))，a_d 为奇数
+        rng = np.random.default_rng(HASH_SEED)
+        self._mult = rng.integers(1, 1 << 63, depth, dtype=np.uint64) | np.uint64(1)
+        self._shift = np.uint64(64 - (width.bit_length() - 1))
+        self._rows = np.arange(depth)[:, None]
+
+        self.cms = np.zeros((panes, depth, width), dtype=np.uint32)
+        self.total = np.zeros((depth, width), dtype=np.uint32)
+        self.pane_ids = np.full(panes, -1, dtype=np.int64)
+        self.heavy = np.zeros(0, dtype=np.uint64)
+        self.head = -1
+
+    def _columns(self, codes: np.ndarray) -> np.ndarray:
+        """(depth, 词数) 的列下标"""
+        return ((codes[None, :] * self._mult[:, None]) >> self._shift).astype(np.intp)
+
+    def advance(self, now: int):
+        """滚动到 now 所在的时间片，过期的时间片从总计中减去"""
+        pane = now // self.pane_seconds
+        if pane <= self.head:
+            # 迟到的数据计入当前时间片
+            return
+        for slot in np.flatnonzero((self.pane_ids >= 0) & (self.pane_ids <= pane - self.panes)):
+            self.total -= self.cms[slot]
+            self.cms[slot] = 0
+            self.pane_ids[slot] = -1
+        self.head = pane
+        self.pane_ids[pane % self.panes] = pane
+
+    def add(self, codes: np.ndarray, counts: np.ndarray, now: int):
+        """
+        计入一批词
+
+        Args:
+            codes: 词编码数组（不重复）
+            counts: 对应的计数
+            now: 秒级时间戳
+        """
+        self.advance(now)
+        sketch = self.cms[self.head % self.panes]
+        columns = self._columns(codes)
+        # 保守更新：每个词的计数器至少抬高到 该词在本时间片的估计值 + 增量
+        target = (sketch[self._rows, columns].min(axis=0) + counts).astype(np.uint32)
+        for row in range(self.depth):
+            # 同一计数器可能对应多个词，按去重后的位置把时间片的增量加到总计矩阵
+            cells = np.unique(columns[row])
+            previous = sketch[row, cells]
+            np.maximum.at(sketch[row], columns[row], target)
+            self.total[row, cells] += sketch[row, cells] - previous
+
+        candidates = np.union1d(self.heavy, codes)
+        if len(candidates) > self.capacity:
+            estimates = self.estimate(candidates)
+            candidates = candidates[np.argpartition(-estimates, self.capacity - 1)[:self.capacity]]
+        self.heavy = candidates
+
+    def estimate(self, codes: np.ndarray) -> np.ndarray:
+        """窗口内计数的估计值（不低于真实值）"""
+        if not len(codes):
+            return np.zeros(0, dtype=np.int64)
+        return self.total[self._rows, self._columns(codes)].min(axis=0).astype(np.int64)
+
+    def top(self, k: int) -> List[Tuple[int, int]]:
+        """窗口内计数最大的 k 个词，返回 (词编码, 估计计数)"""
+        if not len(self.heavy):
+            return []
+        estimates = self.estimate(self.heavy)
+        chosen = np.argpartition(-estimates, k - 1)[:k] if len(self.heavy) > k else np.arange(len(self.heavy))
+        chosen = chosen[np.lexsort((self.heavy[chosen], -estimates[chosen]))]
+        return [(int(self.heavy[i]), int(estimates[i])) for i in chosen if estimates[i] > 0]
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """窗口状态数组，键以窗口名称为前缀"""
+        prefix = self.name + '_'
+        return {
+            prefix + 'shape': np.array([self.panes, self.pane_seconds, self.depth, self.width, self.capacity]),
+            prefix + 'head': np.array([self.head]),
+            prefix + 'cms': self.cms,
+            prefix + 'pane_ids': self.pane_ids,
+            prefix + 'heavy': self.heavy
+        }
+
+    def restore(self, state) -> bool:
+        """
+        从 state() 的结果恢复
+
+        Returns:
+            是否恢复成功；窗口参数改变时保存的状态无法复用，返回False
+        """
+        prefix = self.name + '_'
+        shape = [self.panes, self.pane_seconds, self.depth, self.width, self.capacity]
+        if prefix + 'shape' not in state or state[prefix + 'shape'].tolist() != shape:
+            return False
+        self.head = int(state[prefix + 'head'][0])
+        self.cms = np.array(state[prefix + 'cms'], dtype=np.uint32)
+        self.total = self.cms.sum(axis=0, dtype=np.uint32)
+        self.pane_ids = np.array(state[prefix + 'pane_ids'], dtype=np.int64)
+        self.heavy = np.array(state[prefix + 'heavy'], dtype=np.uint64)
+        return True
+
+
+class TermStats:
+    """
+    标题热词统计
+
+    每次爬取把清洗后热榜条目的标题切分为 n-gram，同一标题中的词只计一次，即一个词的计数是
+    它在各次爬取中出现在多少个上榜标题里。各窗口的草图和候选词在每次更新后写入
+    data_dir/terms.npz（先写临时文件再原子替换），进程重启后继续累计，
+    查询进程只需加载该文件。
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Args:
+            config: 热词统计配置，默认使用 TERMS_CONFIG
+        """
+        self.config = config or TERMS_CONFIG
+        if max(self.config['ngram_sizes']) > MAX_GRAM:
+            raise ValueError(f"n-gram 长度不能超过 {MAX_GRAM}")
+        self.data_dir = self.config['data_dir']
+        self.windows = {
+            name: TermWindow(name, span, panes, self.config['width'], self.config['depth'],
+                             self.config['capacity'])
+            for name, (span, panes) in self.config['windows'].items()
+        }
+        self._lock = threading.Lock()
+        ensure_directory(self.data_dir)
+        self.load()
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.data_dir, STATE_FILE)
+
+    def load(self):
+        """加载保存的草图，不存在或参数已改变的窗口从空开始"""
+        if not os.path.exists(self.state_path):
+            return
+        with self._lock, np.load(self.state_path) as state:
+            for window in self.windows.values():
+                if not window.restore(state):
+                    logger.warning("热词窗口 %s 的参数已改变，丢弃保存的统计", window.name)
+
+    def save(self):
+        """原子写入全部窗口的状态"""
+        with self._lock:
+            arrays = {}
+            for window in self.windows.values():
+                arrays.update(window.state())
+            tmp_path = self.state_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp_path, self.state_path)
+
+    def update(self, items: Iterable, crawl_time: Optional[datetime] = None, save: bool = True) -> int:
+        """
+        计入一次爬取
+
+        Args:
+            items: DataProcessor.process_hot_items 输出的热榜条目
+            crawl_time: 爬取时间，默认当前时间
+            save: 是否立即持久化
+
+        Returns:
+            本次计入的不同词数
+        """
+        counts = {}
+        for item in items:
+            for code in term_codes(item.get('title') or '', self.config['ngram_sizes'],
+                                   self.config['stop_terms']):
+                counts[code] = counts.get(code, 0) + 1
+        if not counts:
+            return 0
+
+        now = int((crawl_time or datetime.now()).timestamp())
+        codes = np.fromiter(counts, dtype=np.uint64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+        with self._lock:
+            for window in self.windows.values():
+                window.add(codes, values, now)
+        if save:
+            self.save()
+        return len(counts)
+
+    def top(self, window: str, k: Optional[int] = None, now: Optional[datetime] = None) -> List[Dict]:
+        """
+        窗口内的热词
+
+        Args:
+            window: 窗口名称，如 hour、day、week
+            k: 返回的词数，默认使用配置的 top_k
+            now: 查询时间，早于该时间一个窗口长度的时间片不计入；默认以最后一次更新为准
+
+        Returns:
+            按估计计数降序的 {'term': 词, 'count': 估计计数} 列表
+        """
+        if window not in self.windows:
+            raise KeyError(f"未知的热词窗口: {window}")
+        with self._lock:
+            target = self.windows[window]
+            if now is not None:
+                target.advance(int(now.timestamp()))
+            top = target.top(k or self.config['top_k'])
+        return [{'term': decode_term(code), 'count': count} for code, count in top]
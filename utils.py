@@ -2,22 +2,133 @@
 工具模块 - 包含通用的工具函数
 """
 import logging
+import logging.handlers
 import os
+import copy
 import json
+import time
+import queue
+import atexit
+import threading
 from datetime import datetime
 from typing import Dict, List, Any
 from config import LOG_CONFIG
 
+# 日志记录的标准属性，JsonFormatter 只输出这些之外通过 extra 传入的字段
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_log_listener = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    重复日志限流过滤器
+    
+    以 (logger名, 级别, 消息模板) 为键，每个窗口内最多放行 burst 条，其余丢弃并计数；
+    下一个窗口放行的第一条日志附带上一窗口被丢弃的条数。使用 %s 占位符而不是 f-string
+    记录日志时，参数不同的同类消息会归为一组。
+    """
+    
+    MAX_KEYS = 10000
+    
+    def __init__(self, interval: float, burst: int):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._windows = {}  # 键 -> [窗口开始时间, 窗口内条数, 丢弃条数]
+        self._lock = threading.Lock()
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is not None and now - window[0] < self.interval:
+                window[1] += 1
+                if window[1] <= self.burst:
+                    return True
+                window[2] += 1
+                return False
+            
+            if len(self._windows) >= self.MAX_KEYS:
+                self._windows = {k: w for k, w in self._windows.items() if now - w[0] < self.interval}
+            self._windows[key] = [now, 1, 0]
+        
+        if window is not None and window[2]:
+            record.suppressed = window[2]
+            record.msg = f"{record.msg} (已限流 {window[2]} 条相同日志)"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """JSON Lines 日志格式，每条日志一行，包含通过 extra 传入的结构化字段"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """调用线程只合并消息参数，时间格式化、序列化和写文件都在后台线程完成"""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
 def setup_logging():
-    """设置日志配置"""
-    logging.basicConfig(
-        level=getattr(logging, LOG_CONFIG['level']),
-        format=LOG_CONFIG['format'],
-        handlers=[
-            logging.FileHandler(LOG_CONFIG['file'], encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
+    """
+    设置日志配置
+    
+    根日志器只挂一个 QueueHandler，日志记录放入队列后由后台 QueueListener 线程写入控制台
+    和日志文件。日志文件按 LOG_CONFIG['max_bytes'] 大小轮转，设置 LOG_ROTATE_WHEN 时按时间
+    轮转，LOG_JSON=1 时输出 JSON Lines。重复调用不会重复添加处理器。
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return
+    
+    if LOG_CONFIG['rotate_when']:
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            LOG_CONFIG['file'], when=LOG_CONFIG['rotate_when'],
+            backupCount=LOG_CONFIG['backup_count'], encoding='utf-8'
+        )
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            LOG_CONFIG['file'], maxBytes=LOG_CONFIG['max_bytes'],
+            backupCount=LOG_CONFIG['backup_count'], encoding='utf-8'
+        )
+    file_handler.setFormatter(JsonFormatter() if LOG_CONFIG['json'] else logging.Formatter(LOG_CONFIG['format']))
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(LOG_CONFIG['format']))
+    
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(LOG_CONFIG['rate_limit_interval'], LOG_CONFIG['rate_limit_burst']))
+    
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, LOG_CONFIG['level']))
+    root.addHandler(queue_handler)
+    
+    _log_listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler,
+                                                   respect_handler_level=True)
+    _log_listener.start()
+    # 退出前排空队列，保证最后的日志写入文件
+    atexit.register(_log_listener.stop)
     
     # 设置第三方库的日志级别
     logging.getLogger('requests').setLevel(logging.WARNING)
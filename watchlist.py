@@ -0,0 +1,323 @@
+"""
+关注词表模块 - 基于 Aho-Corasick 自动机在热榜标题和摘要中一次扫描匹配全部关注词
+"""
+import os
+import logging
+import threading
+import unicodedata
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from config import WATCHLIST_CONFIG
+from events import EVENT_WATCH_HIT
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(text: str) -> str:
+    """匹配前的规范化：全角转半角、英文转小写，关注词和文本使用同一规则"""
+    return unicodedata.normalize('NFKC', text or '').lower()
+
+
+class Automaton:
+    """
+    Aho-Corasick 自动机
+
+    关注词构成字典树，每个节点的失败指针指向其最长真后缀对应的节点，输出表合并了
+    失败链上的全部关注词。匹配时文本的每个字只前进一次（失败跳转的总次数不超过文本长度），
+    匹配耗时只与文本长度和命中数有关，与关注词数量无关。
+    """
+
+    def __init__(self, keywords: Iterable[str] = ()):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        self.keywords = set()
+        for keyword in keywords:
+            if keyword and keyword not in self.keywords:
+                self.keywords.add(keyword)
+                self._insert(keyword)
+        self._link()
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def _insert(self, keyword: str):
+        node = 0
+        for char in keyword:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = self._goto[node][char] = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = child
+        self._out[node] = (keyword,)
+
+    def _link(self):
+        """按层序计算失败指针并合并输出表"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """
+        扫描文本
+
+        Args:
+            text: 已规范化的文本
+
+        Yields:
+            (结束位置, 关注词)，同一关注词多次出现时产出多次
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for keyword in out[node]:
+                yield position, keyword
+
+
+class Watchlist:
+    """
+    关注词表匹配器
+
+    与检索索引的主段/增量段类似：主自动机包含上一次合并时的全部关注词，之后新增的关注词
+    只重建一个小的增量自动机，删除的关注词仅从词表映射中移除、匹配结果中过滤掉。
+    增量关注词或已删除关注词超过 merge_threshold 时重建主自动机。
+    """
+
+    def __init__(self, lists: Optional[Dict[str, Iterable[str]]] = None, merge_threshold: int = 1000):
+        """
+        Args:
+            lists: 词表名称到关注词的映射
+            merge_threshold: 触发合并的增量/已删除关注词数
+        """
+        self.merge_threshold = merge_threshold
+        self._lists = {}
+        self._owners = {}
+        self._main = Automaton()
+        self._delta = Automaton()
+        self._lock = threading.Lock()
+        for name, keywords in (lists or {}).items():
+            self.set_list(name, keywords)
+
+    @property
+    def keyword_count(self) -> int:
+        """有效关注词数（跨词表去重）"""
+        return len(self._owners)
+
+    def lists(self) -> Dict[str, int]:
+        """各词表的关注词数"""
+        return {name: len(keywords) for name, keywords in self._lists.items()}
+
+    def set_list(self, name: str, keywords: Iterable[str]) -> Tuple[int, int]:
+        """
+        设置一个词表的全部关注词，只对新增和删除的关注词更新自动机
+
+        Args:
+            name: 词表名称
+            keywords: 关注词
+
+        Returns:
+            (新增数, 删除数)
+        """
+        new = {normalize(keyword).strip() for keyword in keywords} - {''}
+        with self._lock:
+            old = self._lists.get(name, set())
+            added, removed = new - old, old - new
+            self._lists[name] = new
+            for keyword in removed:
+                owners = self._owners[keyword]
+                owners.discard(name)
+                if not owners:
+                    del self._owners[keyword]
+
+            fresh = []
+            for keyword in added:
+                if keyword not in self._owners and keyword not in self._main.keywords \
+                        and keyword not in self._delta.keywords:
+                    fresh.append(keyword)
+                self._owners.setdefault(keyword, set()).add(name)
+
+            if fresh:
+                self._delta = Automaton(self._delta.keywords | set(fresh))
+            self._maybe_merge()
+        if added or removed:
+            logger.info("词表 %s 更新: 新增 %d 个关注词，删除 %d 个", name, len(added), len(removed))
+        return len(added), len(removed)
+
+    def remove_list(self, name: str) -> int:
+        """
+        删除词表
+
+        Returns:
+            删除的关注词数
+        """
+        if name not in self._lists:
+            return 0
+        removed = self.set_list(name, ())[1]
+        with self._lock:
+            del self._lists[name]
+        return removed
+
+    def _maybe_merge(self):
+        """在锁内调用：增量或已删除的关注词过多时重建主自动机"""
+        stale = len(self._main.keywords) + len(self._delta.keywords) - len(self._owners)
+        if len(self._delta) > self.merge_threshold or stale > self.merge_threshold:
+            self._main = Automaton(self._owners)
+            self._delta = Automaton()
+            logger.info("关注词自动机重建完成: %d 个关注词", len(self._main))
+
+    def match(self, text: str) -> Dict[str, Set[str]]:
+        """
+        匹配文本中出现的关注词
+
+        Args:
+            text: 原始文本
+
+        Returns:
+            关注词到所属词表集合的映射
+        """
+        text = normalize(text)
+        with self._lock:
+            main, delta, owners = self._main, self._delta, self._owners
+            found = {keyword for _, keyword in main.iter_matches(text)}
+            if len(delta):
+                found.update(keyword for _, keyword in delta.iter_matches(text))
+            return {keyword: set(owners[keyword]) for keyword in found if keyword in owners}
+
+    def match_items(self, items: Iterable, fields: Iterable[str] = ('title', 'excerpt')) -> List[Dict]:
+        """
+        匹配一次爬取的全部条目
+
+        Args:
+            items: 清洗后的热榜条目
+            fields: 参与匹配的字段，同一关注词在多个字段命中时记为第一个字段
+
+        Returns:
+            命中列表，每个 (问题, 词表, 关注词) 一项，含 question_id、watchlist、keyword、field
+        """
+        hits = []
+        for item in items:
+            question_id = item.get('question_id')
+            if not question_id:
+                continue
+            seen = set()
+            for field in fields:
+                for keyword, names in self.match(item.get(field) or '').items():
+                    for name in sorted(names):
+                        if (name, keyword) not in seen:
+                            seen.add((name, keyword))
+                            hits.append({'question_id': question_id, 'watchlist': name,
+                                         'keyword': keyword, 'field': field, 'item': item})
+        return hits
+
+
+def load_watchlist_file(path: str) -> List[str]:
+    """读取词表文件：每行一个关注词，忽略空行和 # 开头的注释"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+class WatchlistMonitor:
+    """
+    关注词监控
+
+    每次爬取前检查词表目录，只重新读取修改过的词表文件；匹配全部条目后将命中写入
+    zhihu_watch_hits，并为首次命中的 (问题, 词表, 关注词) 生成 watch_hit 事件。
+    """
+
+    def __init__(self, manager=None, config: Optional[Dict] = None):
+        """
+        Args:
+            manager: 数据库管理器，默认使用全局 db_manager
+            config: 词表配置，默认使用 WATCHLIST_CONFIG
+        """
+        if manager is None:
+            from database import db_manager as manager
+        self.db = manager
+        self.config = config or WATCHLIST_CONFIG
+        self.watchlist = Watchlist(merge_threshold=self.config['merge_threshold'])
+        self._mtimes = {}
+        self._sequence = 0
+
+    def refresh(self) -> bool:
+        """
+        按文件修改时间重新加载有变化的词表
+
+        Returns:
+            是否有词表变化
+        """
+        directory = self.config['dir']
+        current = {}
+        if os.path.isdir(directory):
+            for entry in os.scandir(directory):
+                if entry.is_file() and entry.name.endswith('.txt'):
+                    current[entry.name[:-4]] = (entry.stat().st_mtime_ns, entry.path)
+
+        changed = False
+        for name in set(self._mtimes) - set(current):
+            self.watchlist.remove_list(name)
+            changed = True
+        for name, (mtime, path) in current.items():
+            if self._mtimes.get(name) != mtime:
+                self.watchlist.set_list(name, load_watchlist_file(path))
+                changed = True
+        self._mtimes = {name: mtime for name, (mtime, _) in current.items()}
+        return changed
+
+    def process(self, items: List, crawl_time: datetime) -> List[Dict]:
+        """
+        匹配本次爬取的条目并记录命中
+
+        Args:
+            items: 清洗后的热榜条目
+            crawl_time: 爬取时间
+
+        Returns:
+            首次命中的事件列表
+        """
+        self.refresh()
+        hits = self.watchlist.match_items(items, self.config['fields'])
+        if not hits:
+            return []
+
+        known = self.db.get_watch_hit_keys(list({hit['question_id'] for hit in hits}))
+        self.db.record_watch_hits([
+            {'question_id': hit['question_id'], 'watchlist': hit['watchlist'], 'keyword': hit['keyword'],
+             'field': hit['field'], 'first_seen': crawl_time, 'last_seen': crawl_time}
+            for hit in hits
+        ])
+
+        events = [self._event(hit, crawl_time) for hit in hits
+                  if (hit['question_id'], hit['watchlist'], hit['keyword']) not in known]
+        logger.info("关注词命中 %d 个，首次命中 %d 个", len(hits), len(events))
+        return events
+
+    def _event(self, hit: Dict, crawl_time: datetime) -> Dict:
+        """构造与变更事件格式一致的事件字典"""
+        self._sequence += 1
+        item = hit['item']
+        return {
+            'id': f"{crawl_time.strftime('%Y%m%d%H%M%S')}-w{self._sequence}",
+            'type': EVENT_WATCH_HIT,
+            'question_id': hit['question_id'],
+            'crawl_time': crawl_time.isoformat(),
+            'title': item.get('title'),
+            'rank': item.get('rank'),
+            'hot_index': item.get('hot_index'),
+            'watchlist': hit['watchlist'],
+            'keyword': hit['keyword'],
+            'field': hit['field']
+        }